@@ -13,10 +13,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import atexit
+import collections
+import contextlib
 import logging
 import os
+import Queue
 import select
 import socket
+import sys
+import threading
 import time
 import warnings
 
@@ -29,10 +35,182 @@ with warnings.catch_warnings():
     import paramiko
 
 
+# number of seconds after which unused connection is closed
+IDLE_TIMEOUT = 120
+
+# default number of hosts commands are executed on at once
+FAN_OUT_WORKERS = 10
+
+# number of bytes read from channel at once
+BUF_SIZE = 32768
+
+# number of last bytes of streamed output kept for error message
+TAIL_SIZE = 4096
+
+
+def _iter_lines(chunks):
+    """Joins chunks of output into lines, with line endings kept.
+
+    Error of chunks is raised after the last incomplete line.
+    """
+    pending = ''
+    error = None
+    try:
+        for chunk in chunks:
+            lines = (pending + chunk).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line + '\n'
+    except Exception:
+        error = sys.exc_info()
+
+    if pending:
+        yield pending
+    if error is not None:
+        raise error[0], error[1], error[2]
+
+
+class _PooledConnection(object):
+    """Pooled paramiko.SSHClient or paramiko.Transport."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.users = 0
+        self.last_used = time.time()
+
+    def is_alive(self):
+        transport = self.connection
+        if not isinstance(transport, paramiko.Transport):
+            transport = transport.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            # detects connections dropped by the other side
+            transport.send_ignore()
+        except (EOFError, paramiko.SSHException, socket.error):
+            return False
+        return True
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception:
+            LOG.debug('Failed to close ssh connection', exc_info=True)
+
+
+class ConnectionPool(object):
+    """SSH connections of the process, kept by (host, user, key).
+
+    Commands executed on the same host reuse authenticated transport
+    and open just a new channel on it. Connections which were not used
+    for idle_timeout seconds are closed.
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._connections = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        # transports are not usable in forked process, since their
+        # threads stay in parent
+        if self._pid != os.getpid():
+            self._connections = {}
+            self._pid = os.getpid()
+
+    def _evict_idle(self, now):
+        idle = []
+        for key, pooled in self._connections.items():
+            if not pooled.users and \
+                    now - pooled.last_used > self.idle_timeout:
+                idle.append(pooled)
+                del self._connections[key]
+        return idle
+
+    def _acquire(self, key, connect):
+        with self._lock:
+            self._check_pid()
+            to_close = self._evict_idle(time.time())
+            pooled = self._connections.get(key)
+            if pooled is not None:
+                pooled.users += 1
+        for idle in to_close:
+            idle.close()
+
+        if pooled is not None:
+            if pooled.is_alive():
+                return pooled
+            self._release(key, pooled, discard=True)
+
+        # connecting may take long, so other hosts are not blocked
+        new = _PooledConnection(connect())
+        with self._lock:
+            pooled = self._connections.setdefault(key, new)
+            pooled.users += 1
+        if pooled is not new:
+            new.close()
+        return pooled
+
+    def _release(self, key, pooled, discard=False):
+        with self._lock:
+            pooled.users -= 1
+            pooled.last_used = time.time()
+            if discard and self._connections.get(key) is pooled:
+                del self._connections[key]
+            close = discard and not pooled.users
+        if close:
+            pooled.close()
+
+    @contextlib.contextmanager
+    def connection(self, key, connect):
+        """Gives live connection for key, connect is called to create
+        it when there is none.
+
+        Connection is dropped from pool if the block fails with error
+        of ssh transport.
+        """
+        pooled = self._acquire(key, connect)
+        discard = False
+        try:
+            yield pooled.connection
+        except (EOFError, paramiko.SSHException, socket.error):
+            discard = True
+            raise
+        finally:
+            self._release(key, pooled, discard=discard)
+
+    def close_all(self):
+        with self._lock:
+            self._check_pid()
+            connections = self._connections.values()
+            self._connections = {}
+        for pooled in connections:
+            pooled.close()
+
+
+POOL = ConnectionPool()
+
+# transports to instances tunnelled through pooled connections,
+# kept by (connection key, instance, user)
+VM_POOL = ConnectionPool()
+
+
+def close_all_connections():
+    """Closes pooled connections, called when test run ends."""
+    # transports to instances go through the other connections
+    VM_POOL.close_all()
+    POOL.close_all()
+
+
+atexit.register(close_all_connections)
+
+
 class Client(object):
 
     def __init__(self, host, username, password=None, timeout=300, pkey=None,
-                 channel_timeout=70, look_for_keys=False, key_filename=None):
+                 channel_timeout=70, look_for_keys=False, key_filename=None,
+                 buf_size=BUF_SIZE):
         self.host = host
         self.username = username
         self.password = password
@@ -47,13 +225,23 @@ class Client(object):
         self.key_filename = key_filename
         self.timeout = int(timeout)
         self.channel_timeout = float(channel_timeout)
-        self.buf_size = 1024
+        self.buf_size = buf_size
 
     def _get_key_from_file(self, path):
         f_path = os.popen('ls %s' % path, 'r').read().strip('\n')
         file_key = file(f_path, 'r')
         return file_key
 
+    def _get_pool_key(self):
+        fingerprint = self.pkey.get_fingerprint() if self.pkey else None
+        return (self.host, self.username, self.password, fingerprint,
+                self.key_filename, self.look_for_keys)
+
+    def _get_pooled_connection(self):
+        """Returns context manager giving connection from pool."""
+        return POOL.connection(self._get_pool_key(),
+                               self._get_ssh_connection)
+
     def _get_ssh_connection(self, sleep=1.5, backoff=1.01):
         """Returns an ssh connection to the specified host."""
         _timeout = True
@@ -118,26 +306,10 @@ class Client(object):
             LOG.exception('Closed on connecting to server')
             return
 
-    def exec_command(self, command):
-        """Execute the specified command on the server.
-
-        Note that this method is reading whole command outputs to memory, thus
-        shouldn't be used for large outputs.
-
-        :returns: data read from standard output of the command.
-        :raises: SSHExecCommandFailed if command returns nonzero
-                 status. The exception contains command status stderr content.
+    def _read_channel(self, channel, command):
+        """Yields (out_chunk, err_chunk) pairs read from channel until
+        command executed in it exits, either chunk may be None.
         """
-        ssh = self._get_ssh_connection()
-        transport = ssh.get_transport()
-        channel = transport.open_session()
-        channel.get_pty()
-        channel.fileno()  # Register event pipe
-        channel.exec_command(command)
-        channel.shutdown_write()
-        out_data = []
-        err_data = []
-
         select_params = [channel], [], [], self.channel_timeout
         while True:
             ready = select.select(*select_params)
@@ -150,13 +322,101 @@ class Client(object):
             out_chunk = err_chunk = None
             if channel.recv_ready():
                 out_chunk = channel.recv(self.buf_size)
-                out_data += out_chunk,
             if channel.recv_stderr_ready():
                 err_chunk = channel.recv_stderr(self.buf_size)
-                err_data += err_chunk,
+            if out_chunk or err_chunk:
+                yield out_chunk, err_chunk
             if channel.closed and not err_chunk and not out_chunk:
                 break
-        exit_status = channel.recv_exit_status()
+
+    @contextlib.contextmanager
+    def _open_session(self, command, get_pty=True):
+        """Gives channel of pooled connection executing command."""
+        with self._get_pooled_connection() as ssh:
+            channel = ssh.get_transport().open_session()
+            try:
+                if get_pty:
+                    channel.get_pty()
+                channel.fileno()  # Register event pipe
+                channel.exec_command(command)
+                channel.shutdown_write()
+                yield channel
+            finally:
+                # transport stays open for next commands
+                channel.close()
+
+    def _execute(self, command):
+        """Executes command on the server.
+
+        :returns: exit status of the command and lists of chunks of
+                  its standard output and error.
+        """
+        out_data = []
+        err_data = []
+        with self._open_session(command) as channel:
+            for out_chunk, err_chunk in self._read_channel(channel, command):
+                if out_chunk:
+                    out_data.append(out_chunk)
+                if err_chunk:
+                    err_data.append(err_chunk)
+            exit_status = channel.recv_exit_status()
+        return exit_status, out_data, err_data
+
+    def _iter_output(self, command, max_bytes, tail_size, get_pty):
+        out_tail = err_tail = ''
+        size = 0
+        with self._open_session(command, get_pty=get_pty) as channel:
+            for out_chunk, err_chunk in self._read_channel(channel, command):
+                if err_chunk:
+                    err_tail = (err_tail + err_chunk)[-tail_size:]
+                if not out_chunk:
+                    continue
+
+                size += len(out_chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise exceptions.SSHOutputLimitExceeded(
+                        command=command, host=self.host, max_bytes=max_bytes)
+                out_tail = (out_tail + out_chunk)[-tail_size:]
+                yield out_chunk
+            exit_status = channel.recv_exit_status()
+
+        if 0 != exit_status:
+            raise exceptions.SSHExecCommandFailed(
+                command=command, exit_status=exit_status,
+                strerror=err_tail + out_tail)
+
+    def iter_command(self, command, lines=False, max_bytes=None,
+                     tail_size=TAIL_SIZE, get_pty=False):
+        """Execute the specified command on the server and yield its
+        standard output while it is being read, so that large outputs
+        are not kept in memory.
+
+        Errors are raised after the whole output has been yielded.
+
+        :param lines: yield lines instead of chunks of output
+        :param max_bytes: reading stops with SSHOutputLimitExceeded
+                          when output is larger
+        :param tail_size: number of last bytes of standard output and
+                          error kept for SSHExecCommandFailed
+        :raises: SSHExecCommandFailed if command returns nonzero
+                 status, SSHOutputLimitExceeded, TimeoutException
+        """
+        chunks = self._iter_output(command, max_bytes, tail_size, get_pty)
+        if lines:
+            return _iter_lines(chunks)
+        return chunks
+
+    def exec_command(self, command):
+        """Execute the specified command on the server.
+
+        Note that this method is reading whole command outputs to memory, thus
+        shouldn't be used for large outputs.
+
+        :returns: data read from standard output of the command.
+        :raises: SSHExecCommandFailed if command returns nonzero
+                 status. The exception contains command status stderr content.
+        """
+        exit_status, out_data, err_data = self._execute(command)
         if 0 != exit_status:
             raise exceptions.SSHExecCommandFailed(
                 command=command, exit_status=exit_status,
@@ -174,6 +434,23 @@ class Client(object):
 
         return True
 
+    def _connect_to_vm(self, ssh, vm, user, password):
+        """Returns transport to the instance tunnelled through ssh
+        connection to the host.
+        """
+        _intermediate_channel = \
+            ssh.get_transport().open_channel('direct-tcpip',
+                                             (vm, 22),
+                                             (self.host, 0))
+        transport = paramiko.Transport(_intermediate_channel)
+        try:
+            transport.start_client()
+            transport.auth_password(user, password)
+        except Exception:
+            transport.close()
+            raise
+        return transport
+
     def exec_command_on_vm(self, command, user, password, vm):
         """Execute the specified command on the instance.
 
@@ -184,40 +461,38 @@ class Client(object):
         :raises: SSHExecCommandFailed if command returns nonzero
             status. The exception contains command status stderr content.
         """
-        ssh = self._get_ssh_connection()
-        _intermediate_transport = ssh.get_transport()
-        _intermediate_channel = \
-            _intermediate_transport.open_channel('direct-tcpip',
-                                                 (vm, 22),
-                                                 (self.host, 0))
-        transport = paramiko.Transport(_intermediate_channel)
-        transport.start_client()
-        transport.auth_password(user, password)
-        channel = transport.open_session()
-        channel.exec_command(command)
-        exit_status = channel.recv_exit_status()
-        channel.shutdown_write()
         out_data = []
         err_data = []
         LOG.debug("Run cmd {0} on vm {1}".format(command, vm))
-        select_params = [channel], [], [], self.channel_timeout
-        while True:
-            ready = select.select(*select_params)
-            if not any(ready):
-                raise exceptions.TimeoutException(
-                    "Command: '{0}' executed on host '{1}'.".format(
-                        command, self.host))
-            if not ready[0]:        # If there is nothing to read.
-                continue
-            out_chunk = err_chunk = None
-            if channel.recv_ready():
-                out_chunk = channel.recv(self.buf_size)
-                out_data += out_chunk,
-            if channel.recv_stderr_ready():
-                err_chunk = channel.recv_stderr(self.buf_size)
-                err_data += err_chunk,
-            if channel.closed and not err_chunk and not out_chunk:
-                break
+        vm_error = None
+        # connection to the host is held, so that it is not closed
+        # under transport to the instance
+        with self._get_pooled_connection() as ssh:
+            vm_key = (self._get_pool_key(), vm, user, password)
+            try:
+                with VM_POOL.connection(
+                        vm_key,
+                        lambda: self._connect_to_vm(ssh, vm, user, password)
+                ) as transport:
+                    channel = transport.open_session()
+                    try:
+                        channel.exec_command(command)
+                        channel.shutdown_write()
+                        for out_chunk, err_chunk in self._read_channel(
+                                channel, command):
+                            if out_chunk:
+                                out_data.append(out_chunk)
+                            if err_chunk:
+                                err_data.append(err_chunk)
+                        exit_status = channel.recv_exit_status()
+                    finally:
+                        channel.close()
+            except Exception:
+                # errors of the instance drop only transport to it,
+                # connection to the host is checked when taken next time
+                vm_error = sys.exc_info()
+        if vm_error is not None:
+            raise vm_error[0], vm_error[1], vm_error[2]
         if 0 != exit_status:
             LOG.warning(
                 'Command {0} finishes with non-zero exit code {1}'.format(
@@ -231,3 +506,159 @@ class Client(object):
 
     def close_ssh_connection(self, connection):
         connection.close()
+
+
+class HostResult(collections.namedtuple(
+        'HostResult',
+        ['host', 'command', 'exit_status', 'output', 'error', 'elapsed'])):
+    """Result of command executed on one of hosts.
+
+    exit_status is None and error is set if command was not executed
+    to the end, e.g. host is unreachable or time is over.
+    """
+
+    @property
+    def succeeded(self):
+        return self.exit_status == 0
+
+
+class FanOutResult(object):
+    """Results of command executed on several hosts."""
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    def __getitem__(self, host):
+        return self.results[host]
+
+    def __iter__(self):
+        return iter(self.results.values())
+
+    @property
+    def succeeded(self):
+        return [result for result in self if result.succeeded]
+
+    @property
+    def failed(self):
+        return [result for result in self if not result.succeeded]
+
+    @property
+    def outputs(self):
+        """Standard outputs of succeeded commands by hosts."""
+        return collections.OrderedDict(
+            (result.host, result.output) for result in self.succeeded)
+
+    def check(self):
+        """Raises error of the first failed host, if any.
+
+        :returns: self
+        """
+        for result in self.failed:
+            raise result.error
+        return self
+
+
+def _exec_on_host(client, command):
+    if callable(command):
+        command = command(client.host)
+
+    start_time = time.time()
+    exit_status = output = error = None
+    try:
+        exit_status, out_data, err_data = client._execute(command)
+        output = ''.join(out_data)
+        if 0 != exit_status:
+            error = exceptions.SSHExecCommandFailed(
+                command=command, exit_status=exit_status,
+                strerror=''.join(err_data).join(out_data))
+    except Exception as exc:
+        LOG.debug('Failed to execute %s on %s', command, client.host,
+                  exc_info=True)
+        error = exc
+    return HostResult(client.host, command, exit_status, output, error,
+                      time.time() - start_time)
+
+
+def exec_command_on_hosts(clients, command, workers=FAN_OUT_WORKERS,
+                          timeout=None):
+    """Executes command on hosts of clients concurrently.
+
+    Every host is limited by timeouts of its client, while timeout
+    limits all of them: hosts which have not finished by then get
+    TimeoutException as error. Unlike exec_command, nonzero exit
+    status does not raise but is reported in results.
+
+    :param clients: list of Client, one per host
+    :param command: command or callable returning command for host
+    :param workers: max number of hosts executing command at once
+    :param timeout: number of seconds to wait for all hosts
+    :returns: FanOutResult ordered as clients
+    :raises: ValueError if several clients connect to the same host
+    """
+    hosts = collections.Counter(client.host for client in clients)
+    duplicates = sorted(host for host, count in hosts.items() if count > 1)
+    if duplicates:
+        raise ValueError('Several clients are given for hosts: {0}'.format(
+            ', '.join(duplicates)))
+
+    start_time = time.time()
+    pending = Queue.Queue()
+    for index, client in enumerate(clients):
+        pending.put((index, client))
+
+    # results by index of client
+    results = {}
+    finished = threading.Condition()
+
+    def work():
+        while True:
+            try:
+                index, client = pending.get_nowait()
+            except Queue.Empty:
+                return
+            result = _exec_on_host(client, command)
+            with finished:
+                results[index] = result
+                finished.notify()
+
+    # threads are not joined, so stuck hosts do not delay the caller
+    for _ in range(min(workers, len(clients))):
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+
+    with finished:
+        while len(results) < len(clients):
+            # waiting with timeout lets signals (e.g. alarm of verify)
+            # interrupt main thread
+            wait_for = 1
+            if timeout is not None:
+                wait_for = min(wait_for,
+                               start_time + timeout - time.time())
+                if wait_for <= 0:
+                    break
+            finished.wait(wait_for)
+
+        # hosts which have not been started are not started anymore
+        while not pending.empty():
+            try:
+                pending.get_nowait()
+            except Queue.Empty:
+                break
+
+        ordered = collections.OrderedDict()
+        for index, client in enumerate(clients):
+            if index in results:
+                ordered[client.host] = results[index]
+                continue
+            host_command = command(client.host) if callable(command) \
+                else command
+            ordered[client.host] = HostResult(
+                client.host, host_command, None, None,
+                exceptions.TimeoutException(
+                    "Command: '{0}' executed on host '{1}'.".format(
+                        host_command, client.host)),
+                time.time() - start_time)
+
+    return FanOutResult(ordered, time.time() - start_time)
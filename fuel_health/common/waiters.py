@@ -0,0 +1,142 @@
+# Copyright 2016 Mirantis, Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Waiting for resources to get to expected state.
+
+Conditions are checked at once and then after intervals which grow
+exponentially up to max_interval, each shortened by random jitter so
+that tests waiting together do not poll APIs in lockstep. Several
+waits may share one Deadline, so that all of them fit into one
+budget of time.
+"""
+
+import logging
+import random
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+INITIAL_INTERVAL = 1
+BACKOFF_FACTOR = 2
+MAX_INTERVAL = 10
+
+# max part of interval cut off randomly
+JITTER = 0.2
+
+
+class Deadline(object):
+    """Point of time by which waits sharing it have to be over.
+
+    Deadline without timeout never expires.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.expires_at = None
+        if timeout is not None:
+            self.expires_at = time.time() + timeout
+
+    def remaining(self):
+        """Returns number of seconds left or None if unlimited."""
+        if self.expires_at is None:
+            return None
+        return max(0, self.expires_at - time.time())
+
+    @property
+    def expired(self):
+        return self.remaining() == 0
+
+    def limit(self, timeout):
+        """Returns deadline which is over after timeout, but not later
+        than this one.
+        """
+        remaining = self.remaining()
+        if timeout is None or (remaining is not None and
+                               remaining < timeout):
+            timeout = remaining
+        return Deadline(timeout)
+
+
+def get_intervals(initial=INITIAL_INTERVAL, factor=BACKOFF_FACTOR,
+                  max_interval=MAX_INTERVAL, jitter=JITTER):
+    """Yields intervals between checks endlessly."""
+    interval = min(initial, max_interval)
+    while True:
+        yield interval * (1 - jitter * random.random())
+        interval = min(interval * factor, max_interval)
+
+
+def wait_for(predicate, timeout=None, deadline=None,
+             initial=INITIAL_INTERVAL, factor=BACKOFF_FACTOR,
+             max_interval=MAX_INTERVAL, jitter=JITTER):
+    """Calls predicate until it returns true value or time is over.
+
+    Predicate is called once more when time is over, exceptions
+    raised by it are not caught.
+
+    :param timeout: number of seconds to wait, unlimited if None
+    :param deadline: Deadline shared with other waits, timeout is
+                     cut to fit into it
+    :returns: True if predicate returned true value, False otherwise
+    """
+    if deadline is None:
+        deadline = Deadline(timeout)
+    elif timeout is not None:
+        deadline = deadline.limit(timeout)
+
+    for interval in get_intervals(initial, factor, max_interval, jitter):
+        if predicate():
+            return True
+
+        remaining = deadline.remaining()
+        if remaining == 0:
+            return False
+        if remaining is not None:
+            interval = min(interval, remaining)
+        LOG.debug("Sleeping for %.1f seconds", interval)
+        time.sleep(interval)
+
+
+def wait_for_all(list_resources, ids, is_ready, timeout=None,
+                 deadline=None, **kwargs):
+    """Waits for several resources of the same type, getting all of
+    them with single list call per check instead of call per each.
+
+    :param list_resources: callable taking ids of resources which are
+                           still waited for and returning iterable of
+                           resources, which may include other ones
+    :param ids: ids of resources
+    :param is_ready: callable taking resource, or None if it is not
+                     listed, which returns whether resource is ready
+                     and may raise if it will never be
+    :param kwargs: parameters of backoff as of wait_for
+    :returns: set of ids of resources which are not ready in time
+    """
+    pending = set(ids)
+
+    def check():
+        resources = dict(
+            (resource.id, resource)
+            for resource in list_resources(frozenset(pending))
+            if resource.id in pending
+        )
+        for resource_id in list(pending):
+            if is_ready(resources.get(resource_id)):
+                pending.discard(resource_id)
+        return not pending
+
+    wait_for(check, timeout=timeout, deadline=deadline, **kwargs)
+    return pending
@@ -164,6 +164,12 @@ class SSHExecCommandFailed(FuelException):
                "Error:\n%(strerror)s")
 
 
+class SSHOutputLimitExceeded(FuelException):
+    """Raised when output of remotely executed command is too large."""
+    message = ("Output of command '%(command)s' executed on host "
+               "'%(host)s' exceeds %(max_bytes)d bytes")
+
+
 class ServerUnreachable(FuelException):
     message = "The server is not reachable via the configured network"
 
@@ -25,6 +25,16 @@ from fuel_health.test import BaseTestCase
 
 LOG = logging.getLogger(__name__)
 
+# max size of pacemaker XML read from controller
+PCS_XML_MAX_SIZE = 32 * 1024 * 1024
+
+
+def _get_xml_root(xml):
+    """Returns root of XML given as string or as parsed element."""
+    if isinstance(xml, basestring):
+        return etree.fromstring(xml)
+    return xml
+
 
 class RabbitSanityClass(BaseTestCase):
     """TestClass contains RabbitMQ sanity checks."""
@@ -388,6 +398,19 @@ class TestPacemakerBase(BaseTestCase):
             LOG.exception("Failed on run ssh cmd")
             self.fail("%s command failed." % cmd)
 
+    def _get_ssh_cmd_xml(self, host, cmd):
+        """Open SSH session with host, execute command and parse its
+        XML output while it is being read.
+        """
+        sshclient = ssh.Client(host, self.controller_user,
+                               self.controllers_pwd,
+                               key_filename=self.controller_key,
+                               timeout=self.timeout)
+        parser = etree.XMLParser()
+        for chunk in sshclient.iter_command(cmd, max_bytes=PCS_XML_MAX_SIZE):
+            parser.feed(chunk)
+        return parser.close()
+
     def _register_resource(self, res, res_name, resources):
         if res_name not in resources:
             resources[res_name] = {
@@ -425,7 +448,8 @@ class TestPacemakerBase(BaseTestCase):
             resources[res_name]['stopped'] += 1
 
     def get_pcs_resources(self, pcs_status):
-        """Get pacemaker resources status to a python dict:
+        """Get pacemaker resources status, given as XML string or parsed
+        XML, to a python dict:
             return:
                 {
                   str: {                        # Resource name
@@ -442,7 +466,7 @@ class TestPacemakerBase(BaseTestCase):
                   ...
                 }
         """
-        root = etree.fromstring(pcs_status)
+        root = _get_xml_root(pcs_status)
         resources = {}
 
         for res_group in root.iter('resources'):
@@ -462,7 +486,7 @@ class TestPacemakerBase(BaseTestCase):
         return resources
 
     def get_pcs_nodes(self, pcs_status):
-        root = etree.fromstring(pcs_status)
+        root = _get_xml_root(pcs_status)
         nodes = {'Online': [], 'Offline': []}
         for nodes_group in root.iter('nodes'):
             for node in nodes_group:
@@ -475,7 +499,8 @@ class TestPacemakerBase(BaseTestCase):
     def get_pcs_constraints(self, constraints_xml):
         """Parse pacemaker constraints
 
-        :param constraints_xml: XML string contains pacemaker constraints
+        :param constraints_xml: XML string or parsed XML contains
+                                pacemaker constraints
         :return dict:
             {string:                # Resource name,
                 {'attrs': list,     # List of dicts for resource
@@ -489,7 +514,7 @@ class TestPacemakerBase(BaseTestCase):
 
         """
 
-        root = etree.fromstring(constraints_xml)
+        root = _get_xml_root(constraints_xml)
         constraints = {}
         # 1. Get all attributes from constraints for each resource
         for con_group in root.iter('constraints'):
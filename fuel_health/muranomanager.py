@@ -28,6 +28,7 @@ import muranoclient.common.exceptions as exceptions
 import requests
 
 from fuel_health.common.utils.data_utils import rand_name
+from fuel_health.common import waiters
 import fuel_health.nmanager
 
 LOG = logging.getLogger(__name__)
@@ -324,10 +325,13 @@ class MuranoTest(fuel_health.nmanager.PlatformServicesBaseClass):
         Returns environment.
         """
 
-        environment = self.get_environment(environment.id)
-        while environment.status != 'ready':
-            time.sleep(5)
-            environment = self.get_environment(environment.id)
+        environments = [self.get_environment(environment.id)]
+
+        def is_ready():
+            if environments[-1].status == 'ready':
+                return True
+            environment = self.get_environment(environments[-1].id)
+            environments.append(environment)
             if environment.status == 'deploy failure':
                 LOG.error(
                     'Environment has incorrect status'
@@ -335,7 +339,11 @@ class MuranoTest(fuel_health.nmanager.PlatformServicesBaseClass):
                 self.fail(
                     'Environment has incorrect status'
                     ' %s .' % environment.status)
-        return environment
+            return environment.status == 'ready'
+
+        # deployment is limited by timeout of the calling step
+        waiters.wait_for(is_ready, max_interval=5)
+        return environments[-1]
 
     def deployments_status_check(self, environment_id):
         """This method allows to check that deployment status is 'success'.
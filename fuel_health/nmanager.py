@@ -77,6 +77,7 @@ import novaclient.exceptions as nova_exc
 from fuel_health.common import ssh as f_ssh
 from fuel_health.common.utils.data_utils import rand_int_id
 from fuel_health.common.utils.data_utils import rand_name
+from fuel_health.common import waiters
 from fuel_health import exceptions
 import fuel_health.manager
 import fuel_health.test
@@ -92,6 +93,33 @@ class OfficialClientManager(fuel_health.manager.Manager):
     NOVACLIENT_VERSION = '2'
     CINDERCLIENT_VERSION = '2'
 
+    # clients which are created on first access, since many of them
+    # authenticate in keystone on their own
+    LAZY_CLIENTS = {
+        'glance_client': lambda self: self._get_glance_client(),
+        'volume_client': lambda self: self._get_volume_client(),
+        'heat_client': lambda self: self._get_heat_client(),
+        'murano_client': lambda self: self._get_murano_client(),
+        'sahara_client': lambda self: self._get_sahara_client(),
+        'ceilometer_client': lambda self: self._get_ceilometer_client(),
+        'neutron_client': lambda self: self._get_neutron_client(),
+        'glance_client_v1': lambda self: self._get_glance_client(version=1),
+        'ironic_client': lambda self: self._get_ironic_client(),
+        'aodh_client': lambda self: self._get_aodh_client(),
+        'artifacts_client': lambda self: self._get_artifacts_client(),
+        'murano_art_client':
+            lambda self: self._get_murano_client(artifacts=True),
+    }
+
+    def __getattr__(self, name):
+        # called only for attributes which are not set yet
+        factory = self.LAZY_CLIENTS.get(name)
+        if factory is None or not self.__dict__.get('clients_initialized'):
+            raise AttributeError(name)
+        client = factory(self)
+        setattr(self, name, client)
+        return client
+
     def __init__(self):
         super(OfficialClientManager, self).__init__()
         self.clients_initialized = False
@@ -116,18 +144,7 @@ class OfficialClientManager(fuel_health.manager.Manager):
             LOG.exception("Unexpected error durring intialize keystoneclient")
 
         if self.clients_initialized:
-            self.glance_client = self._get_glance_client()
-            self.volume_client = self._get_volume_client()
-            self.heat_client = self._get_heat_client()
-            self.murano_client = self._get_murano_client()
-            self.sahara_client = self._get_sahara_client()
-            self.ceilometer_client = self._get_ceilometer_client()
-            self.neutron_client = self._get_neutron_client()
-            self.glance_client_v1 = self._get_glance_client(version=1)
-            self.ironic_client = self._get_ironic_client()
-            self.aodh_client = self._get_aodh_client()
-            self.artifacts_client = self._get_artifacts_client()
-            self.murano_art_client = self._get_murano_client(artifacts=True)
+            # the rest of clients are created by __getattr__
             self.client_attr_names = [
                 'compute_client',
                 'identity_client',
@@ -460,6 +477,32 @@ class OfficialClientTest(fuel_health.test.TestCase):
         fuel_health.test.call_until_true(
             is_deletion_complete, 20, 10)
 
+    def _delete_servers(self, servers, timeout=20, deadline=None):
+        """Deletes servers and waits for all of them to be gone,
+        checking them with single list() call per check.
+
+        :param deadline: waiters.Deadline shared with other waits
+        :returns: list of servers which are not deleted in time
+        """
+        LOG.debug("Deleting %d servers.", len(servers))
+        remaining = []
+        for server in servers:
+            try:
+                self.compute_client.servers.delete(server)
+            except Exception as exc:
+                if exc.__class__.__name__ == 'NotFound':
+                    continue
+                LOG.exception("Failed to delete server {0}".format(server))
+            remaining.append(server)
+
+        pending = waiters.wait_for_all(
+            lambda ids: fuel_health.test.list_things(
+                self.compute_client.servers, ids),
+            [server.id for server in remaining],
+            lambda server: server is None,
+            timeout, deadline=deadline, max_interval=10)
+        return [server for server in remaining if server.id in pending]
+
     def retry_command(self, retries, timeout, method, *args, **kwargs):
         for i in range(retries):
             try:
@@ -957,6 +1000,8 @@ class NovaNetworkScenarioTest(OfficialClientTest):
     @classmethod
     def tearDownClass(cls):
         super(NovaNetworkScenarioTest, cls).tearDownClass()
+        # transports to instances are useless after they are deleted
+        f_ssh.close_all_connections()
         if cls.manager.clients_initialized:
             cls._clean_floating_ips()
             cls._clear_security_groups()
@@ -1183,11 +1228,9 @@ class PlatformServicesBaseClass(NovaNetworkScenarioTest):
     def _wait_for_deletion(self, get_method, timeout, sleep):
         """This method waits for the resource deletion."""
 
-        start = time.time()
-        while time.time() - start < timeout:
-            if self.is_resource_deleted(get_method):
-                return
-            time.sleep(sleep)
+        if waiters.wait_for(lambda: self.is_resource_deleted(get_method),
+                            timeout, max_interval=sleep):
+            return
 
         self.fail('Request timed out. '
                   'Timed out while waiting for one of the test resources '
@@ -1432,16 +1475,24 @@ class SmokeChecksTest(OfficialClientTest):
         return server
 
     def _wait_server_param(self, client, server, param_name,
-                           tries=1, timeout=1, expected_value=None):
-        while tries:
-            val = getattr(server, param_name, None)
-            if val:
-                if (not expected_value) or (expected_value == val):
-                    return server
-            time.sleep(timeout)
-            server = client.servers.get(server.id)
-            tries -= 1
-        return server
+                           tries=1, timeout=1, expected_value=None,
+                           deadline=None):
+        """Waits for server to get param, returns the last server got.
+
+        :param deadline: waiters.Deadline shared with other waits
+        """
+        servers = [server]
+
+        def has_param():
+            val = getattr(servers[-1], param_name, None)
+            if val and ((not expected_value) or (expected_value == val)):
+                return True
+            servers.append(client.servers.get(server.id))
+
+        # the last server got is checked after the time is over
+        waiters.wait_for(has_param, tries * timeout, deadline=deadline,
+                         max_interval=timeout)
+        return servers[-1]
 
     def _attach_volume_to_instance(self, volume, instance):
         device = '/dev/vdb'
@@ -16,6 +16,7 @@ import logging
 import time
 
 from fuel_health.common.utils.data_utils import rand_name
+from fuel_health.common import waiters
 from fuel_health import nmanager
 
 LOG = logging.getLogger(__name__)
@@ -136,19 +137,21 @@ class SaharaTestsManager(nmanager.PlatformServicesBaseClass):
         """
 
         LOG.debug('Waiting for cluster to build and get to "Active" status...')
-        previous_cluster_status = 'An unknown cluster status'
-        start = time.time()
-        while time.time() - start < self.cluster_timeout:
+        previous_cluster_status = ['An unknown cluster status']
+
+        def is_active():
             cluster = self.sahara_client.clusters.get(cluster_id)
-            if cluster.status != previous_cluster_status:
+            if cluster.status != previous_cluster_status[0]:
                 LOG.debug('Currently cluster is '
                           'in "{0}" status.'.format(cluster.status))
-                previous_cluster_status = cluster.status
-            if cluster.status == 'Active':
-                return
+                previous_cluster_status[0] = cluster.status
             if cluster.status == 'Error':
                 self.fail('Cluster failed to build and is in "Error" status.')
-            time.sleep(self.request_timeout)
+            return cluster.status == 'Active'
+
+        if waiters.wait_for(is_active, self.cluster_timeout,
+                            max_interval=self.request_timeout):
+            return
 
         self.fail('Cluster failed to get to "Active" '
                   'status within {0} seconds.'.format(self.cluster_timeout))
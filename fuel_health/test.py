@@ -14,14 +14,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import time
-
 import testresources
 import unittest2
 
 from fuel_health.common import log as logging
 from fuel_health.common import ssh
 from fuel_health.common import test_mixins
+from fuel_health.common import waiters
 from fuel_health import config
 
 
@@ -50,21 +49,45 @@ def call_until_true(func, duration, sleep_for, *args):
     :param func: A zero argument callable that returns True on success.
     :param duration: The number of seconds for which to attempt a
         successful call of the function.
-    :param sleep_for: The number of seconds to sleep after an unsuccessful
-                      invocation of the function.
+    :param sleep_for: The max number of seconds to sleep after an
+                      unsuccessful invocation of the function, sleeps
+                      start shorter and grow up to it.
+    """
+    return waiters.wait_for(
+        lambda: func(*args), duration,
+        initial=min(sleep_for, waiters.INITIAL_INTERVAL),
+        max_interval=sleep_for)
+
+
+def list_things(things, thing_ids):
+    """Returns things of given ids which exist, for waits on several
+    things at once.
+
+    Single thing is got alone. Managers of clients do not filter list()
+    by ids in the same way, so several things are picked from the whole
+    list with one call.
+    """
+    if len(thing_ids) == 1:
+        thing_id, = thing_ids
+        try:
+            return [things.get(thing_id)]
+        except Exception as exc:
+            if exc.__class__.__name__ == 'NotFound':
+                return []
+            raise
+    return [thing for thing in things.list() if thing.id in thing_ids]
+
+
+class _ManagerClient(object):
+    """Class attribute giving client of manager of the class, so that
+    the client is created only when the test uses it.
     """
-    now = time.time()
-    timeout = now + duration
-    while now < timeout:
-        if args:
-            if func(*args):
-                return True
-        elif func():
-            return True
-        LOG.debug("Sleeping for %d seconds", sleep_for)
-        time.sleep(sleep_for)
-        now = time.time()
-    return False
+
+    def __init__(self, attr_name):
+        self.attr_name = attr_name
+
+    def __get__(self, obj, cls):
+        return getattr(cls.manager, self.attr_name)
 
 
 class TestCase(BaseTestCase):
@@ -82,9 +105,8 @@ class TestCase(BaseTestCase):
         for attr_name in cls.manager.client_attr_names:
             # Ensure that pre-existing class attributes won't be
             # accidentally overridden.
-            assert not hasattr(cls, attr_name)
-            client = getattr(cls.manager, attr_name)
-            setattr(cls, attr_name, client)
+            assert attr_name not in dir(cls)
+            setattr(cls, attr_name, _ManagerClient(attr_name))
         cls.resource_keys = {}
         cls.os_resources = []
 
@@ -102,33 +124,61 @@ class TestCase(BaseTestCase):
         self.os_resources.remove(thing)
         del self.resource_keys[key]
 
-    def status_timeout(self, things, thing_id, expected_status):
+    def _check_thing_status(self, thing, expected_status):
+        new_status = thing.status.lower()
+        if new_status == 'error':
+            self.fail("Failed to get to expected status. "
+                      "In error state.")
+        elif new_status == expected_status.lower():
+            return True  # All good.
+        LOG.debug("Waiting for %s to get to %s status. "
+                  "Currently in %s status",
+                  thing, expected_status, new_status)
+        return False
+
+    def status_timeout(self, things, thing_id, expected_status,
+                       deadline=None):
         """Given a thing and an expected status, do a loop, sleeping
         for a configurable amount of time, checking for the
         expected status to show. At any time, if the returned
         status of the thing is ERROR, fail out.
+
+        :param deadline: waiters.Deadline shared with other waits
         """
         def check_status():
             # python-novaclient has resources available to its client
             # that all implement a get() method taking an identifier
             # for the singular resource to retrieve.
             thing = things.get(thing_id)
-            new_status = thing.status.lower()
-            if new_status == 'error':
-                self.fail("Failed to get to expected status. "
-                          "In error state.")
-            elif new_status == expected_status.lower():
-                return True  # All good.
-            LOG.debug("Waiting for %s to get to %s status. "
-                      "Currently in %s status",
-                      thing, expected_status, new_status)
+            return self._check_thing_status(thing, expected_status)
         conf = config.FuelConfig()
-        if not call_until_true(check_status,
-                               conf.compute.build_timeout,
-                               conf.compute.build_interval):
+        if not waiters.wait_for(check_status,
+                                conf.compute.build_timeout,
+                                deadline=deadline,
+                                max_interval=conf.compute.build_interval):
             self.fail("Timed out waiting to become %s"
                       % expected_status)
 
+    def statuses_timeout(self, things, thing_ids, expected_status,
+                         deadline=None):
+        """Same as status_timeout, but waits for several things which
+        are got with single list() call per check.
+
+        :param deadline: waiters.Deadline shared with other waits
+        """
+        def is_ready(thing):
+            # thing may be not listed yet
+            return thing is not None and \
+                self._check_thing_status(thing, expected_status)
+        conf = config.FuelConfig()
+        pending = waiters.wait_for_all(
+            lambda ids: list_things(things, ids), thing_ids, is_ready,
+            conf.compute.build_timeout, deadline=deadline,
+            max_interval=conf.compute.build_interval)
+        if pending:
+            self.fail("Timed out waiting for %s to become %s"
+                      % (', '.join(pending), expected_status))
+
     def run_ssh_cmd_with_exit_code(self, host, cmd):
         """Open SSH session with host and execute command.
 
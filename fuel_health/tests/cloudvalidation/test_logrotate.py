@@ -15,6 +15,7 @@
 import logging
 
 from fuel_health import cloudvalidation
+from fuel_health.common import ssh
 
 LOG = logging.getLogger(__name__)
 
@@ -39,15 +40,18 @@ class LogRotationTest(cloudvalidation.CloudValidationTest):
         )
 
         fail_msg = 'Logrotate is not configured on node(s) %s'
+        clients = [
+            ssh.Client(host, self.usr, self.pwd,
+                       key_filename=self.key, timeout=self.timeout)
+            for host in self.controllers + self.computes
+        ]
+        LOG.info('STEP:1, checking logrotate')
+        results = ssh.exec_command_on_hosts(clients, cmd, timeout=20)
         failed = set()
-        for host in self.controllers + self.computes:
-            try:
-                self.verify(
-                    5, self.run_ssh_cmd_with_exit_code,
-                    1, fail_msg % host,
-                    'checking logrotate', host, cmd)
-            except AssertionError:
-                failed.add(host)
+        for result in results.failed:
+            LOG.warning('Checking logrotate on %s failed: %s',
+                        result.host, result.error)
+            failed.add(result.host)
 
         failed_hosts = ', '.join(failed)
         self.verify_response_true(len(failed) == 0, fail_msg % failed_hosts, 1)
@@ -49,6 +49,24 @@ class HAProxyCheck(test.BaseTestCase):
         :param ignore_nodes: List
         :return dict
         """
+        return remote.exec_command(self._get_haproxy_status_cmd(
+            services, nodes, ignore_services, ignore_nodes))
+
+    def _check_haproxy_backends(self, remotes,
+                                services=None, nodes=None,
+                                ignore_services=None, ignore_nodes=None):
+        """Same as _check_haproxy_backend, but checks backends on all
+        remotes at once.
+        :param remotes: List of SSHClient
+        :return OrderedDict of outputs by hosts
+        """
+        cmd = self._get_haproxy_status_cmd(
+            services, nodes, ignore_services, ignore_nodes)
+        return ssh.exec_command_on_hosts(remotes, cmd).check().outputs
+
+    @staticmethod
+    def _get_haproxy_status_cmd(services=None, nodes=None,
+                                ignore_services=None, ignore_nodes=None):
         cmd = 'haproxy-status.sh | egrep -v "BACKEND|FRONTEND"'
 
         pos_filter = (services, nodes)
@@ -57,7 +75,7 @@ class HAProxyCheck(test.BaseTestCase):
         grep.extend(
             ['|egrep -v "{0}"'.format('|'.join(n)) for n in neg_filter if n])
 
-        return remote.exec_command("{0}{1}".format(cmd, ''.join(grep)))
+        return "{0}{1}".format(cmd, ''.join(grep))
 
     def test_001_check_state_of_backends(self):
         """Check state of haproxy backends on controllers
@@ -70,20 +88,23 @@ class HAProxyCheck(test.BaseTestCase):
         Available since release: 2015.1.0-8.0
         """
         LOG.info("Controllers nodes are %s" % self.controllers)
-        for controller in self.controllers:
-            remote = ssh.Client(controller, self.controller_user,
-                                key_filename=self.controller_key,
-                                timeout=100)
-            ignore_services = []
-            if 'neutron' not in self.config.network.network_provider:
-                ignore_services.append('nova-metadata-api')
-            haproxy_status = self.verify(
-                10, self._check_haproxy_backend, 1,
-                "Can't get state of backends.",
-                "Getting state of backends",
-                remote,
-                ignore_services=ignore_services)
+        remotes = [
+            ssh.Client(controller, self.controller_user,
+                       key_filename=self.controller_key,
+                       timeout=100)
+            for controller in self.controllers
+        ]
+        ignore_services = []
+        if 'neutron' not in self.config.network.network_provider:
+            ignore_services.append('nova-metadata-api')
+        statuses = self.verify(
+            10, self._check_haproxy_backends, 1,
+            "Can't get state of backends.",
+            "Getting state of backends",
+            remotes,
+            ignore_services=ignore_services)
 
+        for haproxy_status in statuses.values():
             dead_backends = filter(lambda x: 'DOWN' in x,
                                    haproxy_status.splitlines())
             backends_message = "Dead backends {0}"\
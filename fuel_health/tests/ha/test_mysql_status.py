@@ -111,21 +111,30 @@ class TestMysqlStatus(BaseMysqlTest):
         if len(databases) == 1:
             self.skipTest(self.one_db_msg)
 
+        clients = [
+            ssh.Client(node, self.node_user,
+                       key_filename=self.node_key,
+                       timeout=self.config.compute.ssh_timeout)
+            for node in databases
+        ]
+
+        def list_tables(command):
+            # tables are listed on all nodes at once
+            return ssh.exec_command_on_hosts(
+                clients, command, timeout=40).check().outputs
+
         for database in dbs:
             LOG.info('Current database name is %s' % database)
             temp_set = set()
-            for node in databases:
+            cmd1 = cmd % {'database': database}
+            LOG.info('Try to execute command %s on nodes %s' %
+                     (cmd1, databases))
+            outputs = self.verify(40, list_tables, 2,
+                                  'Can list tables',
+                                  'get amount of tables for each database',
+                                  cmd1)
+            for node, output in outputs.items():
                 LOG.info('Current database node is %s' % node)
-                cmd1 = cmd % {'database': database}
-                LOG.info('Try to execute command %s' % cmd1)
-                tables = ssh.Client(
-                    node, self.node_user,
-                    key_filename=self.node_key,
-                    timeout=self.config.compute.ssh_timeout)
-                output = self.verify(40, tables.exec_command, 2,
-                                     'Can list tables',
-                                     'get amount of tables for each database',
-                                     cmd1)
                 tables = set(output.splitlines())
                 if len(temp_set) == 0:
                     temp_set = tables
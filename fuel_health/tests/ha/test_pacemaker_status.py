@@ -47,10 +47,11 @@ class TestPacemakerStatus(ha_base.TestPacemakerBase):
             err_msg = ('Cannot get pacemaker status. Execution of the "{0}" '
                        'failed on the controller {0}.'.format(cmd, fqdn))
 
-            pcs_status = self.verify(20, self._run_ssh_cmd, 1, err_msg,
-                                     'get pacemaker status', ip, cmd)[0]
+            pcs_status = self.verify(20, self._get_ssh_cmd_xml, 1, err_msg,
+                                     'get pacemaker status', ip, cmd)
             self.verify_response_true(
-                pcs_status, 'Step 1 failed: Cannot get pacemaker status. Check'
+                pcs_status is not None,
+                'Step 1 failed: Cannot get pacemaker status. Check'
                 ' the pacemaker service on the controller {0}.'.format(fqdn))
 
             cluster_resources[fqdn] = self.get_pcs_resources(pcs_status)
@@ -137,8 +138,8 @@ class TestPacemakerStatus(ha_base.TestPacemakerBase):
                    'failed on the controller {0}.'
                    .format(cmd, self.online_controller_names[0]))
         constraints_xml = self.verify(
-            20, self._run_ssh_cmd, 7, err_msg, 'get pacemaker constraints',
-            self.online_controller_ips[0], cmd)[0]
+            20, self._get_ssh_cmd_xml, 7, err_msg,
+            'get pacemaker constraints', self.online_controller_ips[0], cmd)
         constraints = self.get_pcs_constraints(constraints_xml)
 
         for rsc in constraints:
@@ -54,13 +54,9 @@ class TestInstanceLiveMigration(nmanager.NovaNetworkScenarioTest):
         super(TestInstanceLiveMigration, self).tearDown()
         if self.manager.clients_initialized:
             if self.servers:
-                for server in self.servers:
-                    try:
-                        self._delete_server(server)
-                        self.servers.remove(server)
-                    except Exception:
-                        LOG.exception("Server {0} already \
-                                      deleted.".format(server))
+                # servers left after failed deletion are retried by
+                # tearDown of the next test
+                self.servers[:] = self._delete_servers(self.servers)
 
     def test_001_live_migration(self):
         """Instance live migration
@@ -49,12 +49,9 @@ class TestVcenter(nmanager.NovaNetworkScenarioTest):
         super(TestVcenter, self).tearDown()
         if self.manager.clients_initialized:
             if self.servers:
-                for server in self.servers:
-                    try:
-                        self._delete_server(server)
-                        self.servers.remove(server)
-                    except Exception:
-                        LOG.exception("Server was already deleted.")
+                # servers left after failed deletion are retried by
+                # tearDown of the next test
+                self.servers[:] = self._delete_servers(self.servers)
 
     @classmethod
     def find_flavor_id(cls):
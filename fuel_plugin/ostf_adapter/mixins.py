@@ -12,7 +12,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import copy
+import hashlib
 import logging
+import threading
+import time
 
 try:
     from oslo.config import cfg
@@ -24,7 +29,10 @@ try:
 except ImportError:
     from oslo_serialization import jsonutils
 
+from gevent import event
+from gevent import threadpool
 import requests
+from requests import adapters
 from sqlalchemy.orm import joinedload
 
 from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
@@ -32,9 +40,89 @@ from fuel_plugin.ostf_adapter.storage import models
 
 LOG = logging.getLogger(__name__)
 
-TEST_REPOSITORY = []
 # TODO(ikutukov): remove hardcoded Nailgun API urls here and below
 NAILGUN_VERSION_API_URL = 'http://{0}:{1}/api/v1/version'
+NAILGUN_API_URL = 'http://{0}:{1}/{2}'
+
+# keep-alive session and pool of workers shared by all requests to Nailgun
+_NAILGUN_SESSION = None
+_NAILGUN_FETCH_POOL = None
+
+# (cluster_id, digest of auth token) -> derived cluster attributes with
+# their expiration time and validators (ETag, Last-Modified) of Nailgun
+# resources they're built of. Attributes are kept per token, since what
+# Nailgun returns depends on who asks, so one user never gets attributes
+# fetched with token of another one.
+_CLUSTER_ATTRS_CACHE = {}
+# the same key -> result of fetch which is performing at the moment
+_CLUSTER_ATTRS_FETCHES = {}
+
+# (repository generation, fingerprint of cluster tags and release) ->
+# testing pattern computed from snapshot of TEST_REPOSITORY
+_TESTING_PATTERNS_CACHE = {}
+
+TestSetRecord = collections.namedtuple(
+    'TestSetRecord',
+    ['test_set_id', 'deployment_tags', 'available_since_release', 'tests'])
+
+TestRecord = collections.namedtuple(
+    'TestRecord', ['name', 'deployment_tags', 'available_since_release'])
+
+RepositorySnapshot = collections.namedtuple(
+    'RepositorySnapshot', ['generation', 'test_sets'])
+
+
+class TestRepository(object):
+    """Test sets and tests data needed to build testing patterns.
+
+    Data is kept as immutable snapshot which is replaced as a whole on
+    reload, so readers never see partially loaded repository. Generation
+    of snapshot is increased on every reload and can be used as a key
+    by caches of data derived from repository.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = RepositorySnapshot(0, ())
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def swap(self, test_sets):
+        """Replaces repository content with given test set records."""
+        test_sets = tuple(test_sets)
+        with self._lock:
+            self._snapshot = RepositorySnapshot(
+                self._snapshot.generation + 1, test_sets)
+            return self._snapshot
+
+    def reload(self, session):
+        test_sets = session.query(models.TestSet)\
+            .options(joinedload('tests'))\
+            .all()
+
+        return self.swap(
+            TestSetRecord(
+                test_set_id=test_set.id,
+                deployment_tags=nose_utils.compile_deployment_tags(
+                    test_set.deployment_tags),
+                available_since_release=test_set.available_since_release,
+                tests=tuple(
+                    TestRecord(
+                        name=test.name,
+                        deployment_tags=nose_utils.compile_deployment_tags(
+                            test.deployment_tags),
+                        available_since_release=test.available_since_release
+                    )
+                    for test in test_set.tests
+                )
+            )
+            for test_set in test_sets
+        )
+
+
+TEST_REPOSITORY = TestRepository()
 
 
 def delete_db_data(session):
@@ -42,35 +130,23 @@ def delete_db_data(session):
     session.query(models.ClusterTestingPattern).delete()
     session.query(models.ClusterState).delete()
     session.query(models.TestSet).delete()
+    # all modules are inspected by the next discovery
+    session.query(models.DiscoveryManifest).delete()
 
     session.commit()
 
+    invalidate_cluster_attrs()
 
-def cache_test_repository(session):
-    test_repository = session.query(models.TestSet)\
-        .options(joinedload('tests'))\
-        .all()
-
-    crucial_tests_attrs = ['name', 'deployment_tags',
-                           'available_since_release']
-    for test_set in test_repository:
-        data_elem = dict()
-
-        data_elem['test_set_id'] = test_set.id
-        data_elem['deployment_tags'] = test_set.deployment_tags
-        data_elem['available_since_release'] = test_set.available_since_release
-        data_elem['tests'] = []
-
-        for test in test_set.tests:
-            test_dict = dict([(attr_name, getattr(test, attr_name))
-                              for attr_name in crucial_tests_attrs])
-            data_elem['tests'].append(test_dict)
 
-        TEST_REPOSITORY.append(data_elem)
+def cache_test_repository(session):
+    snapshot = TEST_REPOSITORY.reload(session)
+    # patterns of previous generations won't be requested anymore
+    _TESTING_PATTERNS_CACHE.clear()
+    return snapshot
 
 
 def discovery_check(session, cluster_id, token=None):
-    cluster_attrs = _get_cluster_attrs(cluster_id, token=token)
+    cluster_attrs = get_cluster_attrs(cluster_id, token=token)
 
     cluster_data = {
         'id': cluster_id,
@@ -86,7 +162,8 @@ def discovery_check(session, cluster_id, token=None):
         session.add(
             models.ClusterState(
                 id=cluster_data['id'],
-                deployment_tags=list(cluster_data['deployment_tags'])
+                deployment_tags=list(cluster_data['deployment_tags']),
+                release_version=cluster_data['release_version']
             )
         )
 
@@ -99,6 +176,12 @@ def discovery_check(session, cluster_id, token=None):
         return
 
     old_deployment_tags = cluster_state.deployment_tags
+    if set(old_deployment_tags) != cluster_data['deployment_tags'] or \
+            cluster_state.release_version != cluster_data['release_version']:
+        # cluster is redeployed, attributes cached for other tokens
+        # are outdated
+        invalidate_cluster_attrs(cluster_id)
+
     if set(old_deployment_tags) != cluster_data['deployment_tags']:
         session.query(models.ClusterTestingPattern)\
             .filter_by(cluster_id=cluster_state.id)\
@@ -108,9 +191,17 @@ def discovery_check(session, cluster_id, token=None):
 
         cluster_state.deployment_tags = \
             list(cluster_data['deployment_tags'])
+        cluster_state.release_version = cluster_data['release_version']
 
         session.merge(cluster_state)
 
+    elif cluster_state.release_version != cluster_data['release_version']:
+        # release is not known for clusters saved by older versions,
+        # their patterns are skipped by refresh_testing_patterns
+        _update_cluster_testing_pattern(session, cluster_data)
+
+        cluster_state.release_version = cluster_data['release_version']
+
 
 def get_version_string(token=None):
     requests_session = requests.Session()
@@ -124,35 +215,182 @@ def get_version_string(token=None):
         return "Can't obtain version via Nailgun API"
 
 
-def _get_cluster_attrs(cluster_id, token=None):
-    cluster_attrs = {}
+def _get_nailgun_session():
+    """Returns requests session which is reused for all calls to Nailgun
+    so that keep-alive connections are not reestablished on every request.
+    """
+    global _NAILGUN_SESSION
+
+    if _NAILGUN_SESSION is None:
+        session = requests.Session()
+        session.trust_env = False
+        session.verify = False
+
+        http_adapter = adapters.HTTPAdapter(
+            pool_maxsize=cfg.CONF.adapter.nailgun_concurrency)
+        session.mount('http://', http_adapter)
+        session.mount('https://', http_adapter)
+
+        _NAILGUN_SESSION = session
 
-    REQ_SES = requests.Session()
-    REQ_SES.trust_env = False
-    REQ_SES.verify = False
+    return _NAILGUN_SESSION
 
+
+def _get_nailgun_fetch_pool():
+    """Returns pool which performs requests to Nailgun concurrently.
+
+    Adapter does not monkey patch sockets, so blocking calls are made in
+    native threads of gevent pool while calling greenlet just waits
+    for results without blocking the server's event loop.
+    """
+    global _NAILGUN_FETCH_POOL
+
+    if _NAILGUN_FETCH_POOL is None:
+        _NAILGUN_FETCH_POOL = threadpool.ThreadPool(
+            cfg.CONF.adapter.nailgun_concurrency)
+
+    return _NAILGUN_FETCH_POOL
+
+
+def _nailgun_request(api_url, token=None, headers=None):
+    headers = dict(headers or {})
     if token is not None:
-        REQ_SES.headers.update({'X-Auth-Token': token})
+        headers['X-Auth-Token'] = token
 
-    URL = 'http://{0}:{1}/{2}'
-    NAILGUN_API_URL = 'api/clusters/{0}'
+    request_url = NAILGUN_API_URL.format(cfg.CONF.adapter.nailgun_host,
+                                         cfg.CONF.adapter.nailgun_port,
+                                         api_url)
 
-    cluster_url = NAILGUN_API_URL.format(cluster_id)
-    request_url = URL.format(cfg.CONF.adapter.nailgun_host,
-                             cfg.CONF.adapter.nailgun_port,
-                             cluster_url)
+    return _get_nailgun_session().get(request_url, headers=headers)
 
-    response = REQ_SES.get(request_url).json()
-    release_id = response.get('release_id', 'failed to get id')
 
-    release_url = URL.format(
-        cfg.CONF.adapter.nailgun_host, cfg.CONF.adapter.nailgun_port,
-        'api/releases/{0}'.format(release_id))
+def _nailgun_get(api_url, token=None, validators=None):
+    """Returns decoded response of Nailgun API. If validators dict
+    is given then cache validators of the resource are saved into it.
+    """
+    response = _nailgun_request(api_url, token=token)
+
+    if validators is not None:
+        validators[api_url] = {
+            'If-None-Match': response.headers.get('ETag'),
+            'If-Modified-Since': response.headers.get('Last-Modified'),
+        }
+
+    return response.json()
+
+
+def _is_not_modified(api_url, conditions, token=None):
+    conditions = dict((header, value) for header, value
+                      in conditions.items() if value)
+    if not conditions:
+        return False
+
+    response = _nailgun_request(api_url, token=token, headers=conditions)
+    return response.status_code == requests.codes.not_modified
+
+
+def _revalidate_cluster_attrs(validators, token=None):
+    """Checks with conditional requests whether none of Nailgun resources
+    which cluster attributes are derived from has been changed.
+    """
+    if not validators:
+        return False
+
+    not_modified = _get_nailgun_fetch_pool().map(
+        lambda api_url: _is_not_modified(api_url, validators[api_url], token),
+        validators.keys()
+    )
+    return all(not_modified)
+
+
+def invalidate_cluster_attrs(cluster_id=None):
+    """Drops cached attributes of given cluster or of all clusters
+    if cluster_id is not specified.
+    """
+    if cluster_id is None:
+        _CLUSTER_ATTRS_CACHE.clear()
+        return
+
+    for key in list(_CLUSTER_ATTRS_CACHE):
+        if key[0] == str(cluster_id):
+            del _CLUSTER_ATTRS_CACHE[key]
+
+
+def _get_cluster_attrs_key(cluster_id, token):
+    # token itself is not kept by the cache
+    token_digest = hashlib.sha1(token).hexdigest() if token else None
+    return str(cluster_id), token_digest
+
+
+def get_cluster_attrs(cluster_id, token=None):
+    """Returns attributes of cluster derived from Nailgun data.
+
+    Attributes are cached for cluster_attrs_cache_ttl seconds. After that
+    they are revalidated with conditional requests to Nailgun and are
+    fetched again only if some of the resources have changed. Simultaneous
+    calls for the same cluster share single fetch.
+    """
+    ttl = cfg.CONF.adapter.cluster_attrs_cache_ttl
+    if ttl <= 0:
+        return _get_cluster_attrs(cluster_id, token=token)
+
+    key = _get_cluster_attrs_key(cluster_id, token)
+
+    pending = _CLUSTER_ATTRS_FETCHES.get(key)
+    if pending is not None:
+        return copy.deepcopy(pending.get())
+
+    cached = _CLUSTER_ATTRS_CACHE.get(key)
+    if cached and time.time() < cached['expires_at']:
+        return copy.deepcopy(cached['attrs'])
+
+    pending = _CLUSTER_ATTRS_FETCHES[key] = event.AsyncResult()
+    try:
+        if cached and _revalidate_cluster_attrs(cached['validators'], token):
+            LOG.debug('Cached attributes of cluster %s are still valid.',
+                      cluster_id)
+        else:
+            validators = {}
+            cluster_attrs = _get_cluster_attrs(
+                cluster_id, token=token, validators=validators)
+            cached = {'attrs': cluster_attrs, 'validators': validators}
+
+        cached['expires_at'] = time.time() + ttl
+        _CLUSTER_ATTRS_CACHE[key] = cached
+        pending.set(cached['attrs'])
+    except Exception as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        del _CLUSTER_ATTRS_FETCHES[key]
+
+    return copy.deepcopy(cached['attrs'])
+
+
+def _get_cluster_attrs(cluster_id, token=None, validators=None):
+    cluster_attrs = {}
+
+    pool = _get_nailgun_fetch_pool()
 
-    nodes_url = URL.format(
-        cfg.CONF.adapter.nailgun_host, cfg.CONF.adapter.nailgun_port,
-        'api/nodes?cluster_id={0}'.format(cluster_id))
-    nodes_response = REQ_SES.get(nodes_url).json()
+    cluster_url = 'api/clusters/{0}'.format(cluster_id)
+
+    # cluster, its nodes and attributes do not depend on each other
+    # so they are requested simultaneously
+    cluster_request = pool.spawn(
+        _nailgun_get, cluster_url, token, validators)
+    nodes_request = pool.spawn(
+        _nailgun_get, 'api/nodes?cluster_id={0}'.format(cluster_id),
+        token, validators)
+    attributes_request = pool.spawn(
+        _nailgun_get, cluster_url + '/attributes', token, validators)
+
+    response = cluster_request.get()
+    release_id = response.get('release_id', 'failed to get id')
+    release_request = pool.spawn(
+        _nailgun_get, 'api/releases/{0}'.format(release_id),
+        token, validators)
+
+    nodes_response = nodes_request.get()
     if 'objects' in nodes_response:
         nodes_response = nodes_response['objects']
     enable_without_ceph = filter(lambda node: 'ceph-osd' in node['roles'],
@@ -162,11 +400,14 @@ def _get_cluster_attrs(cluster_id, token=None):
     dpdk_compute_ids = []  # Check env has computes with DPDK
     compute_ids = [node['id'] for node in nodes_response
                    if "compute" in node['roles']]
-    for compute_id in compute_ids:
-        ifaces_url = URL.format(
-            cfg.CONF.adapter.nailgun_host, cfg.CONF.adapter.nailgun_port,
-            'api/nodes/{id}/interfaces'.format(id=compute_id))
-        ifaces_resp = REQ_SES.get(ifaces_url).json()
+
+    computes_ifaces = pool.map(
+        lambda compute_id: _nailgun_get(
+            'api/nodes/{id}/interfaces'.format(id=compute_id),
+            token, validators),
+        compute_ids
+    )
+    for compute_id, ifaces_resp in zip(compute_ids, computes_ifaces):
         for iface in ifaces_resp:
             if 'interface_properties' in iface:
                 if ('sriov' in iface['interface_properties'] and
@@ -202,7 +443,7 @@ def _get_cluster_attrs(cluster_id, token=None):
     if fuel_version:
         deployment_tags.add(fuel_version)
 
-    release_data = REQ_SES.get(release_url).json()
+    release_data = release_request.get()
 
     if 'version' in release_data:
         cluster_attrs['release_version'] = release_data['version']
@@ -218,8 +459,7 @@ def _get_cluster_attrs(cluster_id, token=None):
     deployment_tags.add(network_type)
 
     # info about murano/sahara clients installation
-    request_url += '/' + 'attributes'
-    response = REQ_SES.get(request_url).json()
+    response = attributes_request.get()
 
     public_assignment = response['editable'].get('public_network_assignment')
     if not public_assignment or \
@@ -315,29 +555,114 @@ def _get_cluster_attrs(cluster_id, token=None):
     return cluster_attrs
 
 
-def _add_cluster_testing_pattern(session, cluster_data):
-    to_database = []
+def _get_cluster_fingerprint(cluster_data):
+    """Returns hash of data which testing pattern of cluster depends on.
+    """
+    return hashlib.sha1(jsonutils.dumps([
+        sorted(cluster_data['deployment_tags']),
+        cluster_data['release_version']
+    ])).hexdigest()
 
-    global TEST_REPOSITORY
 
-    # populate cache if it's empty
-    if not TEST_REPOSITORY:
-        cache_test_repository(session)
+def _get_testing_pattern(snapshot, cluster_data):
+    """Returns list of (test_set_id, tests names) pairs available for
+    cluster. Clusters with equal deployment tags and release share
+    the same pattern.
+    """
+    key = (snapshot.generation, _get_cluster_fingerprint(cluster_data))
 
-    for test_set in TEST_REPOSITORY:
-        if nose_utils.is_test_available(cluster_data, test_set):
+    testing_pattern = _TESTING_PATTERNS_CACHE.get(key)
+    if testing_pattern is None:
+        testing_pattern = []
+        for test_set in snapshot.test_sets:
+            if nose_utils.is_test_available(cluster_data, test_set):
+                tests = tuple(
+                    test.name for test in test_set.tests
+                    if nose_utils.is_test_available(cluster_data, test)
+                )
+                testing_pattern.append((test_set.test_set_id, tests))
 
-            testing_pattern = {}
-            testing_pattern['cluster_id'] = cluster_data['id']
-            testing_pattern['test_set_id'] = test_set['test_set_id']
-            testing_pattern['tests'] = []
+        testing_pattern = tuple(testing_pattern)
+        _TESTING_PATTERNS_CACHE[key] = testing_pattern
 
-            for test in test_set['tests']:
-                if nose_utils.is_test_available(cluster_data, test):
-                    testing_pattern['tests'].append(test['name'])
+    return testing_pattern
 
-            to_database.append(
-                models.ClusterTestingPattern(**testing_pattern)
-            )
 
-    session.add_all(to_database)
+def _add_cluster_testing_pattern(session, cluster_data):
+    snapshot = TEST_REPOSITORY.snapshot
+
+    # populate repository if it has never been loaded
+    if not snapshot.generation:
+        snapshot = cache_test_repository(session)
+
+    session.add_all([
+        models.ClusterTestingPattern(
+            cluster_id=cluster_data['id'],
+            test_set_id=test_set_id,
+            tests=list(tests)
+        )
+        for test_set_id, tests in _get_testing_pattern(snapshot, cluster_data)
+    ])
+
+
+def _update_cluster_testing_pattern(session, cluster_data,
+                                    test_sets_ids=None):
+    """Brings testing pattern of cluster in line with test repository.
+
+    Pattern is updated in place, so that test runs of test sets
+    which are still available for the cluster are kept.
+
+    :param test_sets_ids: test sets to be updated, all if None
+    """
+    snapshot = TEST_REPOSITORY.snapshot
+    if not snapshot.generation:
+        snapshot = cache_test_repository(session)
+
+    testing_pattern = dict(_get_testing_pattern(snapshot, cluster_data))
+
+    query = session.query(models.ClusterTestingPattern)\
+        .filter_by(cluster_id=cluster_data['id'])
+    wanted = set(testing_pattern)
+    if test_sets_ids is not None:
+        query = query.filter(
+            models.ClusterTestingPattern.test_set_id.in_(test_sets_ids))
+        wanted &= set(test_sets_ids)
+
+    existing = dict((pattern.test_set_id, pattern) for pattern in query)
+    for test_set_id, pattern in existing.items():
+        if test_set_id not in wanted:
+            session.delete(pattern)
+
+    for test_set_id in wanted:
+        tests = list(testing_pattern[test_set_id])
+        if test_set_id in existing:
+            existing[test_set_id].tests = tests
+        else:
+            session.add(models.ClusterTestingPattern(
+                cluster_id=cluster_data['id'],
+                test_set_id=test_set_id,
+                tests=tests
+            ))
+
+
+def refresh_testing_patterns(session, test_sets_ids):
+    """Updates testing patterns of known clusters for test sets which
+    were changed by discovery, test runs of other test sets are kept.
+    """
+    if not test_sets_ids:
+        return
+
+    # patterns are computed from current state of session
+    cache_test_repository(session)
+
+    for cluster_state in session.query(models.ClusterState):
+        # pattern of cluster checked before release was stored
+        # is rebuilt by next discovery_check
+        if cluster_state.release_version is None:
+            continue
+
+        _update_cluster_testing_pattern(session, {
+            'id': cluster_state.id,
+            'deployment_tags': set(cluster_state.deployment_tags or []),
+            'release_version': cluster_state.release_version,
+        }, test_sets_ids)
@@ -0,0 +1,179 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Static discovery of test sets and tests.
+
+Modules are parsed with ast instead of being imported, so test sets
+profiles and tests docstrings are read without importing clients
+which tests depend on. Modules which cannot be understood statically
+are reported back to be inspected by nose.
+"""
+
+import ast
+import collections
+import logging
+
+from nose import config
+from nose import util
+
+
+LOG = logging.getLogger(__name__)
+
+TEST_MATCH = config.Config().testMatch
+
+ParsedModule = collections.namedtuple(
+    'ParsedModule', ['filename', 'name', 'profile', 'tests'])
+
+
+class UnsupportedModule(Exception):
+    """Module defines tests in a way nose has to be asked about."""
+
+
+def _literal_assignments(body):
+    """Returns values of names assigned with literals in given body."""
+    assignments = {}
+    for node in body:
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                try:
+                    assignments[target.id] = ast.literal_eval(node.value)
+                except ValueError:
+                    assignments[target.id] = UnsupportedModule
+    return assignments
+
+
+def _is_generator(function):
+    return any(isinstance(node, ast.Yield) for node in ast.walk(function))
+
+
+class _ModuleParser(object):
+
+    def __init__(self, tree, module_name):
+        self.module_name = module_name
+        self.classes = dict(
+            (node.name, node) for node in tree.body
+            if isinstance(node, ast.ClassDef)
+        )
+        self.functions = [
+            node for node in tree.body if isinstance(node, ast.FunctionDef)
+        ]
+        self.assignments = _literal_assignments(tree.body)
+
+    def get_profile(self):
+        profile = self.assignments.get('__profile__')
+        if profile is UnsupportedModule:
+            raise UnsupportedModule('__profile__ is not a literal')
+        return profile
+
+    def _local_bases(self, class_node):
+        return [
+            self.classes[base.id] for base in class_node.bases
+            if isinstance(base, ast.Name) and base.id in self.classes
+        ]
+
+    def _is_test_case(self, class_node):
+        """Checks whether class may be unittest.TestCase subclass.
+
+        Classes derived from anything defined outside of module are
+        assumed to be test cases, as tests of fuel_health are.
+        """
+        for base in class_node.bases:
+            if isinstance(base, ast.Name) and base.id == 'object':
+                continue
+            if isinstance(base, ast.Name) and base.id in self.classes:
+                if self._is_test_case(self.classes[base.id]):
+                    return True
+                continue
+            return True
+        return False
+
+    def _wants_class(self, class_node):
+        declared = _literal_assignments(class_node.body).get('__test__')
+        if declared is UnsupportedModule:
+            raise UnsupportedModule(
+                '__test__ of {0} is not a literal'.format(class_node.name))
+        if declared is not None:
+            return bool(declared)
+        return not class_node.name.startswith('_') and (
+            self._is_test_case(class_node) or
+            bool(TEST_MATCH.search(class_node.name)))
+
+    def _methods(self, class_node):
+        methods = collections.OrderedDict()
+        for base in reversed(self._local_bases(class_node)):
+            methods.update(self._methods(base))
+        for node in class_node.body:
+            if isinstance(node, ast.FunctionDef):
+                methods[node.name] = node
+        return methods
+
+    def get_tests(self):
+        """Returns list of (test id, raw docstring) pairs."""
+        for function in self.functions:
+            if TEST_MATCH.search(function.name) and \
+                    not function.name.startswith('_'):
+                raise UnsupportedModule(
+                    'test function {0}'.format(function.name))
+
+        tests = []
+        for class_name in sorted(self.classes):
+            class_node = self.classes[class_name]
+            if not self._wants_class(class_node):
+                continue
+
+            for name, method in self._methods(class_node).items():
+                if name.startswith('_') or not TEST_MATCH.search(name):
+                    continue
+                if _is_generator(method):
+                    raise UnsupportedModule(
+                        'test generator {0}'.format(name))
+
+                test_id = '{0}.{1}.{2}'.format(
+                    self.module_name, class_name, name)
+                tests.append(
+                    (test_id, ast.get_docstring(method, clean=False)))
+        return tests
+
+
+def parse_module(filename):
+    """Returns ParsedModule with profile of test set and tests
+    defined in module.
+
+    :raises: UnsupportedModule, SyntaxError, IOError
+    """
+    with open(filename) as f:
+        tree = ast.parse(f.read(), filename)
+
+    parser = _ModuleParser(tree, util.getpackage(filename))
+    return ParsedModule(filename, parser.module_name,
+                        parser.get_profile(), parser.get_tests())
+
+
+def parse_modules(filenames):
+    """Parses given modules.
+
+    :returns: list of ParsedModule and list of modules which
+              have to be inspected by nose
+    """
+    parsed = []
+    unparsed = []
+    for filename in filenames:
+        try:
+            parsed.append(parse_module(filename))
+        except (UnsupportedModule, SyntaxError, IOError) as e:
+            LOG.info('%s cannot be parsed statically: %s', filename, e)
+            unparsed.append(filename)
+    return parsed, unparsed
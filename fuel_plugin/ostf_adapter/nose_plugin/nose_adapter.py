@@ -27,7 +27,9 @@ from fuel_plugin.ostf_adapter import logger
 from fuel_plugin.ostf_adapter.nose_plugin import nose_storage_plugin
 from fuel_plugin.ostf_adapter.nose_plugin import nose_test_runner
 from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
+from fuel_plugin.ostf_adapter.nose_plugin import nose_workers
 from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import events
 from fuel_plugin.ostf_adapter.storage import models
 
 
@@ -58,52 +60,86 @@ class NoseDriver(object):
         else:
             argv_add = [test_set.test_path] + test_set.additional_arguments
 
-        results_log = logger.ResultsLogger(test_set.id, test_run.cluster_id)
-
         lock_path = cfg.CONF.adapter.lock_dir
-        test_run.pid = nose_utils.run_proc(self._run_tests,
-                                           lock_path,
-                                           dbpath,
-                                           test_run.id,
-                                           test_run.cluster_id,
-                                           ostf_os_access_creds,
-                                           argv_add,
-                                           token,
-                                           results_log).pid
+        args = (lock_path, dbpath, test_run.id, test_run.cluster_id,
+                ostf_os_access_creds, argv_add, token, test_set.id)
+
+        # pid of pre-forked worker is saved to test_run by the worker itself
+        pool = nose_workers.get_pool()
+        if pool is not None:
+            pool.submit(test_set.driver, args)
+        else:
+            test_run.pid = nose_utils.run_proc(self._run_tests, *args).pid
+
+    def _acquire_locks(self, lock_path, testrun):
+        """Locks test sets which cannot be executed simultaneously
+        with test set of testrun.
+        """
+        if not os.path.exists(lock_path):
+            LOG.error('There is no directory to store locks')
+            raise Exception('There is no directory to store locks')
+
+        aquired_locks = []
+        for serie in testrun.test_set.exclusive_testsets:
+            lock_name = serie + str(testrun.cluster_id)
+            fd = open(os.path.join(lock_path, lock_name), 'w')
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            aquired_locks.append(fd)
+        return aquired_locks
+
+    def _execute(self, session, dbpath, test_run_id, cluster_id,
+                 ostf_os_access_creds, token, results_log, argv_add):
+        """Runs tests selected by argv_add and saves their results."""
+        storage_plugin = nose_storage_plugin.StoragePlugin(
+            session, test_run_id, str(cluster_id),
+            ostf_os_access_creds, token, results_log
+        )
+        try:
+            nose_test_runner.SilentTestProgram(
+                addplugins=[storage_plugin],
+                exit=False,
+                argv=['ostf_tests'] + argv_add)
+        except InterruptTestRunException:
+            # results are saved without being interrupted again
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+            storage_plugin.interrupt()
+            raise
 
     def _run_tests(self, lock_path, dbpath, test_run_id,
                    cluster_id, ostf_os_access_creds, argv_add, token,
-                   results_log):
+                   test_set_id):
         cleanup_flag = False
+        results_log = logger.ResultsLogger(test_set_id, cluster_id)
 
         def raise_exception_handler(signum, stack_frame):
             raise InterruptTestRunException()
         signal.signal(signal.SIGUSR1, raise_exception_handler)
 
         with engine.contexted_session(dbpath) as session:
+            # row is locked, so that test run is not stopped
+            # between check of its status and saving of pid
             testrun = session.query(models.TestRun)\
                 .filter_by(id=test_run_id)\
+                .with_for_update()\
                 .one()
 
+            # test run may be stopped while it waits for free worker
+            if testrun.status != consts.TESTRUN_STATUSES.running:
+                LOG.info('Test run %s is stopped before start.',
+                         test_run_id)
+                return
+
+            # pid is used to stop the test run
+            testrun.pid = os.getpid()
+            session.commit()
+
+            aquired_locks = []
             try:
-                if not os.path.exists(lock_path):
-                    LOG.error('There is no directory to store locks')
-                    raise Exception('There is no directory to store locks')
-
-                aquired_locks = []
-                for serie in testrun.test_set.exclusive_testsets:
-                    lock_name = serie + str(testrun.cluster_id)
-                    fd = open(os.path.join(lock_path, lock_name), 'w')
-                    fcntl.flock(fd, fcntl.LOCK_EX)
-                    aquired_locks.append(fd)
-
-                nose_test_runner.SilentTestProgram(
-                    addplugins=[nose_storage_plugin.StoragePlugin(
-                        session, test_run_id, str(cluster_id),
-                        ostf_os_access_creds, token, results_log
-                    )],
-                    exit=False,
-                    argv=['ostf_tests'] + argv_add)
+                aquired_locks = self._acquire_locks(lock_path, testrun)
+
+                self._execute(session, dbpath, test_run_id, cluster_id,
+                              ostf_os_access_creds, token, results_log,
+                              argv_add)
 
             except InterruptTestRunException:
                 # (dshulyak) after process is interrupted we need to
@@ -120,6 +156,8 @@ class NoseDriver(object):
 
                 models.TestRun.update_test_run(
                     session, test_run_id, updated_data)
+                events.publish(session, test_run_id, cluster_id,
+                               status=consts.TESTRUN_STATUSES.finished)
 
                 for fd in aquired_locks:
                     fcntl.flock(fd, fcntl.LOCK_UN)
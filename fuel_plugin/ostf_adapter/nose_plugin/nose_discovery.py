@@ -12,12 +12,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import hashlib
 import logging
 import os
 import re
 
+from nose import config
 from nose import plugins
+from nose import selector
 
+from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter.nose_plugin import ast_discovery
 from fuel_plugin.ostf_adapter.nose_plugin import nose_test_runner
 from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
 from fuel_plugin.ostf_adapter.storage import models
@@ -25,6 +31,9 @@ from fuel_plugin.ostf_adapter.storage import models
 
 LOG = logging.getLogger(__name__)
 
+NOSE_BACKEND = 'nose'
+AST_BACKEND = 'ast'
+
 
 class DiscoveryPlugin(plugins.Plugin):
 
@@ -47,27 +56,37 @@ class DiscoveryPlugin(plugins.Plugin):
         module = __import__(module, fromlist=[module])
         LOG.info('Inspecting %s', filename)
         if hasattr(module, '__profile__'):
-            profile = module.__profile__
-
-            profile['deployment_tags'] = [
-                tag.lower() for tag in profile.get('deployment_tags', [])
-            ]
-
-            try:
-                test_set = models.TestSet(**profile)
-                self.session.merge(test_set)
-                self.test_sets[test_set.id] = test_set
-
-                # flush test_sets data into db
-                self.session.commit()
-            except Exception as e:
-                LOG.error(
-                    ('An error has occured while processing'
-                     ' data entity for %s. Error message: %s'),
-                    module.__name__,
-                    e.message
-                )
-            LOG.info('%s discovered.', module.__name__)
+            self.add_test_set(filename, module.__name__, module.__profile__)
+
+    def add_test_set(self, filename, module_name, profile):
+        profile['deployment_tags'] = [
+            tag.lower() for tag in profile.get('deployment_tags', [])
+        ]
+
+        try:
+            test_set = models.TestSet(**profile)
+            self.save_test_set(filename, test_set)
+            self.test_sets[test_set.id] = test_set
+        except Exception as e:
+            LOG.error(
+                ('An error has occured while processing'
+                 ' data entity for %s. Error message: %s'),
+                module_name,
+                e.message
+            )
+        LOG.info('%s discovered.', module_name)
+
+    def save_test_set(self, filename, test_set):
+        self.session.merge(test_set)
+
+        # flush test_sets data into db
+        self.session.commit()
+
+    def save_test(self, filename, test_obj):
+        self.session.merge(test_obj)
+
+        # flush tests data into db
+        self.session.commit()
 
     @classmethod
     def test_belongs_to_testset(cls, test_id, test_set_id):
@@ -78,7 +97,10 @@ class DiscoveryPlugin(plugins.Plugin):
         return bool(test_set_pattern.search(test_id))
 
     def addSuccess(self, test):
-        test_id = test.id()
+        self.add_test(test.address()[0], test.id(),
+                      nose_utils.get_description(test))
+
+    def add_test(self, filename, test_id, description):
         for test_set_id in self.test_sets.keys():
             if self.test_belongs_to_testset(test_id, test_set_id):
                 test_kwargs = {
@@ -91,14 +113,11 @@ class DiscoveryPlugin(plugins.Plugin):
                     "name": test_id,
                 }
 
-                test_kwargs.update(nose_utils.get_description(test))
+                test_kwargs.update(description)
 
                 try:
                     test_obj = models.Test(**test_kwargs)
-                    self.session.merge(test_obj)
-
-                    # flush tests data into db
-                    self.session.commit()
+                    self.save_test(filename, test_obj)
                 except Exception as e:
                     LOG.error(
                         ('An error has occured while '
@@ -110,13 +129,252 @@ class DiscoveryPlugin(plugins.Plugin):
                 LOG.info('%s added for %s', test_id, test_set_id)
 
 
-def discovery(path, session):
+def _inspect(plugin, paths, backend=NOSE_BACKEND):
+    """Feeds plugin with test sets and tests found on provided paths.
+
+    With ast backend modules are parsed without importing them,
+    modules which cannot be parsed are inspected by nose. Tests are
+    added after all test sets are known, as nose does for tests of
+    package test sets.
+    """
+    parsed = []
+    if backend == AST_BACKEND:
+        modules = set()
+        for path in paths:
+            modules.update(_find_modules(path))
+
+        parsed, paths = ast_discovery.parse_modules(sorted(modules))
+        for module in parsed:
+            if module.profile is not None:
+                plugin.add_test_set(module.filename, module.name,
+                                    module.profile)
+
+    if paths:
+        nose_test_runner.SilentTestProgram(
+            addplugins=[plugin],
+            exit=False,
+            argv=['tests_discovery', '--collect-only', '--nocapture'] +
+            sorted(paths)
+        )
+
+    for module in parsed:
+        for test_id, docstring in module.tests:
+            plugin.add_test(module.filename, test_id,
+                            nose_utils.parse_docstring(docstring))
+
+
+def discovery(path, session, backend=NOSE_BACKEND):
     """Will discover all tests on provided path and save info in db
     """
     LOG.info('Starting discovery for %r.', path)
 
-    nose_test_runner.SilentTestProgram(
-        addplugins=[DiscoveryPlugin(session)],
-        exit=False,
-        argv=['tests_discovery', '--collect-only', '--nocapture', path]
+    _inspect(DiscoveryPlugin(session), [path], backend)
+
+
+class ManifestDiscoveryPlugin(DiscoveryPlugin):
+    """Collects discovered test sets and tests grouped by modules
+    they come from instead of saving them to db one by one.
+
+    :param test_sets_ids: ids of test sets which are already known,
+                          tests belonging to them are collected as well
+    """
+
+    def __init__(self, session, test_sets_ids=()):
+        super(ManifestDiscoveryPlugin, self).__init__(session)
+        self.test_sets = dict.fromkeys(test_sets_ids)
+        self.discovered_test_sets = {}
+        self.discovered_tests = collections.OrderedDict()
+        self.modules = collections.defaultdict(
+            lambda: {'test_sets': set(), 'tests': set()})
+
+    def save_test_set(self, filename, test_set):
+        self.discovered_test_sets[test_set.id] = test_set
+        self.modules[_source_path(filename)]['test_sets'].add(test_set.id)
+
+    def save_test(self, filename, test_obj):
+        self.discovered_tests[(test_obj.test_set_id, test_obj.name)] = \
+            test_obj
+        self.modules[_source_path(filename)]['tests'].add(test_obj.name)
+
+
+def _source_path(filename):
+    """Returns real path of module source file which nose refers
+    to by package directory or compiled file.
+    """
+    if os.path.isdir(filename):
+        filename = os.path.join(filename, '__init__.py')
+    elif filename.endswith(('.pyc', '.pyo')):
+        filename = filename[:-1]
+    return os.path.realpath(filename)
+
+
+def _find_modules(path):
+    """Returns modification times of modules nose would inspect
+    when discovering tests on provided path.
+    """
+    if os.path.isfile(path):
+        return {_source_path(path): os.path.getmtime(path)}
+
+    test_selector = selector.Selector(config.Config())
+
+    modules = {}
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = [
+            dirname for dirname in sorted(dirnames)
+            if test_selector.wantDirectory(os.path.join(dirpath, dirname))
+        ]
+        for filename in filenames:
+            module_path = os.path.join(dirpath, filename)
+            if filename == '__init__.py' or \
+                    test_selector.wantFile(module_path):
+                modules[_source_path(module_path)] = \
+                    os.path.getmtime(module_path)
+    return modules
+
+
+def _get_checksum(module_path):
+    with open(module_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _collect(session, modules_paths, test_sets_ids, backend):
+    plugin = ManifestDiscoveryPlugin(session, test_sets_ids)
+
+    # changed package is inspected along with all its modules
+    # since tests of the package test set are defined in them
+    paths = set(
+        os.path.dirname(module_path)
+        if os.path.basename(module_path) == '__init__.py' else module_path
+        for module_path in modules_paths
     )
+
+    _inspect(plugin, paths, backend)
+    return plugin
+
+
+def incremental_discovery(path, session, backend=NOSE_BACKEND):
+    """Discovers tests on provided path like discovery does, but
+    inspects only modules which were changed since the last
+    discovery according to the manifest stored in db.
+
+    All changes are saved in single transaction. Testing patterns
+    of clusters are updated for changed test sets only, so test runs
+    of other test sets are kept.
+
+    :returns: True if any test set or test was changed
+    """
+    LOG.info('Starting incremental discovery for %r.', path)
+
+    manifest = dict(
+        (entry.path, entry)
+        for entry in session.query(models.DiscoveryManifest)
+    )
+    modules = _find_modules(path)
+
+    changed = {}
+    for module_path, mtime in modules.iteritems():
+        entry = manifest.get(module_path)
+        if entry is not None and entry.mtime == mtime:
+            continue
+
+        checksum = _get_checksum(module_path)
+        if entry is not None and entry.checksum == checksum:
+            entry.mtime = mtime
+            continue
+
+        changed[module_path] = checksum
+
+    removed = set(manifest) - set(modules)
+
+    if not changed and not removed:
+        session.commit()
+        LOG.info('Test modules are not changed since last discovery.')
+        return False
+
+    LOG.info('%s test modules are changed, %s are removed.',
+             len(changed), len(removed))
+
+    stale_test_sets_ids = set()
+    for module_path in set(changed) | removed:
+        if module_path in manifest:
+            stale_test_sets_ids.update(manifest[module_path].test_sets)
+
+    test_sets_ids = set(
+        test_set_id for test_set_id, in session.query(models.TestSet.id))
+
+    plugin = _collect(session, changed,
+                      test_sets_ids - stale_test_sets_ids, backend)
+
+    # tests of unchanged modules can belong to newly added test set
+    if set(plugin.discovered_test_sets) - test_sets_ids:
+        LOG.info('New test sets are found, inspecting all test modules.')
+        plugin = _collect(session, modules, (), backend)
+
+    affected = (set(changed) | removed | set(plugin.modules)) & \
+        (set(modules) | removed)
+
+    old_tests = set()
+    old_test_sets_ids = set()
+    for module_path in affected:
+        if module_path in manifest:
+            old_tests.update(manifest[module_path].tests)
+            old_test_sets_ids.update(manifest[module_path].test_sets)
+
+    new_tests = set(name for _, name in plugin.discovered_tests)
+
+    removed_test_sets_ids = old_test_sets_ids - \
+        set(plugin.discovered_test_sets)
+    if removed_test_sets_ids:
+        # test runs of removed test sets go along with their patterns
+        session.query(models.ClusterTestingPattern)\
+            .filter(models.ClusterTestingPattern.test_set_id.in_(
+                removed_test_sets_ids))\
+            .delete(synchronize_session=False)
+        session.query(models.TestSet)\
+            .filter(models.TestSet.id.in_(removed_test_sets_ids))\
+            .delete(synchronize_session=False)
+
+    if old_tests | new_tests:
+        session.query(models.Test)\
+            .filter(models.Test.name.in_(old_tests | new_tests))\
+            .filter(models.Test.test_run_id.is_(None))\
+            .delete(synchronize_session=False)
+
+    for test_set in plugin.discovered_test_sets.values():
+        session.merge(test_set)
+    session.flush()
+    session.bulk_save_objects(plugin.discovered_tests.values())
+
+    for module_path in affected:
+        if module_path in removed:
+            session.delete(manifest[module_path])
+            continue
+
+        if module_path in changed:
+            checksum = changed[module_path]
+        elif module_path in manifest:
+            checksum = manifest[module_path].checksum
+        else:
+            checksum = _get_checksum(module_path)
+
+        module = plugin.modules.get(module_path, {})
+        session.merge(models.DiscoveryManifest(
+            path=module_path,
+            mtime=modules[module_path],
+            checksum=checksum,
+            test_sets=sorted(module.get('test_sets', [])),
+            tests=sorted(module.get('tests', []))
+        ))
+
+    changed_test_sets_ids = (
+        old_test_sets_ids | set(plugin.discovered_test_sets) |
+        set(test.test_set_id for test in plugin.discovered_tests.values())
+    ) - removed_test_sets_ids
+    session.flush()
+    mixins.refresh_testing_patterns(session, changed_test_sets_ids)
+
+    session.commit()
+
+    LOG.info('%s test sets and %s tests are discovered.',
+             len(plugin.discovered_test_sets), len(plugin.discovered_tests))
+    return True
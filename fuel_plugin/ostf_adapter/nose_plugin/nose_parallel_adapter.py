@@ -0,0 +1,181 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import errno
+import itertools
+import logging
+import os
+import signal
+
+from nose import config
+from nose.plugins import manager
+try:
+    from oslo.config import cfg
+except ImportError:
+    from oslo_config import cfg
+
+from fuel_plugin.ostf_adapter.nose_plugin import nose_adapter
+from fuel_plugin.ostf_adapter.storage import engine
+
+
+LOG = logging.getLogger(__name__)
+
+
+_OPTION_PARSER = None
+
+
+def _get_option_parser():
+    """Returns parser of options of nose and its plugins."""
+    global _OPTION_PARSER
+
+    if _OPTION_PARSER is None:
+        _OPTION_PARSER = config.Config(
+            plugins=manager.DefaultPluginManager()).getParser()
+    return _OPTION_PARSER
+
+
+def _takes_value(arg):
+    """Whether option given by arg is followed by its value."""
+    parser = _get_option_parser()
+    if arg.startswith('--'):
+        option = parser.get_option(arg.split('=', 1)[0])
+        return option is not None and bool(option.takes_value()) and \
+            '=' not in arg
+
+    # short options may be joined, the one taking value ends them
+    for position in range(1, len(arg)):
+        option = parser.get_option('-' + arg[position])
+        if option is not None and option.takes_value():
+            return position == len(arg) - 1
+    return False
+
+
+def _split_options(argv):
+    """Splits nose arguments into options with their values and
+    names of tests.
+    """
+    options = []
+    names = []
+    args = iter(argv)
+    for arg in args:
+        if arg == '--':
+            names.extend(args)
+        elif arg.startswith('-') and arg != '-':
+            options.append(arg)
+            if _takes_value(arg):
+                options.extend(itertools.islice(args, 1))
+        else:
+            names.append(arg)
+    return options, names
+
+
+def group_by_class(argv):
+    """Splits nose arguments into groups of tests of the same class.
+
+    Tests are expected in 'module:Class.method' form, anything else
+    which is not an option makes group of its own. Options are added
+    to every group.
+    """
+    options, names = _split_options(argv)
+
+    groups = collections.OrderedDict()
+    for name in names:
+        module, sep, attr = name.partition(':')
+        key = module + sep + attr.split('.', 1)[0] if sep else name
+        groups.setdefault(key, []).append(name)
+
+    return [tests + options for tests in groups.values()]
+
+
+def _wait(pid):
+    try:
+        os.waitpid(pid, 0)
+    except OSError as e:
+        if e.errno != errno.ECHILD:
+            raise
+
+
+class ParallelNoseDriver(nose_adapter.NoseDriver):
+    """Executes test classes of test set concurrently.
+
+    Every class is executed by forked process which saves results by
+    its own connection to database, at most parallel_workers of them
+    work at once. Tests of one class are executed by the same process,
+    so fixtures of class are set up and torn down once as usual,
+    while fixtures of module are run by every process executing
+    tests of the module.
+    """
+
+    def _execute(self, session, dbpath, test_run_id, cluster_id,
+                 ostf_os_access_creds, token, results_log, argv_add):
+        groups = collections.deque(group_by_class(argv_add))
+        if len(groups) < 2:
+            return super(ParallelNoseDriver, self)._execute(
+                session, dbpath, test_run_id, cluster_id,
+                ostf_os_access_creds, token, results_log, argv_add)
+
+        workers_count = cfg.CONF.adapter.parallel_workers
+
+        # adapter lets exited children be reaped automatically,
+        # but exit of these ones is waited for
+        sigchld_handler = signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        children = set()
+        try:
+            while groups or children:
+                while groups and len(children) < workers_count:
+                    children.add(self._fork(
+                        dbpath, test_run_id, cluster_id,
+                        ostf_os_access_creds, token, results_log,
+                        groups.popleft()))
+
+                pid, _ = os.wait()
+                children.discard(pid)
+
+        except nose_adapter.InterruptTestRunException:
+            # test run is stopped, so are the tests being executed
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGUSR1)
+                except OSError:
+                    pass
+            for pid in children:
+                _wait(pid)
+            raise
+
+        finally:
+            signal.signal(signal.SIGCHLD, sigchld_handler)
+
+    def _fork(self, dbpath, test_run_id, cluster_id,
+              ostf_os_access_creds, token, results_log, argv_add):
+        pid = os.fork()
+        if pid:
+            return pid
+
+        # child inherits handler of SIGUSR1 which interrupts tests
+        exit_code = 1
+        try:
+            with engine.contexted_session(dbpath) as session:
+                super(ParallelNoseDriver, self)._execute(
+                    session, dbpath, test_run_id, cluster_id,
+                    ostf_os_access_creds, token, results_log, argv_add)
+            exit_code = 0
+        except nose_adapter.InterruptTestRunException:
+            exit_code = 0
+        except Exception:
+            LOG.exception('Test run ID: %s, tests %s',
+                          test_run_id, argv_add)
+        finally:
+            # process must not return into code of test run
+            os._exit(exit_code)
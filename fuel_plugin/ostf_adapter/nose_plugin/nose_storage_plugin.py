@@ -12,8 +12,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import logging
 import os
+import threading
 import time
 
 from nose import plugins
@@ -24,6 +26,7 @@ except ImportError:
 
 from fuel_plugin import consts
 from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
+from fuel_plugin.ostf_adapter.storage import events
 from fuel_plugin.ostf_adapter.storage import models
 
 CONF = cfg.CONF
@@ -50,6 +53,12 @@ class StoragePlugin(plugins.Plugin):
         self._start_time = None
         self.token = token
 
+        # test_id -> latest data to be saved, results are written
+        # to db in batches by flush()
+        self._pending_results = collections.OrderedDict()
+        self._flush_lock = threading.RLock()
+        self._flush_timer = None
+
     def options(self, parser, env=os.environ):
         env['NAILGUN_HOST'] = str(CONF.adapter.nailgun_host)
         env['NAILGUN_PORT'] = str(CONF.adapter.nailgun_port)
@@ -67,12 +76,10 @@ class StoragePlugin(plugins.Plugin):
     def _add_test_results(self, test, data):
         test_id = test.id()
 
-        models.Test.add_result(
-            self.session,
-            self.test_run_id,
-            test_id,
-            data
-        )
+        # several status transitions of the same test are coalesced,
+        # only the latest of them is written
+        self._pending_results[test_id] = data
+
         if data['status'] != consts.TEST_STATUSES.running:
             test_name = nose_utils.get_description(test)["title"]
             self.results_log.log_results(
@@ -103,9 +110,59 @@ class StoragePlugin(plugins.Plugin):
 
         tests_to_update = nose_utils.get_tests_to_update(test)
 
-        for test in tests_to_update:
-            self._add_test_results(test, data)
-        self.session.commit()
+        with self._flush_lock:
+            for test in tests_to_update:
+                self._add_test_results(test, data)
+
+            flush_interval = CONF.adapter.storage_flush_interval
+            is_terminal = status != consts.TEST_STATUSES.running
+
+            if flush_interval <= 0 or \
+                    (is_terminal and
+                     CONF.adapter.storage_flush_on_terminal_status):
+                self.flush()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(flush_interval,
+                                                    self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Writes all buffered results to db."""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+            if not self._pending_results:
+                return
+
+            results = self._pending_results.items()
+            models.Test.add_results(self.session, self.test_run_id, results)
+            events.publish(self.session, self.test_run_id, self.cluster_id,
+                           results=results)
+            self.session.commit()
+
+            self._pending_results.clear()
+
+    def finalize(self, result):
+        with self._flush_lock:
+            # tests which are still running at this point are being
+            # interrupted, their status is set by the one who stops them
+            for test_id, data in self._pending_results.items():
+                if data['status'] == consts.TEST_STATUSES.running:
+                    del self._pending_results[test_id]
+
+            self.flush()
+
+    def interrupt(self):
+        """Writes results buffered by the time test run is stopped,
+        since plugins are not finalized then.
+        """
+        with self._flush_lock:
+            # flush may be interrupted in the middle of transaction
+            self.session.rollback()
+            self.finalize(None)
 
     def addSuccess(self, test, capt=None):
         self._add_message(test, status=consts.TEST_STATUSES.success)
@@ -21,7 +21,10 @@ class SilentTestRunner(core.TextTestRunner):
         the test result class.
         """
         result = self._makeResult()
-        test(result)
+        try:
+            test(result)
+        finally:
+            self.config.plugins.finalize(result)
         return result
 
 
@@ -13,7 +13,7 @@
 #    under the License.
 
 from distutils import version
-import itertools
+import errno
 import multiprocessing
 import os
 import re
@@ -70,45 +70,52 @@ def get_description(test_obj):
     this method works pretty buggy.
     """
     if isinstance(test_obj, case.Test):
-        docstring = test_obj.test._testMethodDoc
-
-        test_data = {}
-        if docstring:
-            deployment_tags_pattern = r'Deployment tags:.?(?P<tags>.+)?'
-            docstring, deployment_tags = _process_docstring(
-                docstring,
-                deployment_tags_pattern
-            )
-
-            # if deployment tags is empty or absent
-            # _process_docstring returns None so we
-            # must check this and prevent
-            if deployment_tags:
-                deployment_tags = [
-                    tag.strip().lower() for tag in deployment_tags.split(',')
-                ]
-                test_data['deployment_tags'] = deployment_tags
-
-            rel_vers_pattern = "Available since release:.?(?P<rel_vers>.+)"
-            docstring, rel_vers = _process_docstring(
-                docstring,
-                rel_vers_pattern
-            )
-            if rel_vers:
-                test_data["available_since_release"] = rel_vers
-
-            duration_pattern = r'Duration:.?(?P<duration>.+)'
-            docstring, duration = _process_docstring(
-                docstring,
-                duration_pattern
-            )
-            if duration:
-                test_data['duration'] = duration
-
-            docstring = docstring.split('\n')
-            test_data['title'] = docstring.pop(0)
-            test_data['description'] = \
-                u'\n'.join(docstring) if docstring else u""
+        return parse_docstring(test_obj.test._testMethodDoc)
+    return {}
+
+
+def parse_docstring(docstring):
+    """Gets title, description, duration, deployment tags and
+    release since which test is available from raw docstring
+    of test method.
+    """
+    test_data = {}
+    if docstring:
+        deployment_tags_pattern = r'Deployment tags:.?(?P<tags>.+)?'
+        docstring, deployment_tags = _process_docstring(
+            docstring,
+            deployment_tags_pattern
+        )
+
+        # if deployment tags is empty or absent
+        # _process_docstring returns None so we
+        # must check this and prevent
+        if deployment_tags:
+            deployment_tags = [
+                tag.strip().lower() for tag in deployment_tags.split(',')
+            ]
+            test_data['deployment_tags'] = deployment_tags
+
+        rel_vers_pattern = "Available since release:.?(?P<rel_vers>.+)"
+        docstring, rel_vers = _process_docstring(
+            docstring,
+            rel_vers_pattern
+        )
+        if rel_vers:
+            test_data["available_since_release"] = rel_vers
+
+        duration_pattern = r'Duration:.?(?P<duration>.+)'
+        docstring, duration = _process_docstring(
+            docstring,
+            duration_pattern
+        )
+        if duration:
+            test_data['duration'] = duration
+
+        docstring = docstring.split('\n')
+        test_data['title'] = docstring.pop(0)
+        test_data['description'] = \
+            u'\n'.join(docstring) if docstring else u""
 
     return test_data
 
@@ -152,6 +159,14 @@ def run_proc(func, *args):
     return proc
 
 
+def pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno != errno.ESRCH
+    return True
+
+
 def get_module(module_path):
     pass
 
@@ -176,25 +191,55 @@ def get_tests_to_update(test):
     return tests
 
 
+class DeploymentTags(tuple):
+    """Deployment tags of test entity compiled into conjunction of
+    alternatives. Every element is a frozenset of alternative tags
+    and cluster matches if it has at least one tag of every element.
+    """
+
+    __slots__ = ()
+
+    def match(self, cluster_depl_tags):
+        return all(not alternatives.isdisjoint(cluster_depl_tags)
+                   for alternatives in self)
+
+
+_COMPILED_DEPLOYMENT_TAGS = {}
+
+_RELEASE_VERSIONS_COMPARISONS = {}
+
+
+def compile_deployment_tags(test_depl_tags):
+    """Splits alternative deployment tags ('a|b') of test entity once
+    and returns them as DeploymentTags.
+    """
+    if isinstance(test_depl_tags, DeploymentTags):
+        return test_depl_tags
+
+    key = tuple(test_depl_tags or ())
+    compiled = _COMPILED_DEPLOYMENT_TAGS.get(key)
+    if compiled is None:
+        compiled = DeploymentTags(
+            frozenset(alt_tag.strip() for alt_tag in tag.split('|'))
+            for tag in key
+        )
+        _COMPILED_DEPLOYMENT_TAGS[key] = compiled
+    return compiled
+
+
 def _process_deployment_tags(cluster_depl_tags, test_depl_tags):
     """Process alternative deployment tags for testsets and tests
     and determines whether current test entity (testset or test)
     is appropriate for cluster.
     """
-
-    test_depl_tags = [
-        [alt_tag.strip() for alt_tag in tag.split('|')]
-        for tag in test_depl_tags
-    ]
-
-    for comb in itertools.product(*test_depl_tags):
-        if set(comb).issubset(cluster_depl_tags):
-            return True
-
-    return False
+    return compile_deployment_tags(test_depl_tags).match(cluster_depl_tags)
 
 
 def _compare_release_versions(cluster_release_version, test_release_version):
+    key = (cluster_release_version, test_release_version)
+    if key in _RELEASE_VERSIONS_COMPARISONS:
+        return _RELEASE_VERSIONS_COMPARISONS[key]
+
     cl_openstack_ver, cl_fuel_ver = cluster_release_version.split('-')
     test_openstack_ver, test_fuel_ver = test_release_version.split('-')
 
@@ -205,6 +250,8 @@ def _compare_release_versions(cluster_release_version, test_release_version):
         (version.StrictVersion(cl_fuel_ver) >=
          version.StrictVersion(test_fuel_ver))
     )
+
+    _RELEASE_VERSIONS_COMPARISONS[key] = cond
     return cond
 
 
@@ -215,12 +262,12 @@ def is_test_available(cluster_data, test_entity_data):
     # if 'available_since_release' attritube of test entity
     # is empty then this test entity is available for cluster
     # in other case execute release comparator logic
-    if not test_entity_data['available_since_release']:
+    if not test_entity_data.available_since_release:
         is_rel_ver_suitable = True
     else:
         is_rel_ver_suitable = _compare_release_versions(
             cluster_data['release_version'],
-            test_entity_data['available_since_release']
+            test_entity_data.available_since_release
         )
 
     # if release version of test entity is suitable for cluster
@@ -229,7 +276,7 @@ def is_test_available(cluster_data, test_entity_data):
     if is_rel_ver_suitable:
         is_depl_tags_suitable = _process_deployment_tags(
             cluster_data['deployment_tags'],
-            test_entity_data['deployment_tags']
+            test_entity_data.deployment_tags
         )
         if is_depl_tags_suitable:
             is_test_available = True
@@ -0,0 +1,131 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import multiprocessing
+import os
+import signal
+
+import gevent
+
+from fuel_plugin.ostf_adapter import nose_plugin
+from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
+
+
+LOG = logging.getLogger(__name__)
+
+SUPERVISE_INTERVAL = 1
+
+_POOL = None
+
+
+class WorkerPool(object):
+    """Keeps given number of processes forked in advance which wait
+    for jobs in shared queue. Job is taken by the first idle worker
+    and is passed to target callable. Worker exits after max_jobs
+    jobs are processed and supervise() replaces exited workers.
+    """
+
+    def __init__(self, size, target, max_jobs=1):
+        self.size = size
+        self.target = target
+        self.max_jobs = max_jobs
+        self.jobs = multiprocessing.Queue()
+        self.workers = []
+
+    def start(self):
+        for _ in range(self.size):
+            self._spawn_worker()
+
+    def submit(self, *args):
+        self.jobs.put(args)
+
+    def supervise(self):
+        """Replaces exited workers with new ones."""
+        alive_workers = [
+            worker for worker in self.workers
+            if worker.is_alive() and nose_utils.pid_exists(worker.pid)
+        ]
+        exited_count = len(self.workers) - len(alive_workers)
+        self.workers = alive_workers
+
+        for _ in range(self.size - len(self.workers)):
+            self._spawn_worker()
+
+        return exited_count
+
+    def supervise_forever(self, interval=SUPERVISE_INTERVAL):
+        while True:
+            try:
+                self.supervise()
+            except Exception:
+                LOG.exception('Failed to supervise test run workers.')
+            gevent.sleep(interval)
+
+    def _spawn_worker(self):
+        worker = multiprocessing.Process(target=self._work)
+        worker.daemon = True
+        worker.start()
+        self.workers.append(worker)
+
+    def _work(self):
+        environ = dict(os.environ)
+
+        for _ in range(self.max_jobs):
+            # test run is stopped by SIGUSR1 which must not kill
+            # worker waiting for job
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+            args = self.jobs.get()
+
+            # test runs change environment of the process
+            os.environ.clear()
+            os.environ.update(environ)
+
+            try:
+                self.target(*args)
+            except Exception:
+                LOG.exception('Test run worker %s failed to process job.',
+                              os.getpid())
+
+
+def _run_driver_job(driver, args):
+    nose_plugin.get_plugin(driver)._run_tests(*args)
+
+
+def preload(modules):
+    """Imports modules needed by test runs, so that processes forked
+    afterwards get them already imported.
+    """
+    for module in modules:
+        try:
+            __import__(module)
+        except Exception:
+            LOG.exception('Failed to preload module %s.', module)
+
+
+def setup_pool(size, max_jobs=1):
+    global _POOL
+
+    _POOL = WorkerPool(size, _run_driver_job, max_jobs=max_jobs)
+    _POOL.start()
+    gevent.spawn(_POOL.supervise_forever)
+
+    LOG.info('Started %s test run workers.', size)
+
+    return _POOL
+
+
+def get_pool():
+    return _POOL
@@ -0,0 +1,153 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Scheduler of queued test runs.
+
+Test runs are started only when they do not intersect by exclusive
+test sets with test runs executing on the same cluster and limits of
+simultaneously executing test runs allow, the rest of them wait in
+queue stored in database. Credentials of queued test runs are kept
+only in memory, see QueuedTestRun.
+"""
+
+import collections
+import logging
+
+from gevent import event
+try:
+    from oslo.config import cfg
+except ImportError:
+    from oslo_config import cfg
+
+from fuel_plugin import consts
+from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import models
+
+
+LOG = logging.getLogger(__name__)
+
+_WAKE_UP = event.Event()
+
+
+def wake_up():
+    """Makes scheduler look at queue without waiting for interval."""
+    _WAKE_UP.set()
+
+
+def _get_exclusive_keys(cluster_id, exclusive_testsets):
+    return set((cluster_id, serie) for serie in exclusive_testsets or [])
+
+
+def get_runnable(session):
+    """Returns queued test runs which can be started now and locks
+    them in queue.
+    """
+    max_running = cfg.CONF.adapter.scheduler_max_running
+    max_running_per_cluster = \
+        cfg.CONF.adapter.scheduler_max_running_per_cluster
+
+    queued_ids = session.query(models.QueuedTestRun.test_run_id)
+    executing = session.query(models.TestRun.cluster_id,
+                              models.TestSet.exclusive_testsets)\
+        .join(models.TestSet,
+              models.TestSet.id == models.TestRun.test_set_id)\
+        .filter(models.TestRun.status == consts.TESTRUN_STATUSES.running,
+                ~models.TestRun.id.in_(queued_ids))
+
+    running_count = 0
+    clusters_running_count = collections.Counter()
+    locked_keys = set()
+    for cluster_id, exclusive_testsets in executing:
+        running_count += 1
+        clusters_running_count[cluster_id] += 1
+        locked_keys.update(
+            _get_exclusive_keys(cluster_id, exclusive_testsets))
+
+    # test set is queried as entity, since rows with entities are
+    # uniqued and list of exclusive test sets cannot be hashed
+    queue = session.query(models.QueuedTestRun,
+                          models.TestRun.cluster_id,
+                          models.TestSet)\
+        .join(models.TestRun,
+              models.TestRun.id == models.QueuedTestRun.test_run_id)\
+        .join(models.TestSet,
+              models.TestSet.id == models.TestRun.test_set_id)\
+        .order_by(models.QueuedTestRun.priority,
+                  models.QueuedTestRun.test_run_id)\
+        .with_for_update(of=models.QueuedTestRun)
+
+    runnable = []
+    for queued, cluster_id, test_set in queue:
+        if max_running and running_count >= max_running:
+            break
+        if max_running_per_cluster and \
+                clusters_running_count[cluster_id] >= max_running_per_cluster:
+            continue
+
+        keys = _get_exclusive_keys(cluster_id, test_set.exclusive_testsets)
+        if keys & locked_keys:
+            continue
+
+        runnable.append(queued)
+        running_count += 1
+        clusters_running_count[cluster_id] += 1
+        locked_keys.update(keys)
+
+    return runnable
+
+
+def schedule(dbpath):
+    """Starts queued test runs which can be started now.
+
+    :returns: number of started test runs
+    """
+    with engine.contexted_session(dbpath) as session:
+        launches = []
+        for queued in get_runnable(session):
+            session.delete(queued)
+            credentials = models.QueuedTestRun.credentials.pop(
+                queued.test_run_id, None)
+            if credentials is None and queued.has_credentials:
+                # queued by previous process of adapter
+                LOG.warning('Credentials of test run %s are lost, '
+                            'it is finished without starting',
+                            queued.test_run_id)
+                models.Test.update_running_tests(session, queued.test_run_id)
+                queued.test_run.update(consts.TESTRUN_STATUSES.finished)
+                queued.test_run.publish(
+                    session, status=consts.TESTRUN_STATUSES.finished)
+                continue
+
+            ostf_os_access_creds, token = credentials or (None, None)
+            launches.append((queued.test_run_id, ostf_os_access_creds,
+                             token, queued.tests))
+
+    # test runs are removed from queue before they are started,
+    # so none of them is started twice
+    if launches:
+        LOG.info('Starting test runs %s',
+                 ', '.join(str(launch[0]) for launch in launches))
+        models.TestRun.dispatch(dbpath, launches)
+    return len(launches)
+
+
+def schedule_forever(dbpath, interval):
+    while True:
+        try:
+            schedule(dbpath)
+        except Exception:
+            LOG.exception('Failed to schedule test runs.')
+
+        _WAKE_UP.wait(interval)
+        _WAKE_UP.clear()
@@ -18,6 +18,7 @@ import os
 import signal
 import sys
 
+import gevent
 from gevent import pywsgi
 try:
     from oslo.config import cfg
@@ -28,8 +29,12 @@ from fuel_plugin.ostf_adapter import config as ostf_config
 from fuel_plugin.ostf_adapter import logger
 from fuel_plugin.ostf_adapter import mixins
 from fuel_plugin.ostf_adapter import nailgun_hooks
+from fuel_plugin.ostf_adapter import scheduler
 from fuel_plugin.ostf_adapter.nose_plugin import nose_discovery
+from fuel_plugin.ostf_adapter.nose_plugin import nose_workers
 from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.ostf_adapter.storage import retention
 from fuel_plugin.ostf_adapter.wsgi import app
 
 
@@ -56,21 +61,47 @@ def main():
     if CONF.after_initialization_environment_hook:
         return nailgun_hooks.after_initialization_environment_hook()
 
+    # replace expired test runs with summaries and exit
+    if CONF.purge_test_runs:
+        with engine.contexted_session(CONF.adapter.dbpath) as session:
+            retention.purge_test_runs(session)
+        return
+
     with engine.contexted_session(CONF.adapter.dbpath) as session:
-        # performing cleaning of expired data (if any) in db
-        mixins.delete_db_data(session)
-        log.info('Cleaned up database.')
-        # discover testsets and their tests
+        if CONF.full_discovery:
+            # performing cleaning of all discovered data in db
+            mixins.delete_db_data(session)
+            log.info('Cleaned up database.')
+        # finish test runs which were interrupted by adapter restart
+        orphaned_count = models.TestRun.finish_orphaned(session)
+        session.commit()
+        log.info('Finished {0} orphaned test runs.'.format(orphaned_count))
+        # discover testsets and their tests changed since last start
         CORE_PATH = CONF.debug_tests or 'fuel_health'
 
         log.info('Performing nose discovery with {0}.'.format(CORE_PATH))
 
-        nose_discovery.discovery(path=CORE_PATH, session=session)
+        nose_discovery.incremental_discovery(
+            path=CORE_PATH, session=session,
+            backend=CONF.adapter.discovery_backend)
 
         # cache needed data from test repository
         mixins.cache_test_repository(session)
 
     log.info('Discovery is completed')
+
+    if CONF.adapter.worker_pool_size:
+        nose_workers.preload(CONF.adapter.worker_preload_modules)
+        nose_workers.setup_pool(CONF.adapter.worker_pool_size,
+                                max_jobs=CONF.adapter.worker_max_jobs)
+
+    gevent.spawn(scheduler.schedule_forever,
+                 CONF.adapter.dbpath, CONF.adapter.scheduler_interval)
+
+    if CONF.adapter.retention_interval:
+        gevent.spawn(retention.purge_test_runs_periodically,
+                     CONF.adapter.dbpath, CONF.adapter.retention_interval)
+
     host, port = CONF.adapter.server_host, CONF.adapter.server_port
     srv = pywsgi.WSGIServer((host, port), root)
 
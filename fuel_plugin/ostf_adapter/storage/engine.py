@@ -14,19 +14,79 @@
 
 import contextlib
 import logging
+import os
+import threading
 
-from sqlalchemy import create_engine, orm
+import gevent
+from sqlalchemy import create_engine, event, exc, orm
+
+try:
+    from oslo.config import cfg
+except ImportError:
+    from oslo_config import cfg
 
 
 LOG = logging.getLogger(__name__)
 
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def _add_fork_protection(engine):
+    """Prevents pooled connections from being shared between processes.
+
+    Connection which was opened by parent process and checked out in
+    forked child is invalidated, so that child opens its own one.
+    """
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        connection_record.info['pid'] = os.getpid()
+
+    @event.listens_for(engine, 'checkout')
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        pid = os.getpid()
+        if connection_record.info['pid'] != pid:
+            # socket belongs to parent process and must not be closed
+            connection_record.connection = connection_proxy.connection = None
+            raise exc.DisconnectionError(
+                'Connection record belongs to pid {0}, '
+                'attempting to check out in pid {1}'.format(
+                    connection_record.info['pid'], pid))
+
+
+def get_engine(dbpath):
+    """Returns engine for given DB configuration string.
+
+    Engine and its connection pool are created once per process, so
+    sessions opened by the same process reuse connections. Engines
+    inherited from parent process are kept referenced but never used,
+    otherwise garbage collecting them would close sockets which
+    parent still uses.
+    """
+    key = (os.getpid(), dbpath)
+
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            LOG.debug('Creating engine for dbpath={0} in process {1}'
+                      .format(dbpath, key[0]))
+            engine = create_engine(
+                dbpath,
+                pool_size=cfg.CONF.adapter.db_pool_size,
+                max_overflow=cfg.CONF.adapter.db_max_overflow,
+                pool_recycle=cfg.CONF.adapter.db_pool_recycle)
+            _add_fork_protection(engine)
+            _ENGINES[key] = engine
+
+    return engine
+
 
 @contextlib.contextmanager
 def contexted_session(dbpath):
     """Allows to handle session via context manager
     """
     LOG.debug('Starting session with dbpath={0}'.format(dbpath))
-    engine = create_engine(dbpath)
+    engine = get_engine(dbpath)
     session = orm.Session(bind=engine)
     try:
         LOG.debug('Before yielding session.')
@@ -41,8 +101,14 @@ def contexted_session(dbpath):
 
 
 def get_session(dbpath):
-    """Returns SQLAlchemy scoped session for given DB configuration string."""
-    engine = create_engine(dbpath)
-    session = orm.scoped_session(orm.sessionmaker())
+    """Returns SQLAlchemy scoped session for given DB configuration string.
+
+    Session is scoped by greenlet, since requests are served by greenlets
+    of the same thread which switch while waiting for Nailgun, so one
+    request must not commit or remove session of another one.
+    """
+    engine = get_engine(dbpath)
+    session = orm.scoped_session(orm.sessionmaker(),
+                                 scopefunc=gevent.getcurrent)
     session.configure(bind=engine)
     return session
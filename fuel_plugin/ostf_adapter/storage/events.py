@@ -0,0 +1,253 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Notifications about progress of test runs.
+
+Changes of statuses of test runs and their tests are published with
+PostgreSQL NOTIFY in the transaction that saves them, both by processes
+which execute test runs and by adapter which creates, queues, stops
+and restarts them, so the notifications are delivered exactly when
+the changes become visible.
+Adapter listens to them by single connection and dispatches them to
+subscribers, e.g. event streams of HTTP clients.
+"""
+
+import logging
+
+import gevent
+from gevent import event
+from gevent import queue
+from gevent import select
+try:
+    from oslo.config import cfg
+except ImportError:
+    from oslo_config import cfg
+try:
+    from oslo.serialization import jsonutils
+except ImportError:
+    from oslo_serialization import jsonutils
+import sqlalchemy as sa
+
+from fuel_plugin.ostf_adapter.storage import engine
+
+
+LOG = logging.getLogger(__name__)
+
+CHANNEL = 'ostf_test_runs'
+
+# payload of NOTIFY must be shorter than 8000 bytes
+MAX_PAYLOAD_SIZE = 7800
+
+# number of seconds after which idle listener checks whether
+# it still has subscriptions
+LISTEN_TIMEOUT = 5
+
+# number of seconds subscriber waits for listener to start listening
+SUBSCRIBE_TIMEOUT = 10
+
+_LISTENER = None
+
+
+class NotListening(Exception):
+    """Listener failed to start listening to notifications."""
+
+
+def _encode(test_run_id, cluster_id, status, tests):
+    return jsonutils.dumps({
+        'test_run_id': test_run_id,
+        'cluster_id': cluster_id,
+        'status': status,
+        'tests': tests,
+    })
+
+
+def _get_payloads(test_run_id, cluster_id, status, tests):
+    """Splits event into payloads fitting into NOTIFY."""
+    payloads = []
+    chunk = []
+    for test in tests:
+        payload = _encode(test_run_id, cluster_id, None, chunk + [test])
+        if chunk and len(payload) > MAX_PAYLOAD_SIZE:
+            payloads.append(_encode(test_run_id, cluster_id, None, chunk))
+            chunk = []
+        chunk.append(test)
+
+    payloads.append(_encode(test_run_id, cluster_id, status, chunk))
+    return payloads
+
+
+def publish(session, test_run_id, cluster_id, status=None, results=()):
+    """Notifies listeners about changes of test run, they get it when
+    transaction of session is committed.
+
+    :param status: new status of test run, if it was changed
+    :param results: list of (test_name, data) pairs with new
+                    statuses of tests
+    """
+    tests = [
+        {
+            'id': test_name,
+            'status': data['status'],
+            'step': data.get('step'),
+            'taken': data.get('time_taken'),
+        }
+        for test_name, data in results
+    ]
+
+    for payload in _get_payloads(test_run_id, int(cluster_id),
+                                 status, tests):
+        session.execute(
+            sa.select([sa.func.pg_notify(CHANNEL, payload)]))
+
+
+class Subscription(object):
+    """Queue of events of one cluster (or of all of them)."""
+
+    def __init__(self, listener, cluster_id=None, maxsize=None):
+        self.listener = listener
+        self.cluster_id = cluster_id
+        self.maxsize = maxsize
+        self.closed = False
+        self._queue = queue.Queue()
+
+    def put(self, event):
+        if self.closed or (self.cluster_id is not None and
+                           event['cluster_id'] != self.cluster_id):
+            return
+
+        if self.maxsize is not None and self._queue.qsize() >= self.maxsize:
+            LOG.warning('Events subscriber of cluster %s does not keep up, '
+                        'unsubscribing it', self.cluster_id)
+            self.close()
+            return
+
+        self._queue.put(event)
+
+    def get(self, timeout=None):
+        """Returns next event or None if there were no events during
+        timeout or subscription was closed.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.listener.unsubscribe(self)
+        # wake up reader which waits for events
+        self._queue.put(None)
+
+
+class Listener(object):
+    """Receives notifications from database in greenlet and
+    dispatches them to subscriptions.
+    """
+
+    def __init__(self, dbpath):
+        self.dbpath = dbpath
+        self.subscriptions = set()
+        self._greenlet = None
+        # set while LISTEN is in effect on connection of listener
+        self._listening = event.Event()
+
+    def subscribe(self, cluster_id=None, timeout=SUBSCRIBE_TIMEOUT):
+        """Returns subscription which gets every event committed after
+        it is returned, so that data read afterwards is not missing
+        any of them.
+
+        :raises: NotListening if listener does not listen in time
+        """
+        subscription = Subscription(
+            self, cluster_id, maxsize=cfg.CONF.adapter.events_queue_size)
+        self.subscriptions.add(subscription)
+
+        if self._greenlet is None or self._greenlet.dead:
+            self._greenlet = gevent.spawn(self.run)
+
+        if not self._listening.wait(timeout) or subscription.closed:
+            subscription.close()
+            raise NotListening()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    def dispatch(self, payload):
+        try:
+            event = jsonutils.loads(payload)
+        except ValueError:
+            LOG.warning('Malformed event %r is ignored', payload)
+            return
+
+        for subscription in list(self.subscriptions):
+            subscription.put(event)
+
+    def _connect(self):
+        # connection is used only by listener, so it is taken away
+        # from pool of engine
+        connection = engine.get_engine(self.dbpath).raw_connection()
+        connection.detach()
+
+        dbapi_connection = connection.connection
+        dbapi_connection.rollback()
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute('LISTEN {0}'.format(CHANNEL))
+        cursor.close()
+        return dbapi_connection
+
+    def _listen(self, connection):
+        while self.subscriptions:
+            # wait for socket to become readable without blocking
+            # other greenlets
+            readable, _, _ = select.select([connection], [], [],
+                                           LISTEN_TIMEOUT)
+            if not readable:
+                continue
+
+            connection.poll()
+            while connection.notifies:
+                self.dispatch(connection.notifies.pop(0).payload)
+
+    def run(self):
+        """Listens to notifications while there are subscriptions."""
+        while self.subscriptions:
+            connection = None
+            try:
+                # connecting blocks, so it is done in native thread
+                connection = gevent.get_hub().threadpool.apply(
+                    self._connect)
+                self._listening.set()
+                self._listen(connection)
+            except Exception:
+                LOG.exception('Listening to test runs events failed')
+                # notifications may be lost, so subscribers have
+                # to subscribe and read data again
+                for subscription in list(self.subscriptions):
+                    subscription.close()
+            finally:
+                self._listening.clear()
+                if connection is not None:
+                    connection.close()
+
+
+def get_listener(dbpath):
+    global _LISTENER
+
+    if _LISTENER is None or _LISTENER.dbpath != dbpath:
+        _LISTENER = Listener(dbpath)
+    return _LISTENER
@@ -0,0 +1,46 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""discovery_manifest
+
+Revision ID: 1f93b5d6e0a8
+Revises: 2d8e1f7a5c43
+Create Date: 2016-03-28 11:42:57.640213
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '1f93b5d6e0a8'
+down_revision = '2d8e1f7a5c43'
+
+from alembic import op
+import sqlalchemy as sa
+
+from fuel_plugin.ostf_adapter.storage import fields
+
+
+def upgrade():
+    op.create_table(
+        'discovery_manifest',
+        sa.Column('path', sa.String(length=512), nullable=False),
+        sa.Column('mtime', sa.Float(), nullable=False),
+        sa.Column('checksum', sa.String(length=40), nullable=False),
+        sa.Column('test_sets', fields.ListField(), nullable=True),
+        sa.Column('tests', fields.ListField(), nullable=True),
+        sa.PrimaryKeyConstraint('path')
+    )
+
+
+def downgrade():
+    op.drop_table('discovery_manifest')
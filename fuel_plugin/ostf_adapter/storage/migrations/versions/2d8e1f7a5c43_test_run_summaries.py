@@ -0,0 +1,57 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""test_run_summaries
+
+Revision ID: 2d8e1f7a5c43
+Revises: 4a6c0f3b9e21
+Create Date: 2016-03-21 17:05:12.318406
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2d8e1f7a5c43'
+down_revision = '4a6c0f3b9e21'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from fuel_plugin.ostf_adapter.storage import fields
+
+
+def upgrade():
+    op.create_table(
+        'test_run_summaries',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('cluster_id', sa.Integer(), nullable=False),
+        sa.Column('test_set_id', sa.String(length=128), nullable=False),
+        sa.Column('status',
+                  postgresql.ENUM('running', 'finished',
+                                  name='test_run_states',
+                                  create_type=False),
+                  nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('ended_at', sa.DateTime(), nullable=True),
+        sa.Column('tests_statuses', fields.JsonField(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_test_run_summaries_cluster_id_test_set_id',
+                    'test_run_summaries', ['cluster_id', 'test_set_id'])
+
+
+def downgrade():
+    op.drop_index('ix_test_run_summaries_cluster_id_test_set_id',
+                  'test_run_summaries')
+    op.drop_table('test_run_summaries')
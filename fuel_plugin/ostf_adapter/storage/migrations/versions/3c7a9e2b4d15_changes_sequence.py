@@ -0,0 +1,51 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""changes_sequence
+
+Revision ID: 3c7a9e2b4d15
+Revises: 1f93b5d6e0a8
+Create Date: 2016-04-04 15:20:31.415926
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3c7a9e2b4d15'
+down_revision = '1f93b5d6e0a8'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateSequence
+from sqlalchemy.schema import DropSequence
+
+
+def upgrade():
+    op.execute(CreateSequence(sa.Sequence('test_changes_seq')))
+
+    op.add_column('tests',
+                  sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    op.add_column('test_runs',
+                  sa.Column('change_seq', sa.BigInteger(), nullable=True))
+
+    # existing tests and test runs are treated as changed before
+    # any change made after migration
+    op.execute("UPDATE test_runs SET change_seq = nextval('test_changes_seq')")
+    op.execute("UPDATE tests SET change_seq = nextval('test_changes_seq')")
+
+
+def downgrade():
+    op.drop_column('test_runs', 'change_seq')
+    op.drop_column('tests', 'change_seq')
+
+    op.execute(DropSequence(sa.Sequence('test_changes_seq')))
@@ -0,0 +1,41 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""tests_lookup_indexes
+
+Revision ID: 4a6c0f3b9e21
+Revises: 36e3fd684a9e
+Create Date: 2016-03-14 12:20:41.503128
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4a6c0f3b9e21'
+down_revision = '36e3fd684a9e'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('ix_tests_test_set_id_name', 'tests',
+                    ['test_set_id', 'name'])
+    op.create_index('ix_tests_test_run_id', 'tests', ['test_run_id'])
+    op.create_index('ix_test_runs_cluster_id_test_set_id_id', 'test_runs',
+                    ['cluster_id', 'test_set_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_test_runs_cluster_id_test_set_id_id', 'test_runs')
+    op.drop_index('ix_tests_test_run_id', 'tests')
+    op.drop_index('ix_tests_test_set_id_name', 'tests')
@@ -0,0 +1,39 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""test_runs_batch_id
+
+Revision ID: 5e8d2c4a7b90
+Revises: 3c7a9e2b4d15
+Create Date: 2016-04-11 10:05:12.731248
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5e8d2c4a7b90'
+down_revision = '3c7a9e2b4d15'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('test_runs',
+                  sa.Column('batch_id', sa.String(length=32), nullable=True))
+    op.create_index('ix_test_runs_batch_id', 'test_runs', ['batch_id'])
+
+
+def downgrade():
+    op.drop_index('ix_test_runs_batch_id', table_name='test_runs')
+    op.drop_column('test_runs', 'batch_id')
@@ -0,0 +1,48 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""test_run_queue
+
+Revision ID: 6b1f4e8c2a37
+Revises: 5e8d2c4a7b90
+Create Date: 2016-04-18 16:47:03.281904
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '6b1f4e8c2a37'
+down_revision = '5e8d2c4a7b90'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'test_run_queue',
+        sa.Column('test_run_id', sa.Integer(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('enqueued_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['test_run_id'], ['test_runs.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('test_run_id')
+    )
+    op.create_index('ix_test_run_queue_priority_test_run_id',
+                    'test_run_queue', ['priority', 'test_run_id'])
+
+
+def downgrade():
+    op.drop_index('ix_test_run_queue_priority_test_run_id',
+                  'test_run_queue')
+    op.drop_table('test_run_queue')
@@ -0,0 +1,42 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""changes_txid
+
+Revision ID: 8d4b2f6e1c39
+Revises: 6b1f4e8c2a37
+Create Date: 2016-04-21 12:08:52.730164
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8d4b2f6e1c39'
+down_revision = '6b1f4e8c2a37'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # existing changes are left without transaction id, they were
+    # committed before any version given to clients after migration
+    op.add_column('tests',
+                  sa.Column('change_txid', sa.BigInteger(), nullable=True))
+    op.add_column('test_runs',
+                  sa.Column('change_txid', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('test_runs', 'change_txid')
+    op.drop_column('tests', 'change_txid')
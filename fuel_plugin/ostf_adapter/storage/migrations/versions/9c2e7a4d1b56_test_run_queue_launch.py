@@ -0,0 +1,47 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""test_run_queue_launch
+
+Revision ID: 9c2e7a4d1b56
+Revises: 8d4b2f6e1c39
+Create Date: 2016-04-25 10:41:17.503826
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9c2e7a4d1b56'
+down_revision = '8d4b2f6e1c39'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+def upgrade():
+    op.add_column('test_run_queue',
+                  sa.Column('tests', postgresql.ARRAY(sa.String(512)),
+                            nullable=True))
+    # test runs queued before were given credentials kept in memory
+    # of previous process of adapter
+    op.add_column('test_run_queue',
+                  sa.Column('has_credentials', sa.Boolean(),
+                            nullable=False, server_default=sa.true()))
+    op.alter_column('test_run_queue', 'has_credentials',
+                    server_default=None)
+
+
+def downgrade():
+    op.drop_column('test_run_queue', 'has_credentials')
+    op.drop_column('test_run_queue', 'tests')
@@ -14,6 +14,7 @@
 
 import datetime
 import logging
+import uuid
 
 import sqlalchemy as sa
 from sqlalchemy import desc
@@ -24,7 +25,9 @@ from sqlalchemy.orm import joinedload, relationship, object_mapper
 
 from fuel_plugin import consts
 from fuel_plugin.ostf_adapter import nose_plugin
+from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
 from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import events
 from fuel_plugin.ostf_adapter.storage import fields
 
 
@@ -33,6 +36,25 @@ LOG = logging.getLogger(__name__)
 
 BASE = declarative_base()
 
+# every change of test or test run gets the next value of sequence,
+# so clients can ask for changes made after the one they have seen
+CHANGES_SEQUENCE = sa.Sequence('test_changes_seq')
+
+
+def _change_seq_column():
+    return sa.Column(sa.BigInteger(),
+                     default=CHANGES_SEQUENCE.next_value(),
+                     onupdate=CHANGES_SEQUENCE.next_value())
+
+
+# values of sequence are allocated before commit, so change is also
+# marked by id of its transaction, which tells whether it was committed
+# by the time client has seen other changes
+def _change_txid_column():
+    return sa.Column(sa.BigInteger(),
+                     default=sa.func.txid_current(),
+                     onupdate=sa.func.txid_current())
+
 
 class ClusterState(BASE):
     """Represents clusters currently
@@ -129,6 +151,8 @@ class Test(BASE):
     meta = sa.Column(fields.JsonField())
     deployment_tags = sa.Column(ARRAY(sa.String(64)))
     available_since_release = sa.Column(sa.String(64), default="")
+    change_seq = _change_seq_column()
+    change_txid = _change_txid_column()
 
     test_run_id = sa.Column(
         sa.Integer(),
@@ -146,6 +170,11 @@ class Test(BASE):
         )
     )
 
+    __table_args__ = (
+        sa.Index('ix_tests_test_set_id_name', 'test_set_id', 'name'),
+        sa.Index('ix_tests_test_run_id', 'test_run_id'),
+    )
+
     @property
     def frontend(self):
         return {
@@ -167,6 +196,36 @@ class Test(BASE):
                    cls.test_run_id == test_run_id).\
             update(data, synchronize_session='fetch')
 
+    @classmethod
+    def add_results(cls, session, test_run_id, results):
+        """Saves results of several tests of test_run by single
+        UPDATE statement executed with all sets of parameters.
+
+        :param results: list of (test_name, data) pairs where all
+                        data dicts have the same keys
+        """
+        if not results:
+            return
+
+        table = cls.__table__
+        columns = results[0][1].keys()
+
+        statement = table.update()\
+            .where(sa.and_(
+                table.c.test_run_id == sa.bindparam('test_run_id_'),
+                table.c.name == sa.bindparam('name_')))\
+            .values(dict(
+                (column, sa.bindparam(column + '_')) for column in columns
+            ))
+
+        parameters = []
+        for test_name, data in results:
+            params = dict((column + '_', data[column]) for column in columns)
+            params.update(test_run_id_=test_run_id, name_=test_name)
+            parameters.append(params)
+
+        session.execute(statement, parameters)
+
     @classmethod
     def update_running_tests(cls, session, test_run_id,
                              status=consts.TEST_STATUSES.stopped):
@@ -187,6 +246,56 @@ class Test(BASE):
             update({'status': status, 'time_taken': None},
                    synchronize_session='fetch')
 
+    @classmethod
+    def copy_tests(cls, session, test_run_id, test_set_id, tests_names,
+                   predefined_tests=None):
+        """Copies given tests of test set for test_run
+        by single INSERT ... SELECT statement.
+        """
+        if not tests_names:
+            return
+
+        table = cls.__table__
+        copied_columns = [
+            column for column in table.columns
+            if column.key not in ('id', 'test_run_id', 'status',
+                                  'change_seq', 'change_txid')
+        ]
+
+        if not predefined_tests:
+            status = sa.literal(consts.TEST_STATUSES.wait_running)
+        else:
+            enabled_tests = set(tests_names).intersection(predefined_tests)
+            if enabled_tests:
+                status = sa.case(
+                    [(table.c.name.in_(enabled_tests),
+                      consts.TEST_STATUSES.wait_running)],
+                    else_=consts.TEST_STATUSES.disabled
+                )
+            else:
+                status = sa.literal(consts.TEST_STATUSES.disabled)
+
+        tests_to_copy = sa.select(
+            copied_columns + [
+                sa.literal(test_run_id),
+                sa.cast(status, table.c.status.type),
+                CHANGES_SEQUENCE.next_value(),
+                sa.func.txid_current()
+            ]
+        ).where(sa.and_(
+            table.c.name.in_(tests_names),
+            table.c.test_set_id == test_set_id,
+            table.c.test_run_id.is_(None)
+        ))
+
+        session.execute(
+            table.insert().from_select(
+                [column.key for column in copied_columns] +
+                ['test_run_id', 'status', 'change_seq', 'change_txid'],
+                tests_to_copy
+            )
+        )
+
     def copy_test(self, test_run, predefined_tests):
         """Performs copying of tests for newly created
         test_run.
@@ -195,7 +304,8 @@ class Test(BASE):
         mapper = object_mapper(self)
         primary_keys = set([col.key for col in mapper.primary_key])
         for column in mapper.iterate_properties:
-            if column.key not in primary_keys:
+            if column.key not in primary_keys and \
+                    column.key not in ('change_seq', 'change_txid'):
                 setattr(new_test, column.key, getattr(self, column.key))
         new_test.test_run_id = test_run.id
         if predefined_tests and new_test.name not in predefined_tests:
@@ -218,6 +328,10 @@ class TestRun(BASE):
     started_at = sa.Column(sa.DateTime, default=datetime.datetime.utcnow)
     ended_at = sa.Column(sa.DateTime)
     pid = sa.Column(sa.Integer)
+    change_seq = _change_seq_column()
+    change_txid = _change_txid_column()
+    # test runs launched by the same request share batch id
+    batch_id = sa.Column(sa.String(32))
 
     test_set_id = sa.Column(sa.String(128))
     cluster_id = sa.Column(sa.Integer)
@@ -229,6 +343,9 @@ class TestRun(BASE):
              'cluster_testing_pattern.cluster_id'],
             ondelete='CASCADE'
         ),
+        sa.Index('ix_test_runs_cluster_id_test_set_id_id',
+                 'cluster_id', 'test_set_id', 'id'),
+        sa.Index('ix_test_runs_batch_id', 'batch_id'),
         {}
     )
 
@@ -257,8 +374,28 @@ class TestRun(BASE):
     def is_finished(self):
         return self.status == consts.TESTRUN_STATUSES.finished
 
+    def publish(self, session, status=None):
+        """Notifies subscribers of events about current statuses
+        of tests of test run and its new status, if it was changed.
+        """
+        tests = session.query(Test.name, Test.status, Test.step,
+                              Test.time_taken)\
+            .filter_by(test_run_id=self.id)\
+            .order_by(Test.name)
+
+        events.publish(session, self.id, self.cluster_id, status=status,
+                       results=[
+                           (name, {'status': test_status, 'step': step,
+                                   'time_taken': time_taken})
+                           for name, test_status, step, time_taken in tests
+                       ])
+
     @property
     def frontend(self):
+        return self.get_frontend(self.tests)
+
+    def get_frontend(self, tests):
+        """Returns data of test run with given tests of it."""
         test_run_data = {
             'id': self.id,
             'testset': self.test_set_id,
@@ -267,48 +404,50 @@ class TestRun(BASE):
             'status': self.status,
             'started_at': self.started_at,
             'ended_at': self.ended_at,
+            'batch_id': self.batch_id,
             'tests': []
         }
-        if self.tests:
-            test_run_data['tests'] = [test.frontend for test in self.tests]
+        if tests:
+            test_run_data['tests'] = [test.frontend for test in tests]
         return test_run_data
 
     @classmethod
     def add_test_run(cls, session, test_set, cluster_id,
                      status=consts.TESTRUN_STATUSES.running,
-                     tests=None):
+                     tests=None, batch_id=None, commit=True):
         """Creates new test_run object with given data
         and makes copy of tests that will be bound
         with this test_run. Copying is performed by
-        copy_test method of Test class.
+        copy_tests method of Test class.
+
+        If commit is False test run is only flushed, caller has
+        to commit it before test run is executed.
         """
         predefined_tests = tests or []
         tests_names = session.query(ClusterTestingPattern.tests)\
             .filter_by(test_set_id=test_set, cluster_id=cluster_id)\
             .scalar()
 
-        tests = session.query(Test)\
-            .filter(Test.name.in_(tests_names))\
-            .filter_by(test_set_id=test_set)\
-            .filter_by(test_run_id=None)
-
         test_run = cls(test_set_id=test_set, cluster_id=cluster_id,
-                       status=status)
+                       status=status, batch_id=batch_id)
         session.add(test_run)
 
-        for test in tests:
-            new_test = test.copy_test(test_run, predefined_tests)
-            session.add(new_test)
-            test_run.tests.append(new_test)
-            # NOTE(akostrikov) Seems there is a problem with transaction
-            # isolation, so we need not only to flush, but also to commit.
-            # We fork and then in forks we flush sql items. But it seems that
-            # it happens in transaction so we are not getting in other
-            # processes add results. So I force transaction commit to provide
-            # changes to all forks os OSTF.
-            session.commit()
+        # id of test_run is needed for copies of tests
         session.flush()
 
+        Test.copy_tests(session, test_run.id, test_set,
+                        tests_names, predefined_tests)
+        test_run.publish(session, status=status)
+
+        # NOTE(akostrikov) Seems there is a problem with transaction
+        # isolation, so we need not only to flush, but also to commit.
+        # We fork and then in forks we flush sql items. But it seems that
+        # it happens in transaction so we are not getting in other
+        # processes add results. So I force transaction commit to provide
+        # changes to all forks os OSTF.
+        if commit:
+            session.commit()
+
         return test_run
 
     @classmethod
@@ -357,6 +496,38 @@ class TestRun(BASE):
         test_run = cls.get_last_test_run(session, test_set, cluster_id)
         return not bool(test_run) or test_run.is_finished()
 
+    @classmethod
+    def finish_orphaned(cls, session):
+        """Finishes running test runs whose processes do not exist
+        anymore (e.g. adapter was restarted while they were running)
+        and queued test runs whose credentials were lost with restart.
+        Queued test runs which need no credentials are kept.
+        """
+        test_runs = session.query(cls, QueuedTestRun)\
+            .outerjoin(QueuedTestRun, QueuedTestRun.test_run_id == cls.id)\
+            .filter(cls.status == consts.TESTRUN_STATUSES.running)\
+            .all()
+
+        orphaned_count = 0
+        for test_run, queued in test_runs:
+            if queued is not None:
+                # queued test runs have no process yet, but they cannot
+                # be started without credentials kept by process which
+                # queued them
+                if test_run.id in QueuedTestRun.credentials or \
+                        not queued.has_credentials:
+                    continue
+                session.delete(queued)
+            elif test_run.pid and nose_utils.pid_exists(test_run.pid):
+                continue
+
+            Test.update_running_tests(session, test_run.id)
+            test_run.update(consts.TESTRUN_STATUSES.finished)
+            test_run.publish(session, status=consts.TESTRUN_STATUSES.finished)
+            orphaned_count += 1
+
+        return orphaned_count
+
     @classmethod
     def start(cls, session, test_set, metadata, tests, dbpath, token=None):
         plugin = nose_plugin.get_plugin(test_set.driver)
@@ -373,32 +544,212 @@ class TestRun(BASE):
             return test_run.frontend
         return {}
 
+    @classmethod
+    def add_batch(cls, session, launches, token=None):
+        """Creates test runs for several test sets in one transaction
+        and puts them into queue of test runs to be executed. Test sets
+        whose last test run on the cluster is still running are skipped.
+
+        :param launches: list of (test_set, cluster_id, tests,
+                         ostf_os_access_creds) tuples
+        :returns: batch id and list of created test runs, with None
+                  in place of skipped ones
+        """
+        batch_id = uuid.uuid4().hex
+
+        test_runs = []
+        credentials = {}
+        for test_set, cluster_id, tests, ostf_os_access_creds in launches:
+            test_run = None
+            if cls.is_last_running(session, test_set.id, cluster_id):
+                test_run = cls.add_test_run(
+                    session, test_set.id, cluster_id, tests=tests,
+                    batch_id=batch_id, commit=False)
+                session.add(QueuedTestRun(
+                    test_run_id=test_run.id,
+                    priority=test_set.test_runs_ordering_priority,
+                    has_credentials=bool(ostf_os_access_creds or token)))
+                credentials[test_run.id] = (ostf_os_access_creds, token)
+            test_runs.append(test_run)
+
+        session.commit()
+        QueuedTestRun.credentials.update(credentials)
+        return batch_id, test_runs
+
+    @classmethod
+    def dispatch(cls, dbpath, launches):
+        """Executes committed test runs by drivers of their test sets.
+
+        :param launches: list of (test_run_id, ostf_os_access_creds,
+                         token, tests) tuples, all enabled tests of
+                         test run are executed if tests is None
+        """
+        with engine.contexted_session(dbpath) as session:
+            for test_run_id, ostf_os_access_creds, token, tests in launches:
+                test_run = cls.get_test_run(session, test_run_id)
+                if test_run is None:
+                    LOG.warning('Test run %s to be started is not found',
+                                test_run_id)
+                    continue
+
+                try:
+                    plugin = nose_plugin.get_plugin(test_run.test_set.driver)
+                    plugin.run(test_run, test_run.test_set, dbpath,
+                               ostf_os_access_creds, tests, token=token)
+                except Exception:
+                    LOG.exception('Failed to start test run %s', test_run_id)
+                    Test.update_running_tests(session, test_run_id)
+                    test_run.update(consts.TESTRUN_STATUSES.finished)
+                    test_run.publish(
+                        session, status=consts.TESTRUN_STATUSES.finished)
+
+                session.commit()
+
     def restart(self, session, dbpath,
                 ostf_os_access_creds, tests=None, token=None):
         """Restart test run with
             if tests given they will be enabled
+
+        Test run is put into queue of test runs as new ones are,
+        so that it is started by scheduler within its limits.
         """
         if TestRun.is_last_running(session,
                                    self.test_set_id,
                                    self.cluster_id):
-            plugin = nose_plugin.get_plugin(self.test_set.driver)
-
             self.update(consts.TEST_STATUSES.running)
             if tests:
                 Test.update_test_run_tests(
                     session, self.id, tests)
 
-            plugin.run(self, self.test_set, dbpath,
-                       ostf_os_access_creds, tests, token=token)
+            session.add(QueuedTestRun(
+                test_run_id=self.id,
+                priority=self.test_set.test_runs_ordering_priority,
+                tests=tests or None,
+                has_credentials=bool(ostf_os_access_creds or token)))
+            QueuedTestRun.credentials[self.id] = (ostf_os_access_creds, token)
+            self.publish(session, status=consts.TESTRUN_STATUSES.running)
             return self.frontend
         return {}
 
     def stop(self, session):
         """Stop test run if running
         """
+        queued = session.query(QueuedTestRun).get(self.id)
+        if queued is not None:
+            # test run has not been started yet
+            session.delete(queued)
+            QueuedTestRun.credentials.pop(self.id, None)
+            Test.update_running_tests(
+                session, self.id, status=consts.TEST_STATUSES.stopped)
+            self.update(consts.TESTRUN_STATUSES.finished)
+            self.publish(session, status=consts.TESTRUN_STATUSES.finished)
+            return self.frontend
+
         plugin = nose_plugin.get_plugin(self.test_set.driver)
         killed = plugin.kill(self)
+        # status of killed test run is published by process executing it
+        status = None
+        if not killed and not self.pid:
+            # test run submitted to pool of workers may wait for free
+            # worker, which does not start test run finished meanwhile
+            if session.query(TestRun)\
+                    .filter_by(id=self.id, pid=None,
+                               status=consts.TESTRUN_STATUSES.running)\
+                    .update({'status': consts.TESTRUN_STATUSES.finished,
+                             'ended_at': datetime.datetime.utcnow()},
+                            synchronize_session='fetch'):
+                killed = True
+                status = consts.TESTRUN_STATUSES.finished
         if killed:
             Test.update_running_tests(
                 session, self.id, status=consts.TEST_STATUSES.stopped)
+            self.publish(session, status=status)
         return self.frontend
+
+
+class QueuedTestRun(BASE):
+    """Test run waiting for scheduler to execute it. Runs are taken
+    from queue in order of priority of their test sets.
+
+    Queue is stored in database and survives restart of adapter, but
+    credentials (OpenStack credentials and auth token) of queued test
+    runs are not stored there. They are kept in memory of adapter
+    process by test run id, so test runs queued with credentials before
+    restart of adapter are lost: they are finished as orphaned without
+    being started. Test runs queued without credentials are started
+    after restart.
+    """
+
+    __tablename__ = 'test_run_queue'
+
+    # test_run_id -> (ostf_os_access_creds, token)
+    credentials = {}
+
+    test_run_id = sa.Column(
+        sa.Integer(),
+        sa.ForeignKey('test_runs.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    priority = sa.Column(sa.Integer())
+    enqueued_at = sa.Column(sa.DateTime, default=datetime.datetime.utcnow)
+    # tests of restarted test run to be executed, all enabled if None
+    tests = sa.Column(ARRAY(sa.String(512)))
+    # whether credentials of test run are kept in memory
+    has_credentials = sa.Column(sa.Boolean(), nullable=False, default=False)
+
+    __table_args__ = (
+        sa.Index('ix_test_run_queue_priority_test_run_id',
+                 'priority', 'test_run_id'),
+    )
+
+    test_run = relationship('TestRun')
+
+
+class DiscoveryManifest(BASE):
+    """Describes test module as it was seen by the last discovery:
+    its modification time, checksum and test sets and tests
+    discovered in it.
+    """
+
+    __tablename__ = 'discovery_manifest'
+
+    path = sa.Column(sa.String(512), primary_key=True)
+    mtime = sa.Column(sa.Float(), nullable=False)
+    checksum = sa.Column(sa.String(40), nullable=False)
+    test_sets = sa.Column(fields.ListField())
+    tests = sa.Column(fields.ListField())
+
+
+class TestRunSummary(BASE):
+    """Compact record of test run removed by retention. Keeps
+    only number of tests of the run in every status.
+    """
+
+    __tablename__ = 'test_run_summaries'
+
+    id = sa.Column(sa.Integer(), primary_key=True, autoincrement=False)
+    cluster_id = sa.Column(sa.Integer(), nullable=False)
+    test_set_id = sa.Column(sa.String(128), nullable=False)
+    status = sa.Column(sa.Enum(consts.TESTRUN_STATUSES,
+                               name='test_run_states'),
+                       nullable=False)
+    started_at = sa.Column(sa.DateTime)
+    ended_at = sa.Column(sa.DateTime)
+    tests_statuses = sa.Column(fields.JsonField())
+
+    __table_args__ = (
+        sa.Index('ix_test_run_summaries_cluster_id_test_set_id',
+                 'cluster_id', 'test_set_id'),
+    )
+
+    @property
+    def frontend(self):
+        return {
+            'id': self.id,
+            'testset': self.test_set_id,
+            'cluster_id': self.cluster_id,
+            'status': self.status,
+            'started_at': self.started_at,
+            'ended_at': self.ended_at,
+            'tests_statuses': self.tests_statuses
+        }
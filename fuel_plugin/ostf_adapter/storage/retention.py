@@ -0,0 +1,158 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import datetime
+import logging
+
+import gevent
+try:
+    from oslo.config import cfg
+except ImportError:
+    from oslo_config import cfg
+from sqlalchemy import desc
+from sqlalchemy import func
+
+from fuel_plugin import consts
+from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import models
+
+
+LOG = logging.getLogger(__name__)
+
+
+def _expired_test_runs(session, keep_runs, keep_days):
+    """Returns query for ids of finished test runs which are neither
+    among keep_runs latest runs of their cluster and test set nor
+    started within last keep_days days, oldest first.
+    """
+    started_before = datetime.datetime.utcnow() - \
+        datetime.timedelta(days=keep_days)
+
+    ranked_test_runs = session.query(
+        models.TestRun.id.label('id'),
+        models.TestRun.status.label('status'),
+        models.TestRun.started_at.label('started_at'),
+        func.row_number().over(
+            partition_by=(models.TestRun.cluster_id,
+                          models.TestRun.test_set_id),
+            order_by=desc(models.TestRun.id)
+        ).label('position')
+    ).subquery()
+
+    return session.query(ranked_test_runs.c.id)\
+        .filter(ranked_test_runs.c.position > keep_runs)\
+        .filter(ranked_test_runs.c.started_at < started_before)\
+        .filter(ranked_test_runs.c.status ==
+                consts.TESTRUN_STATUSES.finished)\
+        .order_by(ranked_test_runs.c.id)
+
+
+def _summarize_test_runs(session, test_runs):
+    test_runs_ids = [test_run.id for test_run in test_runs]
+
+    tests_statuses = collections.defaultdict(dict)
+    counts = session.query(models.Test.test_run_id,
+                           models.Test.status,
+                           func.count(models.Test.id))\
+        .filter(models.Test.test_run_id.in_(test_runs_ids))\
+        .group_by(models.Test.test_run_id, models.Test.status)
+    for test_run_id, status, count in counts:
+        tests_statuses[test_run_id][status] = count
+
+    session.add_all([
+        models.TestRunSummary(
+            id=test_run.id,
+            cluster_id=test_run.cluster_id,
+            test_set_id=test_run.test_set_id,
+            status=test_run.status,
+            started_at=test_run.started_at,
+            ended_at=test_run.ended_at,
+            tests_statuses=tests_statuses[test_run.id]
+        )
+        for test_run in test_runs
+    ])
+
+
+def purge_test_runs(session, keep_runs=None, keep_days=None,
+                    batch_size=None):
+    """Replaces expired test runs and their tests with summaries.
+
+    Test runs are processed in batches of batch_size, every batch
+    is committed separately so that locks are held for short time.
+    Unfinished test runs are never removed.
+
+    :returns: number of removed test runs
+    """
+    if keep_runs is None:
+        keep_runs = cfg.CONF.adapter.retention_keep_runs
+    if keep_days is None:
+        keep_days = cfg.CONF.adapter.retention_keep_days
+    if batch_size is None:
+        batch_size = cfg.CONF.adapter.retention_batch_size
+
+    purged_count = 0
+    while True:
+        test_runs_ids = [
+            test_run_id for test_run_id, in
+            _expired_test_runs(session, keep_runs, keep_days)
+            .limit(batch_size)
+        ]
+        if not test_runs_ids:
+            break
+
+        # status is checked again under lock since test run
+        # can be restarted meanwhile
+        test_runs = session.query(models.TestRun)\
+            .filter(models.TestRun.id.in_(test_runs_ids))\
+            .filter_by(status=consts.TESTRUN_STATUSES.finished)\
+            .with_for_update()\
+            .all()
+
+        if test_runs:
+            ids = [test_run.id for test_run in test_runs]
+            _summarize_test_runs(session, test_runs)
+
+            session.query(models.Test)\
+                .filter(models.Test.test_run_id.in_(ids))\
+                .delete(synchronize_session=False)
+            session.query(models.TestRun)\
+                .filter(models.TestRun.id.in_(ids))\
+                .delete(synchronize_session=False)
+
+            purged_count += len(ids)
+
+        session.commit()
+        session.expunge_all()
+
+    LOG.info('Purged %s expired test runs.', purged_count)
+    return purged_count
+
+
+def _purge_test_runs(dbpath):
+    with engine.contexted_session(dbpath) as session:
+        return purge_test_runs(session)
+
+
+def purge_test_runs_periodically(dbpath, interval):
+    """Purges expired test runs every interval seconds. Purge is
+    performed in native thread, so that requests served by the same
+    process are not stalled while batches are processed.
+    """
+    while True:
+        gevent.sleep(interval)
+        try:
+            gevent.get_hub().threadpool.apply(_purge_test_runs, (dbpath,))
+        except Exception:
+            LOG.exception('Failed to purge expired test runs.')
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from gevent import local
 try:
     from oslo.config import cfg
 except ImportError:
@@ -64,5 +65,8 @@ def setup_app(config=None, session=None):
         debug=pecan.conf.debug,
         force_canonical=True,
         hooks=app_hooks,
+        # requests are served by greenlets of one thread, so state
+        # of request must not be shared by them
+        context_local_factory=local.local,
     )
     return access_control.setup(app)
@@ -12,6 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import re
+
 try:
     from oslo.config import cfg
 except ImportError:
@@ -20,18 +23,233 @@ try:
     from oslo.serialization import jsonutils
 except ImportError:
     from oslo_serialization import jsonutils
+try:
+    from oslo.utils import timeutils
+except ImportError:
+    from oslo_utils import timeutils
 from pecan import abort
 from pecan import expose
+from pecan import jsonify
 from pecan import request
+from pecan import response
 from pecan import rest
+from sqlalchemy import and_
 from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import orm
 from sqlalchemy.orm import joinedload
 
 from fuel_plugin import consts
 from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter import scheduler
+from fuel_plugin.ostf_adapter.storage import events
 from fuel_plugin.ostf_adapter.storage import models
 
 
+# number of test runs fetched from database and written
+# to response at once
+TESTRUNS_BATCH_SIZE = 100
+
+# <the latest change>:<transaction>:<snapshot of transactions>
+VERSION_RE = re.compile(
+    r'^(?P<change_seq>\d+):(?P<txid>\d+):(?P<snapshot>\d+:\d+:[\d,]*)$')
+
+
+def _parse_int(value, name, minimum=0):
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        abort(400, '{0} must be an integer'.format(name))
+    if value < minimum:
+        abort(400, '{0} must not be less than {1}'.format(name, minimum))
+    return value
+
+
+def _parse_time(value, name):
+    if value is None:
+        return None
+    try:
+        return timeutils.normalize_time(timeutils.parse_isotime(value))
+    except ValueError:
+        abort(400, '{0} must be a time in ISO 8601 format'.format(name))
+
+
+def _fetch_test_runs(bind, query, batch_size, marker):
+    """Returns encoded test runs of one batch. Session is closed before
+    they are written, so connection is not held while client reads them.
+    """
+    session = orm.Session(bind=bind)
+    try:
+        batch = query.with_session(session)
+        if marker is not None:
+            batch = batch.filter(models.TestRun.id > marker)
+        return [
+            (test_run.id, jsonify.encode(test_run.frontend))
+            for test_run in batch
+            .options(orm.subqueryload('tests'))
+            .order_by(models.TestRun.id)
+            .limit(batch_size)
+        ]
+    finally:
+        session.close()
+
+
+def _stream_test_runs(bind, query, limit, marker):
+    """Yields JSON list of test runs by chunks. Test runs are fetched
+    in batches by id together with their tests.
+    """
+    yield '['
+    count = 0
+    while limit is None or count < limit:
+        batch_size = TESTRUNS_BATCH_SIZE
+        if limit is not None:
+            batch_size = min(batch_size, limit - count)
+
+        batch = _fetch_test_runs(bind, query, batch_size, marker)
+        for test_run_id, encoded in batch:
+            yield (',' if count else '') + encoded
+            count += 1
+
+        if len(batch) < batch_size:
+            break
+        marker = batch[-1][0]
+    yield ']'
+
+
+def _get_last_test_runs_ids(session, cluster_id):
+    return session.query(func.max(models.TestRun.id)) \
+        .group_by(models.TestRun.test_set_id)\
+        .filter_by(cluster_id=cluster_id)
+
+
+def _get_last_test_runs(session, cluster_id):
+    test_runs = session.query(models.TestRun)\
+        .options(joinedload('tests'))\
+        .filter(models.TestRun.id.in_(
+            _get_last_test_runs_ids(session, cluster_id)))
+
+    return [item.frontend for item in test_runs]
+
+
+def _get_last_changes_version(session, cluster_id):
+    """Returns version of the last test runs of cluster: the latest
+    change of them, transaction and snapshot of transactions they
+    were read in. Transaction is 0 unless it has written anything,
+    reading does not take id of transaction.
+    """
+    test_run_ids = _get_last_test_runs_ids(session, cluster_id)
+
+    # all are taken by single statement, so every change seen in
+    # snapshot is not later than the latest one
+    txid, snapshot, change_seq = session.query(
+        func.coalesce(func.txid_current_if_assigned(), 0),
+        func.txid_current_snapshot(),
+        func.greatest(
+            session.query(func.max(models.TestRun.change_seq))
+            .filter(models.TestRun.id.in_(test_run_ids))
+            .as_scalar(),
+            session.query(func.max(models.Test.change_seq))
+            .filter(models.Test.test_run_id.in_(test_run_ids))
+            .as_scalar()
+        )
+    ).one()
+
+    return '{0}:{1}:{2}'.format(change_seq or 0, txid, snapshot)
+
+
+def _parse_version(value, name):
+    """Parses version given by _get_last_changes_version."""
+    if value is None:
+        return None
+    match = VERSION_RE.match(value)
+    if match is None:
+        abort(400, '{0} must be a version of test runs'.format(name))
+    return (int(match.group('change_seq')), int(match.group('txid')),
+            match.group('snapshot'))
+
+
+def _get_cached_version():
+    """Returns version client has cached according to If-None-Match."""
+    for etag in getattr(request.if_none_match, 'etags', []):
+        if VERSION_RE.match(etag):
+            return _parse_version(etag, 'If-None-Match')
+    return None
+
+
+def _is_changed_since(model, version):
+    """Whether change of row is later than the latest one of version
+    or was not committed yet when version was taken. Values of sequence
+    are allocated before commit, so the latter catches changes which
+    got lower values, but were committed later.
+
+    Own transaction is not visible in its snapshot, though changes made
+    by it before version was taken were seen.
+    """
+    change_seq, txid, snapshot = version
+    return or_(
+        model.change_seq > change_seq,
+        and_(~func.txid_visible_in_snapshot(model.change_txid, snapshot),
+             model.change_txid != txid)
+    )
+
+
+def _get_last_test_runs_changes(session, cluster_id, since):
+    """Returns the last test runs of cluster changed after given
+    version, only tests changed after it are included.
+    """
+    test_run_ids = _get_last_test_runs_ids(session, cluster_id)
+
+    changed_tests = collections.defaultdict(list)
+    for test in session.query(models.Test)\
+            .filter(models.Test.test_run_id.in_(test_run_ids),
+                    _is_changed_since(models.Test, since))\
+            .order_by(models.Test.name):
+        changed_tests[test.test_run_id].append(test)
+
+    is_changed = _is_changed_since(models.TestRun, since)
+    if changed_tests:
+        is_changed = or_(is_changed,
+                         models.TestRun.id.in_(list(changed_tests)))
+
+    test_runs = session.query(models.TestRun)\
+        .options(orm.noload('tests'))\
+        .filter(models.TestRun.id.in_(test_run_ids), is_changed)\
+        .order_by(models.TestRun.id)
+
+    return [
+        test_run.get_frontend(changed_tests[test_run.id])
+        for test_run in test_runs
+    ]
+
+
+def _format_event(data, event=None):
+    message = 'data: {0}\n\n'.format(jsonify.encode(data))
+    if event is not None:
+        message = 'event: {0}\n'.format(event) + message
+    return message
+
+
+def _stream_events(subscription, snapshot):
+    """Yields Server-Sent Events: snapshot of test runs followed by
+    their changes until client disconnects or stops reading.
+    """
+    heartbeat_interval = cfg.CONF.adapter.events_heartbeat_interval
+    try:
+        yield _format_event(snapshot, event='snapshot')
+        while True:
+            event = subscription.get(timeout=heartbeat_interval)
+            if event is not None:
+                yield _format_event(event)
+            elif subscription.closed:
+                break
+            else:
+                yield ': keep-alive\n\n'
+    finally:
+        subscription.close()
+
+
 class BaseRestController(rest.RestController):
     def _handle_get(self, method, remainder, request=None):
         if len(remainder):
@@ -72,19 +290,21 @@ class TestsController(BaseRestController):
     @expose('json')
     def get(self, cluster):
         mixins.discovery_check(request.session, cluster, request.token)
-        needed_tests_list = request.session\
-            .query(models.ClusterTestingPattern.tests)\
-            .filter_by(cluster_id=cluster)
-
-        result = []
-        for tests in needed_tests_list:
-            tests_to_return = request.session.query(models.Test)\
-                .filter(models.Test.name.in_(tests[0]))\
-                .all()
-
-            result.extend(tests_to_return)
 
-        result.sort(key=lambda test: test.name)
+        needed_tests = request.session\
+            .query(models.ClusterTestingPattern.test_set_id,
+                   func.unnest(models.ClusterTestingPattern.tests)
+                   .label('name'))\
+            .filter(models.ClusterTestingPattern.cluster_id == cluster)\
+            .subquery()
+
+        result = request.session.query(models.Test)\
+            .join(needed_tests, and_(
+                models.Test.test_set_id == needed_tests.c.test_set_id,
+                models.Test.name == needed_tests.c.name))\
+            .filter(models.Test.test_run_id.is_(None))\
+            .order_by(models.Test.name)\
+            .all()
 
         if result:
             return [item.frontend for item in result]
@@ -96,13 +316,50 @@ class TestrunsController(BaseRestController):
 
     _custom_actions = {
         'last': ['GET'],
+        'events': ['GET'],
     }
 
     @expose('json')
-    def get_all(self):
-        test_runs = request.session.query(models.TestRun).all()
-
-        return [item.frontend for item in test_runs]
+    def get_all(self, **kwargs):
+        """Returns test runs ordered by id. Result is paginated by limit
+        and marker (id of the last test run on the previous page) and
+        can be filtered by cluster_id, testset, status and time window
+        (since, until) in which test runs were started. Test runs
+        launched together are selected by batch_id.
+        """
+        # parameters are accepted as keywords only, otherwise
+        # pecan treats them as parts of the path
+        limit = _parse_int(kwargs.get('limit'), 'limit', minimum=1)
+        marker = _parse_int(kwargs.get('marker'), 'marker')
+        cluster_id = _parse_int(kwargs.get('cluster_id'), 'cluster_id')
+        testset = kwargs.get('testset')
+        batch_id = kwargs.get('batch_id')
+        status = kwargs.get('status')
+        since = _parse_time(kwargs.get('since'), 'since')
+        until = _parse_time(kwargs.get('until'), 'until')
+        if status is not None and status not in consts.TESTRUN_STATUSES:
+            abort(400, 'Unknown test run status {0}'.format(status))
+
+        test_runs = request.session.query(models.TestRun)
+        if cluster_id is not None:
+            test_runs = test_runs.filter_by(cluster_id=cluster_id)
+        if testset is not None:
+            test_runs = test_runs.filter_by(test_set_id=testset)
+        if batch_id is not None:
+            test_runs = test_runs.filter_by(batch_id=batch_id)
+        if status is not None:
+            test_runs = test_runs.filter_by(status=status)
+        if since is not None:
+            test_runs = test_runs.filter(models.TestRun.started_at >= since)
+        if until is not None:
+            test_runs = test_runs.filter(models.TestRun.started_at < until)
+
+        # response is written while test runs are fetched, so every
+        # batch is fetched by its own session rather than request one
+        response.content_type = 'application/json'
+        response.app_iter = _stream_test_runs(request.session.get_bind(),
+                                              test_runs, limit, marker)
+        return response
 
     @expose('json')
     def get_one(self, test_run_id):
@@ -113,63 +370,107 @@ class TestrunsController(BaseRestController):
         return {}
 
     @expose('json')
-    def get_last(self, cluster_id):
-        test_run_ids = request.session.query(func.max(models.TestRun.id)) \
-            .group_by(models.TestRun.test_set_id)\
-            .filter_by(cluster_id=cluster_id)
+    def get_last(self, cluster_id, **kwargs):
+        """Returns the last test run of every test set of cluster.
+
+        Version of them is sent as ETag. If it is passed back as since
+        parameter, only test runs and tests changed after it are
+        returned. 304 is returned if nothing was changed after since
+        or version matching If-None-Match.
+        """
+        since = _parse_version(kwargs.get('since'), 'since')
+        cached = _get_cached_version()
+
+        response.etag = _get_last_changes_version(request.session,
+                                                  cluster_id)
+        if since is not None or cached is not None:
+            changes = _get_last_test_runs_changes(request.session,
+                                                  cluster_id, since or cached)
+            if not changes:
+                response.status = 304
+                return response
+            if since is not None:
+                return changes
+        return _get_last_test_runs(request.session, cluster_id)
 
-        test_runs = request.session.query(models.TestRun)\
-            .options(joinedload('tests'))\
-            .filter(models.TestRun.id.in_(test_run_ids))
-
-        return [item.frontend for item in test_runs]
+    @expose('json')
+    def get_events(self, cluster_id):
+        """Streams progress of test runs of cluster as Server-Sent Events.
+
+        The first event is 'snapshot' with the last test runs of cluster,
+        as /testruns/last returns them. It is followed by changes of test
+        runs: statuses of their tests as they are saved and statuses of
+        test runs when they are finished.
+        """
+        cluster_id = _parse_int(cluster_id, 'cluster_id')
+
+        # subscribe before snapshot is taken, so that changes made
+        # meanwhile are not missed
+        try:
+            subscription = events.get_listener(cfg.CONF.adapter.dbpath)\
+                .subscribe(cluster_id)
+        except events.NotListening:
+            abort(503, 'Events of test runs are not available')
+        try:
+            snapshot = _get_last_test_runs(request.session, cluster_id)
+        except Exception:
+            subscription.close()
+            raise
+
+        response.content_type = 'text/event-stream'
+        response.cache_control = 'no-cache'
+        response.app_iter = _stream_events(subscription, snapshot)
+        return response
 
     @expose('json')
     def post(self):
+        """Launches test runs of several test sets at once.
+
+        All test runs are created in one transaction and are put into
+        queue from which scheduler starts them. Id of the batch they
+        belong to is returned in X-Batch-Id header.
+        """
         test_runs = jsonutils.loads(request.body)
         if 'objects' in test_runs:
             test_runs = test_runs['objects']
 
-        # Discover tests for all clusters in request
-        clusters_ids = []
-        nedded_testsets = set()
-        for test_run in test_runs:
-            cluster_id = test_run['metadata']['cluster_id']
-            if cluster_id not in clusters_ids:
-                clusters_ids.append(cluster_id)
-                mixins.discovery_check(request.session,
-                                       cluster_id,
-                                       request.token)
-            nedded_testsets.add(test_run['testset'])
+        try:
+            needed_testsets = set(test_run['testset']
+                                  for test_run in test_runs)
+            clusters_ids = set(test_run['metadata']['cluster_id']
+                               for test_run in test_runs)
+        except (KeyError, TypeError):
+            abort(400, 'Every test run must have testset and cluster_id')
+
         # Validate testsets from request
-        test_sets = set([testset.id for testset in request.
-                        session.query(models.TestSet).all()])
-        if nedded_testsets - test_sets:
+        test_sets = dict(
+            (test_set.id, test_set) for test_set in request.session
+            .query(models.TestSet)
+            .filter(models.TestSet.id.in_(needed_testsets))
+        )
+        if needed_testsets - set(test_sets):
             abort(400)
 
-        res = []
-        for test_run in test_runs:
-            test_set = test_run['testset']
-            metadata = test_run['metadata']
-            tests = test_run.get('tests', [])
-
-            test_set = models.TestSet.get_test_set(
-                request.session,
-                test_set
-            )
-
-            test_run = models.TestRun.start(
-                request.session,
-                test_set,
-                metadata,
-                tests,
-                cfg.CONF.adapter.dbpath,
-                token=request.token
-            )
-
-            res.append(test_run)
-
-        return res
+        # Discover tests for all clusters in request
+        for cluster_id in clusters_ids:
+            mixins.discovery_check(request.session,
+                                   cluster_id,
+                                   request.token)
+
+        batch_id, created_test_runs = models.TestRun.add_batch(
+            request.session,
+            [(test_sets[test_run['testset']],
+              test_run['metadata']['cluster_id'],
+              test_run.get('tests', []),
+              test_run['metadata'].get('ostf_os_access_creds'))
+             for test_run in test_runs],
+            token=request.token
+        )
+        scheduler.wake_up()
+
+        response.headers['X-Batch-Id'] = batch_id
+        return [test_run.frontend if test_run is not None else {}
+                for test_run in created_test_runs]
 
     @expose('json')
     def put(self):
@@ -194,4 +495,5 @@ class TestrunsController(BaseRestController):
                                                  ostf_os_access_creds,
                                                  tests=tests,
                                                  token=request.token))
+        scheduler.wake_up()
         return data
@@ -0,0 +1,134 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Measures cost of test run creation (models.TestRun.add_test_run).
+
+Copying of tests row by row with commit after every test (as it was done
+before) is compared with copying by single INSERT ... SELECT statement.
+Benchmark uses database configured for adapter and removes all data
+it creates. Usage:
+
+    python -m fuel_plugin.testing.benchmarks.add_test_run [runs] [tests]
+"""
+
+import sys
+import time
+
+from fuel_plugin import consts
+from fuel_plugin.ostf_adapter import config
+from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import models
+
+
+TEST_SET_ID = 'benchmark_add_test_run'
+CLUSTER_ID = 2 ** 31 - 1
+
+
+def add_test_run_per_test(session, test_set, cluster_id, tests=None):
+    """Former implementation of TestRun.add_test_run."""
+    predefined_tests = tests or []
+    tests_names = session.query(models.ClusterTestingPattern.tests)\
+        .filter_by(test_set_id=test_set, cluster_id=cluster_id)\
+        .scalar()
+
+    tests = session.query(models.Test)\
+        .filter(models.Test.name.in_(tests_names))\
+        .filter_by(test_set_id=test_set)\
+        .filter_by(test_run_id=None)
+
+    test_run = models.TestRun(test_set_id=test_set, cluster_id=cluster_id,
+                              status=consts.TESTRUN_STATUSES.running)
+    session.add(test_run)
+
+    for test in tests:
+        new_test = test.copy_test(test_run, predefined_tests)
+        session.add(new_test)
+        test_run.tests.append(new_test)
+        session.commit()
+    session.flush()
+
+    return test_run
+
+
+def prepare_data(session, tests_count):
+    tests_names = ['benchmark.Benchmark.test_{0:04d}'.format(i)
+                   for i in range(tests_count)]
+
+    session.add(models.TestSet(id=TEST_SET_ID,
+                               description='add_test_run benchmark',
+                               deployment_tags=[],
+                               exclusive_testsets=[]))
+    session.add(models.ClusterState(id=CLUSTER_ID, deployment_tags=[]))
+    session.flush()
+
+    session.add_all([
+        models.Test(name=name, title=name, description='benchmark',
+                    test_set_id=TEST_SET_ID, deployment_tags=[])
+        for name in tests_names
+    ])
+    session.add(models.ClusterTestingPattern(cluster_id=CLUSTER_ID,
+                                             test_set_id=TEST_SET_ID,
+                                             tests=tests_names))
+    session.commit()
+
+
+def clean_data(session):
+    session.query(models.TestRun)\
+        .filter_by(cluster_id=CLUSTER_ID)\
+        .delete(synchronize_session=False)
+    session.query(models.ClusterTestingPattern)\
+        .filter_by(cluster_id=CLUSTER_ID)\
+        .delete(synchronize_session=False)
+    session.query(models.ClusterState)\
+        .filter_by(id=CLUSTER_ID)\
+        .delete(synchronize_session=False)
+    session.query(models.TestSet)\
+        .filter_by(id=TEST_SET_ID)\
+        .delete(synchronize_session=False)
+    session.commit()
+
+
+def measure(session, add_test_run, runs):
+    started_at = time.time()
+    for _ in range(runs):
+        add_test_run(session, TEST_SET_ID, CLUSTER_ID)
+    return (time.time() - started_at) / runs
+
+
+def main(runs=20, tests_count=60):
+    config.init_config([])
+
+    with engine.contexted_session(config.cfg.CONF.adapter.dbpath) as session:
+        clean_data(session)
+        prepare_data(session, tests_count)
+        try:
+            results = [
+                ('per test commit', measure(session,
+                                            add_test_run_per_test,
+                                            runs)),
+                ('INSERT ... SELECT', measure(session,
+                                              models.TestRun.add_test_run,
+                                              runs)),
+            ]
+        finally:
+            clean_data(session)
+
+    print('Test run creation with {0} tests, '
+          'average of {1} runs:'.format(tests_count, runs))
+    for name, taken in results:
+        print('  {0:<20} {1:8.2f} ms'.format(name, taken * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -378,6 +378,11 @@ class BaseIntegrationTest(BaseUnitTest):
         cls.requests_mock.stop()
 
     def setUp(self):
+        # cluster attributes are mocked differently by tests
+        mixins.invalidate_cluster_attrs()
+        # credentials of queued test runs are kept in memory
+        models.QueuedTestRun.credentials.clear()
+
         self.connection = self.engine.connect()
         self.trans = self.connection.begin()
         self.session = scoped_session(sessionmaker())
@@ -395,7 +400,6 @@ class BaseIntegrationTest(BaseUnitTest):
 
     def discovery(self):
         """Discover dummy tests used for testsing."""
-        mixins.TEST_REPOSITORY = []
         nose_discovery.discovery(path=TEST_PATH, session=self.session)
         mixins.cache_test_repository(self.session)
         self.session.flush()
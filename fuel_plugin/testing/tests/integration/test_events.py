@@ -0,0 +1,74 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import gevent
+import mock
+
+from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import events
+from fuel_plugin.testing.tests import base
+
+
+class TestEventsListener(base.BaseIntegrationTest):
+
+    def test_committed_events_are_received(self):
+        listener = events.Listener(self.dbpath)
+        subscription = events.Subscription(listener, cluster_id=1)
+        listener.subscriptions.add(subscription)
+
+        connection = listener._connect()
+        self.addCleanup(connection.close)
+        greenlet = gevent.spawn(listener._listen, connection)
+        self.addCleanup(greenlet.kill)
+
+        with engine.contexted_session(self.dbpath) as session:
+            events.publish(session, 1, 2, results=[
+                ('other_cluster_test', {'status': 'success'})])
+            events.publish(session, 3, 1, results=[
+                ('fast_pass', {'status': 'success', 'time_taken': 1.0})])
+
+            gevent.sleep(0.1)
+            # nothing is delivered before commit
+            self.assertIsNone(subscription.get(timeout=0))
+
+        event = subscription.get(timeout=5)
+        self.assertEqual(event, {
+            'test_run_id': 3,
+            'cluster_id': 1,
+            'status': None,
+            'tests': [{'id': 'fast_pass', 'status': 'success',
+                       'step': None, 'taken': 1.0}],
+        })
+
+    def test_events_committed_after_subscribe_are_received(self):
+        listener = events.Listener(self.dbpath)
+        subscription = listener.subscribe(cluster_id=1)
+        self.addCleanup(subscription.close)
+
+        with engine.contexted_session(self.dbpath) as session:
+            events.publish(session, 3, 1, status='finished')
+
+        self.assertEqual(subscription.get(timeout=5)['status'], 'finished')
+
+    def test_subscriptions_are_closed_when_listening_fails(self):
+        listener = events.Listener(self.dbpath)
+        subscription = listener.subscribe(cluster_id=1)
+
+        with mock.patch.object(listener, 'dispatch',
+                               side_effect=Exception()):
+            with engine.contexted_session(self.dbpath) as session:
+                events.publish(session, 3, 1, status='finished')
+
+            self.assertIsNone(subscription.get(timeout=5))
+        self.assertTrue(subscription.closed)
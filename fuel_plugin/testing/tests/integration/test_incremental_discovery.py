@@ -0,0 +1,150 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import sys
+import tempfile
+
+from fuel_plugin import consts
+from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter.nose_plugin import nose_discovery
+from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.testing.tests import base
+
+
+class TestIncrementalDiscovery(base.BaseIntegrationTest):
+
+    def setUp(self):
+        super(TestIncrementalDiscovery, self).setUp()
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        # package name is unique for every test, otherwise nose
+        # would take modules imported by previous tests
+        package = 'dummy_{0}'.format(os.path.basename(self.tmp_dir))
+        self.addCleanup(self.unload_package, package)
+
+        self.tests_path = os.path.join(self.tmp_dir, package)
+        shutil.copytree(base.TEST_PATH, self.tests_path,
+                        ignore=shutil.ignore_patterns('*.pyc'))
+
+    def unload_package(self, package):
+        for name in list(sys.modules):
+            if name == package or name.startswith(package + '.'):
+                del sys.modules[name]
+
+    def discovered(self):
+        test_sets = set(
+            test_set_id for test_set_id,
+            in self.session.query(models.TestSet.id))
+        tests = sorted(
+            (test.test_set_id, test.name) for test
+            in self.session.query(models.Test).filter_by(test_run_id=None))
+        return test_sets, tests
+
+    def full_discovery(self):
+        self.session.query(models.TestSet).delete()
+        self.session.flush()
+        nose_discovery.discovery(self.tests_path, self.session)
+        return self.discovered()
+
+    def cluster_patterns(self, cluster_id):
+        return dict(
+            (pattern.test_set_id, sorted(pattern.tests)) for pattern
+            in self.session.query(models.ClusterTestingPattern)
+            .filter_by(cluster_id=cluster_id))
+
+    def module_path(self, name):
+        return os.path.realpath(os.path.join(self.tests_path, name))
+
+    def test_discovery_is_same_as_full_one(self):
+        self.assertTrue(nose_discovery.incremental_discovery(
+            self.tests_path, self.session))
+        discovered = self.discovered()
+
+        self.assertIn('general_test', discovered[0])
+        self.assertEqual(discovered, self.full_discovery())
+
+    def test_ast_discovery_is_same_as_full_one(self):
+        self.assertTrue(nose_discovery.incremental_discovery(
+            self.tests_path, self.session,
+            backend=nose_discovery.AST_BACKEND))
+
+        self.assertEqual(self.discovered(), self.full_discovery())
+
+    def test_unchanged_modules_are_not_inspected(self):
+        nose_discovery.incremental_discovery(self.tests_path, self.session)
+        discovered = self.discovered()
+
+        # modification time is changed, but content is not
+        module_path = self.module_path('general_test.py')
+        os.utime(module_path, (0, 0))
+
+        self.assertFalse(nose_discovery.incremental_discovery(
+            self.tests_path, self.session))
+        self.assertEqual(self.discovered(), discovered)
+
+        manifest = self.session.query(models.DiscoveryManifest)\
+            .filter_by(path=module_path)\
+            .one()
+        self.assertEqual(manifest.mtime, 0)
+
+    def test_changed_modules_are_inspected(self):
+        nose_discovery.incremental_discovery(self.tests_path, self.session)
+        test_sets, tests = self.discovered()
+
+        with open(self.module_path('general_test.py'), 'a') as f:
+            f.write('\n# changed\n')
+        os.remove(self.module_path('stopped_test.py'))
+
+        self.assertTrue(nose_discovery.incremental_discovery(
+            self.tests_path, self.session))
+
+        expected_tests = [
+            (test_set_id, name) for test_set_id, name in tests
+            if test_set_id != 'stopped_test'
+        ]
+        self.assertEqual(self.discovered(),
+                         (test_sets - set(['stopped_test']), expected_tests))
+
+    def test_test_runs_of_unchanged_test_sets_are_kept(self):
+        nose_discovery.incremental_discovery(self.tests_path, self.session)
+
+        cluster_id = 1
+        self.session.add(models.ClusterState(
+            id=cluster_id, deployment_tags=[],
+            release_version='2015.1.0-8.0'))
+        self.session.flush()
+        mixins.refresh_testing_patterns(
+            self.session, self.discovered()[0])
+        patterns = self.cluster_patterns(cluster_id)
+        self.assertIn('general_test', patterns)
+
+        test_run = models.TestRun.add_test_run(
+            self.session, 'general_test', cluster_id,
+            status=consts.TESTRUN_STATUSES.finished, commit=False)
+        test_run_id = test_run.id
+
+        with open(self.module_path('stopped_test.py'), 'a') as f:
+            f.write('\n# changed\n')
+
+        self.assertTrue(nose_discovery.incremental_discovery(
+            self.tests_path, self.session))
+        self.session.expire_all()
+
+        self.assertIsNotNone(
+            self.session.query(models.TestRun).get(test_run_id))
+        self.assertEqual(self.cluster_patterns(cluster_id), patterns)
@@ -12,13 +12,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import datetime
+import os
+import signal
 
 import mock
 
 from fuel_plugin.testing.tests import base
 
 from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter.nose_plugin import nose_adapter
 
 from fuel_plugin.ostf_adapter.storage import models
 
@@ -76,6 +80,21 @@ class TestModelTestMethods(base.BaseIntegrationTest):
 
         self.check_model_obj_attrs(self.test_to_check, expected_data)
 
+    def test_add_results(self):
+        expected_data = {
+            'message': 'test_message',
+            'status': 'failure',
+            'time_taken': 3.2
+        }
+
+        models.Test.add_results(self.session,
+                                self.test_run.id,
+                                [(self.test_obj.name, expected_data),
+                                 ('unknown.test', expected_data)])
+        self.session.expire_all()
+
+        self.check_model_obj_attrs(self.test_to_check, expected_data)
+
     def test_update_running_tests_default_status(self):
         models.Test.update_running_tests(self.session,
                                          self.test_run.id)
@@ -228,6 +247,21 @@ class TestModelTestRunMethods(base.BaseIntegrationTest):
         self.assertItemsEqual(test_names_from_test_run,
                               test_names_from_test_set)
 
+    @mock.patch.object(models.events, 'publish')
+    def test_add_test_run_is_published(self, publish_mock):
+        test_run = models.TestRun.add_test_run(
+            self.session, self.test_set_id,
+            self.cluster_id
+        )
+
+        publish_mock.assert_called_once_with(
+            self.session, test_run.id, self.cluster_id,
+            status='running', results=[
+                (test.name, {'status': 'wait_running', 'step': None,
+                             'time_taken': None})
+                for test in test_run.tests
+            ])
+
     def test_add_test_run_non_default_status(self):
         expected_status = 'finished'
         test_run = models.TestRun.add_test_run(
@@ -275,6 +309,27 @@ class TestModelTestRunMethods(base.BaseIntegrationTest):
         )
         self.check_enabled(expected_test_names, test_run.tests)
 
+    def test_finish_orphaned(self):
+        test_run = models.TestRun.add_test_run(
+            self.session, self.test_set_id,
+            self.cluster_id
+        )
+        test_run.pid = None
+
+        alive_test_run = models.TestRun.add_test_run(
+            self.session, 'stopped_test',
+            self.cluster_id
+        )
+        alive_test_run.pid = os.getpid()
+        self.session.flush()
+
+        self.assertEqual(models.TestRun.finish_orphaned(self.session), 1)
+
+        self.assertEqual(test_run.status, 'finished')
+        self.assertTrue(all(test.status == 'stopped'
+                            for test in test_run.tests))
+        self.assertEqual(alive_test_run.status, 'running')
+
     def test_update_testrun_not_finished_status(self):
         test_run = models.TestRun.add_test_run(
             self.session, self.test_set_id,
@@ -383,8 +438,71 @@ class TestModelTestRunMethods(base.BaseIntegrationTest):
 
         self.assertEqual(frontend, {})
 
+    def test_add_batch(self):
+        test_set = self.session.query(models.TestSet)\
+            .filter_by(id=self.test_set_id).one()
+
+        batch_id, test_runs = models.TestRun.add_batch(
+            self.session,
+            [(test_set, self.cluster_id, None, {'username': 'admin'}),
+             (test_set, self.cluster_id, None, None)],
+            token='fake_token'
+        )
+
+        # the second test run is skipped while the first one is running
+        self.assertIsNone(test_runs[1])
+        self.assertEqual(test_runs[0].batch_id, batch_id)
+        self.assertEqual(
+            self.session.query(models.TestRun.id)
+            .filter_by(batch_id=batch_id).all(),
+            [(test_runs[0].id,)])
+
+        queued = self.session.query(models.QueuedTestRun).one()
+        self.assertEqual(
+            (queued.test_run_id, queued.priority),
+            (test_runs[0].id, test_set.test_runs_ordering_priority))
+
+        # secrets are not stored in database
+        self.assertEqual(
+            models.QueuedTestRun.credentials,
+            {test_runs[0].id: ({'username': 'admin'}, 'fake_token')})
+
     @mock.patch('fuel_plugin.ostf_adapter.storage.models.nose_plugin')
-    def test_restart_test_run(self, nose_plugin_mock):
+    def test_dispatch(self, nose_plugin_mock):
+        test_runs = [
+            models.TestRun.add_test_run(self.session, test_set_id,
+                                        self.cluster_id)
+            for test_set_id in (self.test_set_id, 'stopped_test')
+        ]
+
+        plugin_inst_mock = mock.Mock()
+        plugin_inst_mock.run.side_effect = [None, Exception()]
+        nose_plugin_mock.get_plugin.return_value = plugin_inst_mock
+
+        @contextlib.contextmanager
+        def contexted_session(dbpath):
+            yield self.session
+
+        with mock.patch.object(models.engine, 'contexted_session',
+                               contexted_session):
+            models.TestRun.dispatch(
+                'fake_db_path',
+                [(test_runs[0].id, {'username': 'admin'}, 'fake_token',
+                  None),
+                 (test_runs[1].id, None, 'fake_token', ['fake_test']),
+                 (-1, None, None, None)])
+
+        self.assertEqual(plugin_inst_mock.run.call_args_list, [
+            mock.call(test_runs[0], test_runs[0].test_set, 'fake_db_path',
+                      {'username': 'admin'}, None, token='fake_token'),
+            mock.call(test_runs[1], test_runs[1].test_set, 'fake_db_path',
+                      None, ['fake_test'], token='fake_token'),
+        ])
+        # test run which failed to start does not block next launches
+        self.assertEqual(test_runs[0].status, 'running')
+        self.assertEqual(test_runs[1].status, 'finished')
+
+    def test_restart_test_run(self):
         test_run = models.TestRun.add_test_run(
             self.session, self.test_set_id,
             self.cluster_id
@@ -395,14 +513,9 @@ class TestModelTestRunMethods(base.BaseIntegrationTest):
             'ostf_os_access_creds': [],
             'dbpath': 'fake_db_path',
             'token': 'fake_token',
-            'tests': 'fake_tests'
+            'tests': ['fake_test']
         }
 
-        plugin_inst_mock = mock.Mock()
-        nose_plugin_mock.get_plugin = mock.Mock(
-            return_value=plugin_inst_mock
-        )
-
         with mock.patch.object(
                 models.TestRun, 'is_last_running',
                 new=mock.Mock(return_value=True)) as is_last_run_mock:
@@ -419,17 +532,17 @@ class TestModelTestRunMethods(base.BaseIntegrationTest):
             test_run.test_set_id,
             test_run.cluster_id
         )
-        nose_plugin_mock.get_plugin.assert_called_once_with(
-            test_run.test_set.driver
-        )
         update_tests_mock.assert_called_once_with(
             self.session, test_run.id, kwargs['tests']
         )
-        plugin_inst_mock.run.assert_called_once_with(
-            test_run, test_run.test_set, kwargs['dbpath'],
-            kwargs['ostf_os_access_creds'], kwargs['tests'],
-            token=kwargs['token']
-        )
+
+        # restarted test run is started by scheduler
+        queued = self.session.query(models.QueuedTestRun).one()
+        self.assertEqual(
+            (queued.test_run_id, queued.tests, queued.has_credentials),
+            (test_run.id, kwargs['tests'], True))
+        self.assertEqual(models.QueuedTestRun.credentials,
+                         {test_run.id: ([], 'fake_token')})
 
     def test_run_restart_is_running(self):
         test_run = models.TestRun.add_test_run(
@@ -485,6 +598,80 @@ class TestModelTestRunMethods(base.BaseIntegrationTest):
             self.session, test_run.id, status='stopped'
         )
 
+    @mock.patch('fuel_plugin.ostf_adapter.storage.models.nose_plugin')
+    def test_stop_test_run_waiting_for_worker(self, nose_plugin_mock):
+        test_run = models.TestRun.add_test_run(
+            self.session, self.test_set_id,
+            self.cluster_id
+        )
+        nose_plugin_mock.get_plugin.return_value.kill.return_value = False
+
+        test_run.stop(self.session)
+
+        self.assertEqual(test_run.status, 'finished')
+        self.assertIsNotNone(test_run.ended_at)
+        self.assertTrue(all(test.status == 'stopped'
+                            for test in test_run.tests))
+
+    @mock.patch.object(models.events, 'publish')
+    @mock.patch('fuel_plugin.ostf_adapter.storage.models.nose_plugin')
+    def test_stop_test_run_waiting_for_worker_is_published(
+            self, nose_plugin_mock, publish_mock):
+        test_run = models.TestRun.add_test_run(
+            self.session, self.test_set_id,
+            self.cluster_id
+        )
+        nose_plugin_mock.get_plugin.return_value.kill.return_value = False
+
+        test_run.stop(self.session)
+
+        self.assertEqual(publish_mock.call_args, mock.call(
+            self.session, test_run.id, self.cluster_id,
+            status='finished', results=mock.ANY))
+        self.assertTrue(all(data['status'] == 'stopped' for _, data
+                            in publish_mock.call_args[1]['results']))
+
+    @mock.patch('fuel_plugin.ostf_adapter.storage.models.nose_plugin')
+    def test_stop_started_test_run_not_killed(self, nose_plugin_mock):
+        test_run = models.TestRun.add_test_run(
+            self.session, self.test_set_id,
+            self.cluster_id
+        )
+        test_run.pid = 12345
+        self.session.flush()
+        nose_plugin_mock.get_plugin.return_value.kill.return_value = False
+
+        test_run.stop(self.session)
+
+        self.assertEqual(test_run.status, 'running')
+
+    def test_stopped_test_run_is_not_started_by_worker(self):
+        test_run = models.TestRun.add_test_run(
+            self.session, self.test_set_id,
+            self.cluster_id
+        )
+        test_run.update('finished')
+        self.session.flush()
+
+        @contextlib.contextmanager
+        def contexted_session(dbpath):
+            yield self.session
+
+        self.addCleanup(signal.signal, signal.SIGUSR1,
+                        signal.getsignal(signal.SIGUSR1))
+
+        driver = nose_adapter.NoseDriver()
+        with mock.patch.object(nose_adapter.engine, 'contexted_session',
+                               contexted_session), \
+                mock.patch.object(nose_adapter.logger, 'ResultsLogger'), \
+                mock.patch.object(driver, '_execute') as execute_mock:
+            driver._run_tests('fake_lock_path', 'fake_db_path', test_run.id,
+                              self.cluster_id, {}, [], None,
+                              self.test_set_id)
+
+        self.assertFalse(execute_mock.called)
+        self.assertIsNone(test_run.pid)
+
     def test_is_last_running(self):
         is_last_running = models.TestRun.is_last_running(
             self.session, self.test_set_id, self.cluster_id
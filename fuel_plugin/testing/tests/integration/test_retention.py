@@ -0,0 +1,112 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import threading
+
+import mock
+
+from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.ostf_adapter.storage import retention
+from fuel_plugin.testing.tests import base
+
+
+class TestRetention(base.BaseIntegrationTest):
+
+    test_set_id = 'general_test'
+    cluster_id = 1
+
+    def setUp(self):
+        super(TestRetention, self).setUp()
+
+        self.discovery()
+        self.mock_api_for_cluster(self.cluster_id)
+        mixins.discovery_check(self.session, self.cluster_id)
+        self.session.flush()
+
+        old_time = datetime.datetime.utcnow() - datetime.timedelta(days=10)
+        self.test_runs_ids = []
+        for status in ('finished', 'finished', 'running', 'finished'):
+            test_run = models.TestRun.add_test_run(
+                self.session, self.test_set_id, self.cluster_id,
+                status=status)
+            test_run.started_at = old_time
+            self.test_runs_ids.append(test_run.id)
+        self.session.commit()
+
+        models.Test.add_results(
+            self.session, self.test_runs_ids[0],
+            [(self.ext_test_name, {'status': 'success'})])
+
+    @property
+    def ext_test_name(self):
+        return self.session.query(models.Test.name)\
+            .filter_by(test_set_id=self.test_set_id)\
+            .first()[0]
+
+    def _remaining_test_runs_ids(self):
+        return sorted(test_run_id for test_run_id, in self.session.query(
+            models.TestRun.id).filter_by(cluster_id=self.cluster_id))
+
+    def test_purge_test_runs(self):
+        purged_count = retention.purge_test_runs(
+            self.session, keep_runs=1, keep_days=1, batch_size=1)
+
+        # latest and unfinished test runs are kept
+        self.assertEqual(purged_count, 2)
+        self.assertEqual(self._remaining_test_runs_ids(),
+                         self.test_runs_ids[2:])
+        self.assertEqual(
+            self.session.query(models.Test)
+            .filter(models.Test.test_run_id.in_(self.test_runs_ids[:2]))
+            .count(),
+            0)
+
+        summaries = self.session.query(models.TestRunSummary)\
+            .order_by(models.TestRunSummary.id)\
+            .all()
+        self.assertEqual([summary.id for summary in summaries],
+                         self.test_runs_ids[:2])
+        tests_count = self.session.query(models.Test)\
+            .filter_by(test_set_id=self.test_set_id, test_run_id=None)\
+            .count()
+        self.assertEqual(summaries[0].tests_statuses,
+                         {'success': 1, 'wait_running': tests_count - 1})
+
+    def test_recent_test_runs_are_kept(self):
+        purged_count = retention.purge_test_runs(
+            self.session, keep_runs=1, keep_days=30)
+
+        self.assertEqual(purged_count, 0)
+        self.assertEqual(self._remaining_test_runs_ids(), self.test_runs_ids)
+
+
+class TestPeriodicPurge(base.BaseUnitTest):
+
+    @mock.patch.object(retention, '_purge_test_runs')
+    @mock.patch.object(retention.gevent, 'sleep')
+    def test_purge_does_not_block_server(self, m_sleep, m_purge):
+        threads = []
+        m_purge.side_effect = \
+            lambda dbpath: threads.append(threading.current_thread())
+        # the second sleep stops purging
+        m_sleep.side_effect = [None, SystemExit]
+
+        self.assertRaises(SystemExit,
+                          retention.purge_test_runs_periodically,
+                          'fake_db_path', 60)
+
+        m_purge.assert_called_once_with('fake_db_path')
+        self.assertIsNot(threads[0], threading.current_thread())
@@ -0,0 +1,211 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+
+import mock
+
+from fuel_plugin.ostf_adapter import config
+from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter import scheduler
+from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.testing.tests import base
+
+
+class TestScheduler(base.BaseIntegrationTest):
+
+    # cluster with gemini_first and gemini_second test sets
+    # which are exclusive to each other
+    cluster_id = 5
+
+    def setUp(self):
+        super(TestScheduler, self).setUp()
+
+        self.discovery()
+        self.mock_api_for_cluster(self.cluster_id)
+        mixins.discovery_check(self.session, self.cluster_id)
+        self.session.flush()
+
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'scheduler_max_running', 'adapter')
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'scheduler_max_running_per_cluster', 'adapter')
+
+        @contextlib.contextmanager
+        def contexted_session(dbpath):
+            yield self.session
+
+        patcher = mock.patch.object(scheduler.engine, 'contexted_session',
+                                    contexted_session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(models.TestRun, 'dispatch')
+        self.dispatch_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        _, self.test_runs = models.TestRun.add_batch(
+            self.session,
+            [(models.TestSet.get_test_set(self.session, test_set_id),
+              self.cluster_id, None, None)
+             for test_set_id in ('gemini_second', 'gemini_first',
+                                 'general_test')],
+            token='fake_token')
+
+    def _started_test_sets(self):
+        started = []
+        for call in self.dispatch_mock.call_args_list:
+            for test_run_id, _, _, _ in call[0][1]:
+                started.append(
+                    models.TestRun.get_test_run(self.session, test_run_id)
+                    .test_set_id)
+        return started
+
+    def test_exclusive_test_sets_wait_in_queue(self):
+        self.assertEqual(scheduler.schedule('fake_db_path'), 2)
+        self.assertEqual(self._started_test_sets(),
+                         ['general_test', 'gemini_first'])
+
+        # gemini_second waits for gemini_first to finish
+        self.assertEqual(scheduler.schedule('fake_db_path'), 0)
+
+        gemini_first = self.test_runs[1]
+        gemini_first.update('finished')
+        self.session.flush()
+
+        self.assertEqual(scheduler.schedule('fake_db_path'), 1)
+        self.assertEqual(self._started_test_sets()[2:], ['gemini_second'])
+        self.assertEqual(self.session.query(models.QueuedTestRun).count(), 0)
+
+    def test_limits_of_running_test_runs(self):
+        config.cfg.CONF.set_override('scheduler_max_running_per_cluster', 1,
+                                     'adapter')
+
+        self.assertEqual(scheduler.schedule('fake_db_path'), 1)
+        self.assertEqual(self._started_test_sets(), ['general_test'])
+        self.assertEqual(scheduler.schedule('fake_db_path'), 0)
+
+        config.cfg.CONF.clear_override('scheduler_max_running_per_cluster',
+                                       'adapter')
+        config.cfg.CONF.set_override('scheduler_max_running', 2, 'adapter')
+
+        self.assertEqual(scheduler.schedule('fake_db_path'), 1)
+        self.assertEqual(self._started_test_sets(),
+                         ['general_test', 'gemini_first'])
+
+    def test_queued_test_runs(self):
+        # queued test runs have no process, but are not orphaned
+        self.assertEqual(models.TestRun.finish_orphaned(self.session), 0)
+
+        gemini_second = self.test_runs[0]
+        gemini_second.stop(self.session)
+        self.session.flush()
+
+        self.assertEqual(gemini_second.status, 'finished')
+        self.assertTrue(all(test.status == 'stopped'
+                            for test in gemini_second.tests))
+        self.assertEqual(scheduler.schedule('fake_db_path'), 2)
+        self.assertNotIn('gemini_second', self._started_test_sets())
+
+    def test_credentials_are_passed_to_test_runs(self):
+        scheduler.schedule('fake_db_path')
+
+        general_test = self.test_runs[2]
+        self.assertIn((general_test.id, None, 'fake_token', None),
+                      self.dispatch_mock.call_args[0][1])
+        self.assertNotIn(general_test.id, models.QueuedTestRun.credentials)
+
+    def test_queued_test_runs_are_finished_after_restart(self):
+        # credentials are lost with process which queued test runs
+        models.QueuedTestRun.credentials.clear()
+
+        self.assertEqual(models.TestRun.finish_orphaned(self.session), 3)
+        self.session.flush()
+
+        self.assertEqual(self.session.query(models.QueuedTestRun).count(), 0)
+        self.assertTrue(all(test_run.status == 'finished'
+                            for test_run in self.test_runs))
+        self.assertEqual(scheduler.schedule('fake_db_path'), 0)
+
+    def test_test_runs_without_credentials_are_not_started(self):
+        general_test = self.test_runs[2]
+        del models.QueuedTestRun.credentials[general_test.id]
+
+        self.assertEqual(scheduler.schedule('fake_db_path'), 1)
+        self.assertEqual(self._started_test_sets(), ['gemini_first'])
+        self.assertEqual(general_test.status, 'finished')
+
+    @mock.patch.object(models.events, 'publish')
+    def test_stopped_queued_test_run_is_published(self, publish_mock):
+        gemini_second = self.test_runs[0]
+        gemini_second.stop(self.session)
+
+        publish_mock.assert_called_once_with(
+            self.session, gemini_second.id, self.cluster_id,
+            status='finished', results=mock.ANY)
+        results = publish_mock.call_args[1]['results']
+        self.assertItemsEqual([name for name, _ in results],
+                              [test.name for test in gemini_second.tests])
+        self.assertTrue(all(data['status'] == 'stopped'
+                            for _, data in results))
+
+    @mock.patch.object(models.events, 'publish')
+    def test_test_runs_without_credentials_are_published(self,
+                                                         publish_mock):
+        general_test = self.test_runs[2]
+        del models.QueuedTestRun.credentials[general_test.id]
+
+        scheduler.schedule('fake_db_path')
+
+        publish_mock.assert_called_once_with(
+            self.session, general_test.id, self.cluster_id,
+            status='finished', results=mock.ANY)
+
+    def test_queued_test_runs_without_credentials_survive_restart(self):
+        _, test_runs = models.TestRun.add_batch(
+            self.session,
+            [(models.TestSet.get_test_set(self.session, 'stopped_test'),
+              self.cluster_id, None, None)])
+        models.QueuedTestRun.credentials.clear()
+
+        self.assertEqual(models.TestRun.finish_orphaned(self.session), 3)
+        self.assertEqual(test_runs[0].status, 'running')
+
+        self.assertEqual(scheduler.schedule('fake_db_path'), 1)
+        self.assertEqual(self.dispatch_mock.call_args[0][1],
+                         [(test_runs[0].id, None, None, None)])
+
+    def test_restarted_test_run_waits_in_queue(self):
+        config.cfg.CONF.set_override('scheduler_max_running_per_cluster', 1,
+                                     'adapter')
+        general_test = self.test_runs[2]
+        self.assertEqual(scheduler.schedule('fake_db_path'), 1)
+        general_test.update('finished')
+        self.session.flush()
+        self.assertEqual(scheduler.schedule('fake_db_path'), 1)
+
+        test_name = general_test.tests[0].name
+        general_test.restart(self.session, 'fake_db_path', None,
+                             tests=[test_name], token='fake_token')
+        self.session.flush()
+
+        # the cluster already executes as many test runs as it may
+        self.assertEqual(scheduler.schedule('fake_db_path'), 0)
+
+        self.test_runs[1].update('finished')
+        self.session.flush()
+        self.assertEqual(scheduler.schedule('fake_db_path'), 1)
+        self.assertEqual(self.dispatch_mock.call_args[0][1],
+                         [(general_test.id, None, 'fake_token',
+                           [test_name])])
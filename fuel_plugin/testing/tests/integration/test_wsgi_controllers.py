@@ -12,9 +12,22 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import gevent
+from gevent import event
 import mock
-
+try:
+    from oslo.serialization import jsonutils
+except ImportError:
+    from oslo_serialization import jsonutils
+from sqlalchemy import func
+from sqlalchemy import orm
+import webtest
+
+from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter.storage import engine
 from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.ostf_adapter.wsgi import app
+from fuel_plugin.ostf_adapter.wsgi import controllers
 from fuel_plugin.testing.tests import base
 
 
@@ -150,6 +163,54 @@ class TestTestRunsController(base.BaseWSGITest):
             self.expected['testrun_post']['tests']['names']
         )
 
+    def test_post_batch(self):
+        resp = self.app.post_json('/v1/testruns/', (
+            {
+                'testset': 'ha_deployment_test',
+                'metadata': {'cluster_id': self.cluster_id,
+                             'ostf_os_access_creds': {'tenant': 'admin'}}
+            },
+            {
+                'testset': 'ha_deployment_test',
+                'metadata': {'cluster_id': self.cluster_id}
+            },
+            {
+                'testset': 'general_test',
+                'metadata': {'cluster_id': self.cluster_id}
+            },
+        ))
+
+        batch_id = resp.headers['X-Batch-Id']
+        first, skipped, second = resp.json
+        self.assertEqual(skipped, {})
+        self.assertEqual([first['batch_id'], second['batch_id']],
+                         [batch_id, batch_id])
+
+        # test runs are started by scheduler
+        self.assertEqual(
+            [test_run_id for test_run_id, in
+             self.session.query(models.QueuedTestRun.test_run_id)
+             .order_by(models.QueuedTestRun.test_run_id)],
+            [first['id'], second['id']])
+        self.assertEqual(
+            models.QueuedTestRun.credentials,
+            {first['id']: ({'tenant': 'admin'}, None),
+             second['id']: (None, None)})
+        self.assertFalse(self.plugin_mock.run.called)
+
+        resp = self.app.get('/v1/testruns', {'batch_id': batch_id})
+        self.assertEqual([test_run['id'] for test_run in resp.json],
+                         [first['id'], second['id']])
+
+    def test_post_invalid_batch(self):
+        for test_runs in ([{'testset': 'general_test'}],
+                          [{'testset': 'unknown',
+                            'metadata': {'cluster_id': self.cluster_id}}]):
+            self.app.post_json('/v1/testruns/', test_runs, status=400)
+
+        self.assertEqual(self.session.query(models.TestRun).count(), 0)
+        self.assertEqual(self.session.query(models.QueuedTestRun).count(), 0)
+
     def test_put_stopped(self):
         resp = self.app.post_json('/v1/testruns/', (
             {
@@ -219,6 +280,274 @@ class TestTestRunsController(base.BaseWSGITest):
             )
         )
 
+    def test_get_all_paginated(self):
+        resp = self.app.post_json('/v1/testruns/', (
+            {
+                'testset': 'ha_deployment_test',
+                'metadata': {'cluster_id': self.cluster_id}
+            },
+            {
+                'testset': 'general_test',
+                'metadata': {'cluster_id': self.cluster_id}
+            },
+        ))
+        testruns_ids = sorted(testrun['id'] for testrun in resp.json)
+
+        resp = self.app.get('/v1/testruns', {'limit': 1})
+        self.assertEqual([testrun['id'] for testrun in resp.json],
+                         testruns_ids[:1])
+        self.assertEqual(len(resp.json[0]['tests']), 2)
+
+        resp = self.app.get('/v1/testruns', {'marker': testruns_ids[0]})
+        self.assertEqual([testrun['id'] for testrun in resp.json],
+                         testruns_ids[1:])
+
+        resp = self.app.get('/v1/testruns',
+                            {'testset': 'general_test', 'status': 'running'})
+        self.assertEqual([testrun['testset'] for testrun in resp.json],
+                         ['general_test'])
+
+        resp = self.app.get('/v1/testruns', {'cluster_id': 2})
+        self.assertEqual(resp.json, [])
+
+        resp = self.app.get('/v1/testruns',
+                            {'since': '2000-01-01T00:00:00',
+                             'until': '2000-01-02T00:00:00'})
+        self.assertEqual(resp.json, [])
+
+    @mock.patch.object(controllers, 'TESTRUNS_BATCH_SIZE', 1)
+    def test_get_all_releases_connection_before_writing(self):
+        self.app.post_json('/v1/testruns/', (
+            {
+                'testset': 'ha_deployment_test',
+                'metadata': {'cluster_id': self.cluster_id}
+            },
+            {
+                'testset': 'general_test',
+                'metadata': {'cluster_id': self.cluster_id}
+            },
+        ))
+        session_cls = orm.Session
+        sessions = []
+
+        def create_session(**kwargs):
+            session = session_cls(**kwargs)
+            session.close = mock.Mock(wraps=session.close)
+            sessions.append(session)
+            return session
+
+        chunks = []
+        with mock.patch.object(orm, 'Session', side_effect=create_session):
+            for chunk in controllers._stream_test_runs(
+                    self.connection, self.session.query(models.TestRun),
+                    None, None):
+                self.assertTrue(all(session.close.called
+                                    for session in sessions))
+                chunks.append(chunk)
+
+        # the last batch is empty
+        self.assertEqual(len(sessions), 3)
+        self.assertEqual(len(jsonutils.loads(''.join(chunks))), 2)
+
+    def test_get_all_with_invalid_parameters(self):
+        for params in ({'limit': 0}, {'marker': 'x'},
+                       {'status': 'unknown'}, {'since': 'yesterday'}):
+            self.app.get('/v1/testruns', params, status=400)
+
+    def test_get_last_changes(self):
+        resp = self.app.post_json('/v1/testruns/', (
+            {
+                'testset': 'ha_deployment_test',
+                'metadata': {'cluster_id': self.cluster_id}
+            },
+            {
+                'testset': 'general_test',
+                'metadata': {'cluster_id': self.cluster_id}
+            },
+        ))
+        general_test_run_id = resp.json[1]['id']
+        url = '/v1/testruns/last/{0}'.format(self.cluster_id)
+
+        resp = self.app.get(url)
+        self.assertEqual(len(resp.json), 2)
+        version = resp.etag
+
+        self.app.get(url, {'since': version}, status=304)
+        self.app.get(url, headers={'If-None-Match': '"{0}"'.format(version)},
+                     status=304)
+
+        test_name = self.ext_id + 'general_test.Dummy_test.test_fast_pass'
+        models.Test.add_results(self.session, general_test_run_id,
+                                [(test_name, {'status': 'success'})])
+
+        resp = self.app.get(url, {'since': version})
+        self.assertNotEqual(resp.etag, version)
+        self.assertEqual(
+            [(test_run['id'], [test['id'] for test in test_run['tests']])
+             for test_run in resp.json],
+            [(general_test_run_id, [test_name])])
+        self.assertEqual(resp.json[0]['tests'][0]['status'], 'success')
+
+        models.TestRun.update_test_run(self.session, general_test_run_id,
+                                       {'status': 'finished'})
+
+        resp = self.app.get(url, {'since': resp.etag})
+        self.assertEqual(
+            [(test_run['status'], test_run['tests'])
+             for test_run in resp.json],
+            [('finished', [])])
+
+        self.app.get(url, {'since': 'x'}, status=400)
+
+
+class TestLastTestRunsChanges(base.BaseIntegrationTest):
+    """Changes are made by concurrent transactions, so they are
+    committed to database and removed afterwards.
+    """
+
+    cluster_id = 9001
+    test_set_id = 'changes_test_set'
+
+    def setUp(self):
+        super(TestLastTestRunsChanges, self).setUp()
+        self.make_session = orm.sessionmaker(bind=self.engine)
+
+        session = self.make_session()
+        session.add_all([
+            models.TestSet(id=self.test_set_id),
+            models.ClusterState(id=self.cluster_id, deployment_tags=[]),
+            models.ClusterTestingPattern(cluster_id=self.cluster_id,
+                                         test_set_id=self.test_set_id,
+                                         tests=['first', 'second']),
+        ])
+        session.flush()
+        test_run = models.TestRun(test_set_id=self.test_set_id,
+                                  cluster_id=self.cluster_id,
+                                  status='running')
+        session.add(test_run)
+        session.flush()
+        session.add_all([
+            models.Test(name=name, test_set_id=self.test_set_id,
+                        test_run_id=test_run.id, status='wait_running')
+            for name in ('first', 'second')
+        ])
+        session.commit()
+        session.close()
+        self.addCleanup(self.remove_committed)
+
+    def remove_committed(self):
+        session = self.make_session()
+        session.query(models.TestRun)\
+            .filter_by(cluster_id=self.cluster_id).delete()
+        session.query(models.ClusterTestingPattern)\
+            .filter_by(cluster_id=self.cluster_id).delete()
+        session.query(models.ClusterState)\
+            .filter_by(id=self.cluster_id).delete()
+        session.query(models.TestSet)\
+            .filter_by(id=self.test_set_id).delete()
+        session.commit()
+        session.close()
+
+    def set_status(self, session, name, status):
+        session.query(models.Test)\
+            .filter(models.Test.name == name,
+                    models.Test.test_run_id.isnot(None),
+                    models.Test.test_set_id == self.test_set_id)\
+            .update({'status': status}, synchronize_session=False)
+
+    def changes_since(self, since):
+        session = self.make_session()
+        try:
+            return [
+                (test['id'], test['status'])
+                for test_run in controllers._get_last_test_runs_changes(
+                    session, self.cluster_id,
+                    controllers._parse_version(since, 'since'))
+                for test in test_run['tests']
+            ]
+        finally:
+            session.close()
+
+    def test_late_commit_of_earlier_change_is_not_missed(self):
+        first_writer = self.make_session()
+        self.addCleanup(first_writer.close)
+        self.set_status(first_writer, 'first', 'success')
+
+        # the later change is committed before the earlier one
+        second_writer = self.make_session()
+        self.set_status(second_writer, 'second', 'failure')
+        second_writer.commit()
+        second_writer.close()
+
+        reader = self.make_session()
+        version = controllers._get_last_changes_version(reader,
+                                                        self.cluster_id)
+        reader.close()
+
+        first_writer.commit()
+
+        first_change_seq = self.session.query(models.Test.change_seq)\
+            .filter_by(name='first', test_set_id=self.test_set_id)\
+            .filter(models.Test.test_run_id.isnot(None))\
+            .scalar()
+        self.assertLess(first_change_seq, int(version.split(':')[0]))
+
+        self.assertEqual(self.changes_since(version),
+                         [('first', 'success')])
+
+    def test_reading_version_does_not_take_transaction_id(self):
+        reader = self.make_session()
+        self.addCleanup(reader.close)
+
+        version = controllers._get_last_changes_version(reader,
+                                                        self.cluster_id)
+
+        self.assertEqual(version.split(':')[1], '0')
+        self.assertIsNone(reader.query(
+            func.txid_current_if_assigned()).scalar())
+
+
+class TestConcurrentRequests(base.BaseWSGITest):
+
+    def setUp(self):
+        super(TestConcurrentRequests, self).setUp()
+        # session of the server, requests work in the test transaction
+        with mock.patch.object(engine, 'get_engine',
+                               return_value=self.connection):
+            self.app = webtest.TestApp(app.setup_app(
+                session=engine.get_session(self.dbpath)))
+
+    @mock.patch('fuel_plugin.ostf_adapter.mixins._get_cluster_attrs')
+    def test_request_waiting_for_nailgun_keeps_its_session(
+            self, m_get_cluster_attrs):
+        cluster_id = self.expected['cluster']['id']
+        fetching = event.Event()
+        fetched = event.Event()
+
+        def get_cluster_attrs(*args, **kwargs):
+            fetching.set()
+            fetched.wait()
+            return {'deployment_tags': self.expected['cluster']
+                    ['deployment_tags'], 'release_version': '2015.2-1.0'}
+        m_get_cluster_attrs.side_effect = get_cluster_attrs
+
+        post = gevent.spawn(self.app.post_json, '/v1/testruns/', (
+            {
+                'testset': 'general_test',
+                'metadata': {'cluster_id': cluster_id}
+            },
+        ))
+        fetching.wait()
+
+        # another request is served and its session is removed while
+        # the first one waits for Nailgun
+        self.app.get('/v1/testruns/last/{0}'.format(cluster_id))
+        fetched.set()
+
+        resp = post.get()
+        self.assertEqual(resp.json[0]['testset'], 'general_test')
+        self.assertEqual(resp.json[0]['status'], 'running')
+
 
 class TestClusterRedeployment(base.BaseWSGITest):
 
@@ -267,11 +596,34 @@ class TestClusterRedeployment(base.BaseWSGITest):
             'deployment_tags': set(['multinode', 'ubuntu', 'nova_network']),
             'release_version': '2015.2-1.0'
         }
+        mixins.invalidate_cluster_attrs(cluster_id)
 
         self.app.get('/v1/testsets/{0}'.format(cluster_id))
 
         self.assertTrue(self.is_background_working)
 
+    @mock.patch('fuel_plugin.ostf_adapter.mixins._get_cluster_attrs')
+    def test_redeployment_invalidates_attrs_of_other_tokens(
+            self, m_get_cluster_attrs):
+        cluster_id = self.expected['cluster']['id']
+        m_get_cluster_attrs.return_value = {
+            'deployment_tags': set(['multinode', 'centos']),
+            'release_version': '2015.2-1.0'
+        }
+        mixins.discovery_check(self.session, cluster_id, token='first')
+
+        # redeployment is noticed with token which has nothing cached
+        m_get_cluster_attrs.return_value = {
+            'deployment_tags': set(['multinode', 'ubuntu']),
+            'release_version': '2015.2-1.0'
+        }
+        mixins.discovery_check(self.session, cluster_id, token='second')
+
+        self.assertEqual(
+            mixins.get_cluster_attrs(cluster_id, token='first'),
+            m_get_cluster_attrs.return_value)
+        self.assertEqual(m_get_cluster_attrs.call_count, 3)
+
 
 class TestVersioning(base.BaseWSGITest):
     def test_discover_tests_with_versions(self):
@@ -12,9 +12,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import mock
-
-from fuel_plugin.ostf_adapter.storage import models
 from fuel_plugin.testing.tests import base
 
 
@@ -36,8 +33,7 @@ class WsgiInterfaceTest(base.BaseWSGITest):
     def test_get_all_testruns(self):
         self.app.get('/v1/testruns')
 
-    @mock.patch.object(models.TestRun, 'start')
-    def test_post_testruns(self, mstart):
+    def test_post_testruns(self):
         self.mock_api_for_cluster(3)
         self.mock_api_for_cluster(4)
 
@@ -52,7 +48,6 @@ class WsgiInterfaceTest(base.BaseWSGITest):
             }
         ]
 
-        mstart.return_value = {}
         self.app.post_json('/v1/testruns', testruns)
 
     def test_put_testruns(self):
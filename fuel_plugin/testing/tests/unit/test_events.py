@@ -0,0 +1,108 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+try:
+    from oslo.serialization import jsonutils
+except ImportError:
+    from oslo_serialization import jsonutils
+
+from fuel_plugin.ostf_adapter import config
+from fuel_plugin.ostf_adapter.storage import events
+from fuel_plugin.ostf_adapter.wsgi import controllers
+from fuel_plugin.testing.tests import base
+
+
+class TestEvents(base.BaseUnitTest):
+
+    def setUp(self):
+        config.init_config([])
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'events_queue_size', 'adapter')
+        self.listener = events.Listener('postgresql://')
+        # greenlet of listener is not spawned by these tests
+        self.listener._listening.set()
+
+    def event(self, cluster_id, test_run_id=1):
+        return jsonutils.dumps({'test_run_id': test_run_id,
+                                'cluster_id': cluster_id,
+                                'status': None,
+                                'tests': []})
+
+    @mock.patch.object(events, 'MAX_PAYLOAD_SIZE', 300)
+    def test_large_event_is_split(self):
+        tests = [{'id': 'test_{0}'.format(i), 'status': 'success'}
+                 for i in range(10)]
+
+        payloads = [jsonutils.loads(payload) for payload
+                    in events._get_payloads(1, 2, 'finished', tests)]
+
+        self.assertTrue(len(payloads) > 1)
+        self.assertEqual(
+            [test for payload in payloads for test in payload['tests']],
+            tests)
+        # test run status is sent after statuses of all its tests
+        self.assertEqual([payload['status'] for payload in payloads],
+                         [None] * (len(payloads) - 1) + ['finished'])
+
+    @mock.patch('gevent.spawn')
+    def test_events_are_dispatched_by_cluster(self, spawn_mock):
+        spawn_mock.return_value.dead = False
+        first = self.listener.subscribe(cluster_id=1)
+        every = self.listener.subscribe()
+        self.assertEqual(spawn_mock.call_count, 1)
+
+        self.listener.dispatch(self.event(1))
+        self.listener.dispatch(self.event(2))
+        self.listener.dispatch('garbage')
+
+        self.assertEqual(first.get(timeout=0)['cluster_id'], 1)
+        self.assertIsNone(first.get(timeout=0))
+        self.assertEqual(every.get(timeout=0)['cluster_id'], 1)
+        self.assertEqual(every.get(timeout=0)['cluster_id'], 2)
+
+    @mock.patch('gevent.spawn')
+    def test_slow_subscriber_is_unsubscribed(self, spawn_mock):
+        config.cfg.CONF.set_override('events_queue_size', 2, 'adapter')
+        subscription = self.listener.subscribe(cluster_id=1)
+
+        for test_run_id in range(3):
+            self.listener.dispatch(self.event(1, test_run_id))
+
+        self.assertTrue(subscription.closed)
+        self.assertEqual(self.listener.subscriptions, set())
+        self.assertEqual(subscription.get(timeout=0)['test_run_id'], 0)
+        self.assertEqual(subscription.get(timeout=0)['test_run_id'], 1)
+        self.assertIsNone(subscription.get(timeout=0))
+
+    @mock.patch('gevent.spawn')
+    def test_subscribe_waits_for_listening(self, spawn_mock):
+        self.listener._listening.clear()
+
+        self.assertRaises(events.NotListening,
+                          self.listener.subscribe, cluster_id=1, timeout=0)
+        self.assertEqual(self.listener.subscriptions, set())
+
+    @mock.patch('gevent.spawn')
+    def test_stream_of_events(self, spawn_mock):
+        subscription = self.listener.subscribe(cluster_id=1)
+        self.listener.dispatch(self.event(1))
+        subscription.close()
+
+        stream = list(controllers._stream_events(subscription, []))
+
+        self.assertEqual(stream[0], 'event: snapshot\ndata: []\n\n')
+        self.assertEqual(len(stream), 2)
+        self.assertEqual(jsonutils.loads(stream[1][len('data: '):]),
+                         jsonutils.loads(self.event(1)))
@@ -13,10 +13,12 @@
 #    under the License.
 
 import random
+import tempfile
 
 from mock import Mock
 from nose import case
 
+from fuel_plugin.ostf_adapter.nose_plugin import ast_discovery
 from fuel_plugin.ostf_adapter.nose_plugin import nose_discovery
 from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
 from fuel_plugin.ostf_adapter.storage import models
@@ -65,6 +67,28 @@ class TestNoseDiscovery(base.BaseUnitTest):
     def _find_needed_test_set(self, test_set_id):
         return next(t for t in self.test_sets if t.id == test_set_id)
 
+    def test_deployment_tags_matching(self):
+        cluster_depl_tags = set(['ha', 'centos', 'ceph'])
+
+        cases = [
+            ([], True),
+            (['ha'], True),
+            (['ha', 'ubuntu'], False),
+            (['ha', 'ubuntu | centos'], True),
+            (['multinode|ubuntu', 'centos'], False),
+            (['ha|multinode', 'ubuntu|centos', 'ceph'], True),
+        ]
+        for test_depl_tags, expected in cases:
+            compiled = nose_utils.compile_deployment_tags(test_depl_tags)
+
+            self.assertEqual(compiled.match(cluster_depl_tags), expected)
+            self.assertIs(nose_utils.compile_deployment_tags(compiled),
+                          compiled)
+            self.assertEqual(
+                nose_utils._process_deployment_tags(cluster_depl_tags,
+                                                    test_depl_tags),
+                expected)
+
     def test_compare_release_versions(self):
         def cmp_version(first, second):
             if nose_utils._compare_release_versions(first, second):
@@ -251,3 +275,51 @@ class TestNoseDiscovery(base.BaseUnitTest):
             self.assertEqual(data[key], expected[key])
 
         self.assertNotIn('Duration', data['description'])
+
+
+def discovered_entities(backend):
+    session_mock = Mock()
+    session_mock.begin = TransactionBeginMock
+
+    nose_discovery.discovery(
+        path=TEST_PATH,
+        session=session_mock,
+        backend=backend
+    )
+
+    entities = [el[0][0] for el in session_mock.merge.call_args_list]
+    test_sets = dict(
+        (entity.id, dict((column.name, getattr(entity, column.name))
+                         for column in models.TestSet.__table__.columns))
+        for entity in entities if isinstance(entity, models.TestSet)
+    )
+    tests = dict(
+        ((entity.test_set_id, entity.name),
+         dict((column.name, getattr(entity, column.name))
+              for column in models.Test.__table__.columns))
+        for entity in entities if isinstance(entity, models.Test)
+    )
+    return test_sets, tests
+
+
+class TestAstDiscovery(base.BaseUnitTest):
+
+    def test_same_as_nose_discovery(self):
+        ast_test_sets, ast_tests = discovered_entities(
+            nose_discovery.AST_BACKEND)
+        nose_test_sets, nose_tests = discovered_entities(
+            nose_discovery.NOSE_BACKEND)
+
+        self.assertTrue(ast_tests)
+        self.assertEqual(ast_test_sets, nose_test_sets)
+        self.assertEqual(ast_tests, nose_tests)
+
+    def test_unsupported_module_is_reported(self):
+        with tempfile.NamedTemporaryFile(suffix='_test.py') as module:
+            module.write('__profile__ = dict(id="generated")\n')
+            module.flush()
+
+            parsed, unparsed = ast_discovery.parse_modules([module.name])
+
+        self.assertEqual(parsed, [])
+        self.assertEqual(unparsed, [module.name])
@@ -0,0 +1,115 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from fuel_plugin.ostf_adapter import config
+from fuel_plugin.ostf_adapter.nose_plugin import nose_adapter
+from fuel_plugin.ostf_adapter.nose_plugin import nose_parallel_adapter
+from fuel_plugin.testing.tests import base
+
+
+class TestParallelNoseDriver(base.BaseUnitTest):
+
+    argv = [
+        'general_test:Dummy_test.test_fast_pass',
+        'ha_deployment_test:HATest.test_ha_depl',
+        'general_test:Dummy_test.test_fast_fail',
+        'general_test:Other_test.test_skip',
+        '--with-timer',
+    ]
+
+    def setUp(self):
+        config.init_config([])
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'parallel_workers', 'adapter')
+
+        self.results_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.results_dir)
+
+        self.driver = nose_parallel_adapter.ParallelNoseDriver()
+
+    def test_group_by_class(self):
+        self.assertEqual(
+            nose_parallel_adapter.group_by_class(self.argv),
+            [
+                ['general_test:Dummy_test.test_fast_pass',
+                 'general_test:Dummy_test.test_fast_fail',
+                 '--with-timer'],
+                ['ha_deployment_test:HATest.test_ha_depl', '--with-timer'],
+                ['general_test:Other_test.test_skip', '--with-timer'],
+            ]
+        )
+        self.assertEqual(
+            nose_parallel_adapter.group_by_class(['path/to/tests', '-s']),
+            [['path/to/tests', '-s']])
+
+    def test_group_by_class_with_option_values(self):
+        argv = ['--attr', 'type=smoke', 'general_test:Dummy_test.test_skip',
+                '-sa', 'slow', '--config=nose.cfg', '-c', 'other.cfg',
+                'general_test:Other_test.test_skip']
+
+        self.assertEqual(
+            nose_parallel_adapter.group_by_class(argv),
+            [
+                ['general_test:Dummy_test.test_skip', '--attr', 'type=smoke',
+                 '-sa', 'slow', '--config=nose.cfg', '-c', 'other.cfg'],
+                ['general_test:Other_test.test_skip', '--attr', 'type=smoke',
+                 '-sa', 'slow', '--config=nose.cfg', '-c', 'other.cfg'],
+            ]
+        )
+
+    def record_execution(self, session, dbpath, test_run_id, cluster_id,
+                         creds, token, results_log, argv_add):
+        filename = os.path.join(self.results_dir, str(os.getpid()))
+        with open(filename, 'w') as f:
+            f.write('\n'.join(argv_add))
+
+    def executed_groups(self):
+        groups = []
+        for filename in os.listdir(self.results_dir):
+            with open(os.path.join(self.results_dir, filename)) as f:
+                groups.append(f.read().split('\n'))
+        return groups
+
+    def execute(self, argv):
+        self.driver._execute(mock.Mock(), 'postgresql://', 1, 1,
+                             {}, None, mock.Mock(), argv)
+
+    @mock.patch('fuel_plugin.ostf_adapter.storage.engine.contexted_session')
+    def test_classes_are_executed_by_separate_processes(self, session_mock):
+        config.cfg.CONF.set_override('parallel_workers', 2, 'adapter')
+
+        with mock.patch.object(nose_adapter.NoseDriver, '_execute',
+                               self.record_execution):
+            self.execute(self.argv)
+
+        self.assertItemsEqual(
+            self.executed_groups(),
+            nose_parallel_adapter.group_by_class(self.argv))
+        self.assertNotIn(str(os.getpid()), os.listdir(self.results_dir))
+
+    def test_single_class_is_executed_in_place(self):
+        argv = self.argv[:1]
+
+        with mock.patch.object(nose_adapter.NoseDriver, '_execute',
+                               self.record_execution):
+            self.execute(argv)
+
+        self.assertEqual(os.listdir(self.results_dir), [str(os.getpid())])
+        self.assertEqual(self.executed_groups(), [argv])
@@ -0,0 +1,76 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import multiprocessing
+import os
+import time
+
+from fuel_plugin.ostf_adapter.nose_plugin import nose_workers
+from fuel_plugin.testing.tests import base
+
+
+class TestWorkerPool(base.BaseUnitTest):
+
+    def setUp(self):
+        self.results = multiprocessing.Queue()
+
+    def tearDown(self):
+        for worker in self.pool.workers:
+            worker.terminate()
+            worker.join()
+
+    def target(self, job_id):
+        os.environ['JOB_ID'] = str(job_id)
+        self.results.put((job_id, os.getpid()))
+
+    def wait_for_exit(self, exited_count):
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            exited_count -= self.pool.supervise()
+            if exited_count <= 0:
+                return
+            time.sleep(0.05)
+        self.fail('Workers did not exit in time.')
+
+    def test_worker_processes_one_job(self):
+        self.pool = nose_workers.WorkerPool(2, self.target)
+        self.pool.start()
+        initial_pids = set(worker.pid for worker in self.pool.workers)
+
+        for job_id in range(2):
+            self.pool.submit(job_id)
+        results = dict(self.results.get(timeout=10) for _ in range(2))
+
+        self.assertEqual(set(results.values()), initial_pids)
+
+        # both workers exit after single job and are replaced
+        self.wait_for_exit(2)
+        self.assertEqual(len(self.pool.workers), 2)
+
+        self.pool.submit(2)
+        job_id, pid = self.results.get(timeout=10)
+
+        self.assertEqual(job_id, 2)
+        self.assertNotIn(pid, initial_pids)
+
+    def test_worker_processes_several_jobs(self):
+        self.pool = nose_workers.WorkerPool(1, self.target, max_jobs=2)
+        self.pool.start()
+
+        for job_id in range(2):
+            self.pool.submit(job_id)
+        results = dict(self.results.get(timeout=10) for _ in range(2))
+
+        self.assertEqual(results[0], results[1])
+        self.assertNotIn('JOB_ID', os.environ)
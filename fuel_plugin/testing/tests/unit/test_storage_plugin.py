@@ -0,0 +1,132 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import signal
+
+import mock
+from nose import case
+
+from fuel_plugin.ostf_adapter import config
+from fuel_plugin.ostf_adapter.nose_plugin import nose_adapter
+from fuel_plugin.ostf_adapter.nose_plugin import nose_storage_plugin
+from fuel_plugin.testing.tests import base
+
+
+@mock.patch('fuel_plugin.ostf_adapter.nose_plugin.nose_storage_plugin.'
+            'models.Test.add_results')
+class TestStoragePluginBuffering(base.BaseUnitTest):
+
+    def setUp(self):
+        config.init_config([])
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'storage_flush_interval', 'adapter')
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'storage_flush_on_terminal_status', 'adapter')
+
+        self.session = mock.Mock()
+        self.plugin = nose_storage_plugin.StoragePlugin(
+            self.session, 1, '1', {}, None, mock.Mock())
+
+    def tearDown(self):
+        self.plugin.flush()
+
+    def fake_case(self, name):
+        test = mock.Mock(spec=case.Test(mock.Mock()))
+        test.id.return_value = name
+        test.test._testMethodDoc = 'Title of {0}'.format(name)
+        return test
+
+    def saved_statuses(self, m_add_results):
+        return [
+            [(name, data['status']) for name, data in call[0][2]]
+            for call in m_add_results.call_args_list
+        ]
+
+    def test_transitions_are_coalesced(self, m_add_results):
+        test = self.fake_case('test_a')
+
+        self.plugin.beforeTest(test)
+        self.plugin.addSuccess(test)
+        self.plugin.finalize(None)
+
+        self.assertEqual(self.saved_statuses(m_add_results),
+                         [[('test_a', 'success')]])
+        self.assertEqual(self.session.commit.call_count, 1)
+
+    def test_results_are_saved_in_batch(self, m_add_results):
+        tests = [self.fake_case(name) for name in ('test_a', 'test_b')]
+
+        for test in tests:
+            self.plugin.beforeTest(test)
+            self.plugin.addSuccess(test)
+        self.plugin.flush()
+
+        self.assertEqual(self.saved_statuses(m_add_results),
+                         [[('test_a', 'success'), ('test_b', 'success')]])
+
+    def test_no_buffering(self, m_add_results):
+        config.cfg.CONF.set_override('storage_flush_interval', 0, 'adapter')
+        test = self.fake_case('test_a')
+
+        self.plugin.beforeTest(test)
+        self.plugin.addSuccess(test)
+
+        self.assertEqual(self.saved_statuses(m_add_results),
+                         [[('test_a', 'running')], [('test_a', 'success')]])
+
+    def test_flush_on_terminal_status(self, m_add_results):
+        config.cfg.CONF.set_override('storage_flush_on_terminal_status',
+                                     True, 'adapter')
+        test = self.fake_case('test_a')
+
+        self.plugin.beforeTest(test)
+        self.assertFalse(m_add_results.called)
+
+        self.plugin.addSuccess(test)
+        self.assertEqual(self.saved_statuses(m_add_results),
+                         [[('test_a', 'success')]])
+
+    def test_interrupted_tests_are_not_saved(self, m_add_results):
+        test = self.fake_case('test_a')
+
+        self.plugin.beforeTest(test)
+        self.plugin.finalize(None)
+
+        self.assertFalse(m_add_results.called)
+
+    def test_results_are_saved_when_test_run_is_stopped(self,
+                                                        m_add_results):
+        self.addCleanup(signal.signal, signal.SIGUSR1,
+                        signal.getsignal(signal.SIGUSR1))
+        finished, interrupted = [self.fake_case(name)
+                                 for name in ('test_a', 'test_b')]
+
+        def run_tests(addplugins, **kwargs):
+            plugin = addplugins[0]
+            plugin.beforeTest(finished)
+            plugin.addSuccess(finished)
+            plugin.beforeTest(interrupted)
+            raise nose_adapter.InterruptTestRunException()
+
+        with mock.patch.object(nose_adapter.nose_test_runner,
+                               'SilentTestProgram', side_effect=run_tests):
+            self.assertRaises(
+                nose_adapter.InterruptTestRunException,
+                nose_adapter.NoseDriver()._execute,
+                self.session, 'fake_db_path', 1, 1, {}, None, mock.Mock(),
+                ['general_test'])
+
+        self.assertEqual(self.saved_statuses(m_add_results),
+                         [[('test_a', 'success')]])
+        self.assertTrue(self.session.rollback.called)
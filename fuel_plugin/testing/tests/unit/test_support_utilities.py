@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mock
 import requests_mock
 
 from fuel_plugin.ostf_adapter import config
@@ -109,6 +110,230 @@ class TestDeplTagsGetter(base.BaseUnitTest):
 
         self.assertEqual(res, expected['attrs'])
 
+    def test_nailgun_requests_reuse_session(self):
+        cluster_id = 8
+
+        with requests_mock.Mocker() as m:
+            cluster = base.CLUSTERS[cluster_id]
+            m.register_uri('GET', '/api/clusters/8',
+                           json=cluster['cluster_meta'])
+            m.register_uri('GET', '/api/clusters/8/attributes',
+                           json=cluster['cluster_attributes'])
+            m.register_uri('GET', '/api/releases/8',
+                           json=cluster['release_data'])
+            m.register_uri('GET', '/api/nodes?cluster_id=8',
+                           json=cluster['cluster_node'])
+            m.register_uri('GET', '/api/nodes/1/interfaces',
+                           json=cluster['node-1_interfaces'])
+            m.register_uri('GET', '/api/nodes/2/interfaces',
+                           json=cluster['node-2_interfaces'])
+
+            session = mixins._get_nailgun_session()
+            mixins._get_cluster_attrs(cluster_id, token='token')
+
+            self.assertIs(session, mixins._get_nailgun_session())
+            self.assertEqual(m.call_count, 6)
+            self.assertTrue(
+                all(req.headers['X-Auth-Token'] == 'token'
+                    for req in m.request_history)
+            )
+
+
+class TestClusterAttrsCache(base.BaseUnitTest):
+
+    cluster_id = 3
+
+    def setUp(self):
+        config.init_config([])
+        mixins.invalidate_cluster_attrs()
+        self.addCleanup(mixins.invalidate_cluster_attrs)
+
+    def register_cluster_uris(self, m, headers=None):
+        cluster = base.CLUSTERS[self.cluster_id]
+        uris = [
+            ('/api/clusters/3', cluster['cluster_meta']),
+            ('/api/clusters/3/attributes', cluster['cluster_attributes']),
+            ('/api/releases/3', cluster['release_data']),
+            ('/api/nodes?cluster_id=3', cluster['cluster_node']),
+        ]
+        for uri, data in uris:
+            m.register_uri('GET', uri, json=data, headers=headers or {})
+
+    def expire_cached_attrs(self):
+        for cached in mixins._CLUSTER_ATTRS_CACHE.values():
+            cached['expires_at'] = 0
+
+    def test_cached_attrs_are_reused(self):
+        with requests_mock.Mocker() as m:
+            self.register_cluster_uris(m)
+
+            first = mixins.get_cluster_attrs(self.cluster_id)
+            second = mixins.get_cluster_attrs(str(self.cluster_id))
+
+        self.assertEqual(first, second)
+        self.assertEqual(m.call_count, 4)
+
+    def test_attrs_are_cached_per_token(self):
+        with requests_mock.Mocker() as m:
+            self.register_cluster_uris(m)
+
+            mixins.get_cluster_attrs(self.cluster_id, token='first')
+            mixins.get_cluster_attrs(self.cluster_id, token='second')
+            mixins.get_cluster_attrs(self.cluster_id, token='first')
+
+        self.assertEqual(m.call_count, 8)
+        self.assertTrue(all(req.headers['X-Auth-Token'] == 'second'
+                            for req in m.request_history[4:]))
+        self.assertNotIn('first', repr(mixins._CLUSTER_ATTRS_CACHE.keys()))
+
+    def test_invalidation(self):
+        with requests_mock.Mocker() as m:
+            self.register_cluster_uris(m)
+
+            mixins.get_cluster_attrs(self.cluster_id)
+            mixins.invalidate_cluster_attrs(self.cluster_id)
+            mixins.get_cluster_attrs(self.cluster_id)
+
+        self.assertEqual(m.call_count, 8)
+
+    def test_expired_attrs_are_revalidated(self):
+        with requests_mock.Mocker() as m:
+            self.register_cluster_uris(m, headers={'ETag': '"v1"'})
+            expected = mixins.get_cluster_attrs(self.cluster_id)
+
+        self.expire_cached_attrs()
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', requests_mock.ANY, status_code=304)
+            res = mixins.get_cluster_attrs(self.cluster_id)
+
+        self.assertEqual(res, expected)
+        self.assertEqual(m.call_count, 4)
+        self.assertTrue(
+            all(req.headers['If-None-Match'] == '"v1"'
+                for req in m.request_history)
+        )
+
+    def test_expired_attrs_without_validators_are_refetched(self):
+        with requests_mock.Mocker() as m:
+            self.register_cluster_uris(m)
+            mixins.get_cluster_attrs(self.cluster_id)
+
+        self.expire_cached_attrs()
+
+        with requests_mock.Mocker() as m:
+            self.register_cluster_uris(m)
+            mixins.get_cluster_attrs(self.cluster_id)
+
+        self.assertEqual(m.call_count, 4)
+        self.assertTrue(
+            all('If-None-Match' not in req.headers
+                for req in m.request_history)
+        )
+
+
+class TestTestingPatternsCache(base.BaseUnitTest):
+
+    def setUp(self):
+        self.repository = mixins.TestRepository()
+        self.repository.swap([
+            mixins.TestSetRecord(
+                test_set_id='ha',
+                deployment_tags=['ha'],
+                available_since_release='',
+                tests=(
+                    mixins.TestRecord('ha.test_a', [], ''),
+                    mixins.TestRecord('ha.test_b', ['ceph'], ''),
+                ),
+            ),
+            mixins.TestSetRecord(
+                test_set_id='multinode',
+                deployment_tags=['multinode'],
+                available_since_release='',
+                tests=(),
+            ),
+        ])
+        mixins._TESTING_PATTERNS_CACHE.clear()
+        self.addCleanup(mixins._TESTING_PATTERNS_CACHE.clear)
+
+    def cluster(self, cluster_id, tags):
+        return {
+            'id': cluster_id,
+            'deployment_tags': set(tags),
+            'release_version': '2015.1.0-7.0',
+        }
+
+    def get_pattern(self, cluster_id, tags):
+        return mixins._get_testing_pattern(self.repository.snapshot,
+                                           self.cluster(cluster_id, tags))
+
+    def test_pattern_is_shared_by_clusters_with_same_tags(self):
+        first = self.get_pattern(1, ['ha', 'ceph'])
+        second = self.get_pattern(2, ['ceph', 'ha'])
+
+        self.assertIs(first, second)
+        self.assertEqual(first, (('ha', ('ha.test_a', 'ha.test_b')),))
+        self.assertEqual(len(mixins._TESTING_PATTERNS_CACHE), 1)
+
+        other = self.get_pattern(3, ['ha'])
+        self.assertEqual(other, (('ha', ('ha.test_a',)),))
+        self.assertEqual(len(mixins._TESTING_PATTERNS_CACHE), 2)
+
+    def test_patterns_are_computed_per_generation(self):
+        first = self.get_pattern(1, ['ha'])
+
+        self.repository.swap(self.repository.snapshot.test_sets[1:])
+        second = self.get_pattern(1, ['ha'])
+
+        self.assertEqual(first, (('ha', ('ha.test_a',)),))
+        self.assertEqual(second, ())
+
+    def test_caching_repository_drops_patterns(self):
+        self.get_pattern(1, ['ha'])
+
+        with mock.patch.object(mixins, 'TEST_REPOSITORY', self.repository):
+            session = mock.Mock()
+            session.query.return_value.options.return_value\
+                .all.return_value = []
+            snapshot = mixins.cache_test_repository(session)
+
+        self.assertEqual(mixins._TESTING_PATTERNS_CACHE, {})
+        self.assertEqual(snapshot.generation, 2)
+        self.assertEqual(snapshot.test_sets, ())
+
+
+class TestTestRepository(base.BaseUnitTest):
+
+    def test_reload_replaces_snapshot(self):
+        test_set = mock.Mock(id='ha', deployment_tags=['ha'],
+                             available_since_release='')
+        test = mock.Mock(deployment_tags=['ceph|ephemeral_ceph'],
+                         available_since_release='2015.1.0-7.0')
+        test.name = 'ha.test_a'
+        test_set.tests = [test]
+
+        session = mock.Mock()
+        session.query.return_value.options.return_value\
+            .all.return_value = [test_set]
+
+        repository = mixins.TestRepository()
+        self.assertEqual(repository.snapshot, (0, ()))
+
+        first = repository.reload(session)
+        second = repository.reload(session)
+
+        self.assertEqual(first.generation, 1)
+        self.assertEqual(second.generation, 2)
+        self.assertIs(repository.snapshot, second)
+        self.assertEqual(first.test_sets, second.test_sets)
+        self.assertEqual(len(second.test_sets), 1)
+
+        record = second.test_sets[0]
+        self.assertEqual(record.test_set_id, 'ha')
+        self.assertEqual(record.tests[0].name, 'ha.test_a')
+        self.assertTrue(
+            record.tests[0].deployment_tags.match(set(['ephemeral_ceph'])))
+
 
 class TestDeplMuranoTags(base.BaseUnitTest):
 